@@ -8,7 +8,8 @@ defined by:
     Area < 10000m2 - this avoids public reserves being included
 '''
 
-from LandXML import Connections
+from LandXML import Connections, Profiling
+from LandXML.RefMarks import RefMarkQueries
 
 class CheckBdyConnection:
     def __init__(self, PntRefNum, LandXML_Obj):
@@ -21,7 +22,7 @@ class CheckBdyConnection:
         :return: boolean defining if connected to parcel or not
         '''
         self.PntRefNum = PntRefNum
-        self.LandXML_Obj = LandXML_Obj        
+        self.LandXML_Obj = LandXML_Obj
         self.FindConnection = False
         self.FilterConnection = False
 
@@ -55,15 +56,13 @@ class CheckBdyConnection:
         :return: TargetID
         '''
 
-        if Observation.get("setupID").replace(self.LandXML_Obj.TraverseProps.tag, "") == \
-                PntRefNum:
-            TargetID = Observation.get("targetSetupID").replace(self.LandXML_Obj.TraverseProps.tag, "")
-        else:
-            TargetID = Observation.get("setupID").replace(self.LandXML_Obj.TraverseProps.tag, "")
+        TargetID = Connections.GetConnectionIndex(self.LandXML_Obj).OtherEnd(Observation,
+                                                                             PntRefNum)
 
         return TargetID
 
 
+    @Profiling.Stage("BDY_Connections.FindBdyConnection")
     def FindBdyConnection(self, Observations):
         '''
         Method called when want to find if PntRefNum has any BDY connection
@@ -71,8 +70,12 @@ class CheckBdyConnection:
         '''
         self.Observations = Observations
         self.FindConnection = True
+        #no neighbour of PntRefNum is a vertex - skip cycling the observations
+        if not GetBdyHopLabels(self.LandXML_Obj).BdyConnected(self.PntRefNum):
+            return False
         return self.CycleObservations()
 
+    @Profiling.Stage("BDY_Connections.FilterBdyConnection")
     def FilterBdyConnection(self, Observations):
         '''
         Method to filter Observations for one that have BDY connections
@@ -103,24 +106,7 @@ class CheckBdyConnection:
         :return:
         '''
 
-        #Loop through parcels in landXML file
-        for parcel in self.LandXML_Obj.Parcels.getchildren():
-            parcelClass = parcel.get("class")
-            parcelState = parcel.get("state")
-            try:
-                parcelArea = float(parcel.get("area"))
-                #filter for large public reserves
-                if parcelArea > 10000:
-                    continue
-            except TypeError:
-                continue
-            #filter for class and state attributes which define a proposed lot in subdivision
-            if parcelClass == "Lot" and parcelState == "proposed":
-                #check if Target ID is in the parcels linework vertexes
-                if self.CheckParcelLines(parcel, TargetID, self.LandXML_Obj.TraverseProps):
-                    return True
-
-        return False
+        return TargetID in GetBdyVertices(self.LandXML_Obj)
 
     def CheckParcelLines(self, parcel, TargetID, TraverseProps):
         '''
@@ -153,15 +139,171 @@ class CheckBdyConnection:
         :return:
         '''
 
-        # get all connections for TargetID
-        TargetConnections = Connections.AllConnections(PntRefNum, self.LandXML_Obj)
-        # check if any of the connections from TargetID are connected to a BDY
-        for keyTarg in TargetConnections.__dict__.keys():
-            TargetConnection = TargetConnections.__getattribute__(keyTarg)
-            Target = self.GetTargetID(TargetConnection, PntRefNum)
-            # check if Target is a boundary
-            if self.BdyConnection(Target):
-                return True
-                break
+        return GetBdyHopLabels(self.LandXML_Obj).BdyConnected(PntRefNum)
+
+
+def ProposedLotVertices(Parcels, TraverseProps):
+    '''
+    Collects the pntRefs of every vertex of a proposed lot in the subdivision
+    Same lot definition as the module docstring (Lot, proposed, area < 10000m2)
+    :param Parcels: Parcels element from LandXML
+    :param TraverseProps: traverse properties - uses Namespace
+    :return: frozenset of vertex pntRefs
+    '''
+
+    Vertices = set()
+    for parcel in Parcels.getchildren():
+        try:
+            #filter for large public reserves
+            if float(parcel.get("area")) > 10000:
+                continue
+        except TypeError:
+            continue
+        #filter for class and state attributes which define a proposed lot in subdivision
+        if parcel.get("class") != "Lot" or parcel.get("state") != "proposed":
+            continue
+
+        lines = parcel.find(TraverseProps.Namespace + "CoordGeom")
+        if lines is None:
+            continue
+        for line in lines.getchildren():
+            for End in ("Start", "End"):
+                Vertex = line.find(TraverseProps.Namespace + End)
+                if Vertex is not None:
+                    Vertices.add(Vertex.get("pntRef"))
+
+    return frozenset(Vertices)
+
+def GetBdyVertices(LandXML_Obj):
+    '''
+    Returns the proposed lot vertex set of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: frozenset of vertex pntRefs
+    '''
+    Vertices = getattr(LandXML_Obj, "BdyVertices", None)
+    if Vertices is None:
+        Vertices = ProposedLotVertices(LandXML_Obj.Parcels, LandXML_Obj.TraverseProps)
+        setattr(LandXML_Obj, "BdyVertices", Vertices)
+
+    return Vertices
+
+
+class BdyHopLabels:
+    def __init__(self, LandXML_Obj, MaxDepth=2):
+        '''
+        Labels points in the observation network by their hop distance to a proposed lot vertex
+        Single breadth first pass from all vertexes over the ConnectionIndex, up to MaxDepth hops
+            Distance - hops from the point to the nearest vertex (0 for a vertex)
+            Hops - hops to the nearest vertex along at least one observation
+                   (1 when a connection of the point ends on a vertex)
+        Points are also labelled by their hops to the nearest calculated point as points
+        are calculated (MarkCalculated) - CalculatedHops, up to MaxDepth hops
+        :param LandXML_Obj: LandXML data object
+        :param MaxDepth: number of hops to label out to
+        '''
+        self.MaxDepth = MaxDepth
+        self.Distance = {}
+        self.Hops = {}
+        self.CalculatedHops = {}
+        Index = Connections.GetConnectionIndex(LandXML_Obj)
+        self.Index = Index
+
+        Frontier = [Vertex for Vertex in GetBdyVertices(LandXML_Obj)]
+        for Vertex in Frontier:
+            self.Distance[Vertex] = 0
+        for Depth in range(1, MaxDepth + 1):
+            NextFrontier = []
+            for PntRefNum in Frontier:
+                for Neighbour in Index.Neighbours(PntRefNum):
+                    if Neighbour not in self.Hops:
+                        self.Hops[Neighbour] = Depth
+                    if Neighbour not in self.Distance:
+                        self.Distance[Neighbour] = Depth
+                        NextFrontier.append(Neighbour)
+            Frontier = NextFrontier
+
+        #RMs with a direct BDY connection still to be calculated - ordered dict in monument order
+        self.PendingBdyRMs = {}
+        for PntRefNum in RefMarkQueries.GetMonumentTable(LandXML_Obj).ControlMarks:
+            if self.BdyConnected(PntRefNum):
+                self.PendingBdyRMs[PntRefNum] = True
+        #pending BDY RMs bucketed by CalculatedHops - last bucket for RMs further than MaxDepth
+        self.PendingByHops = [{} for Depth in range(MaxDepth + 2)]
+        self.PendingByHops[-1] = dict(self.PendingBdyRMs)
+
+    def HopDistance(self, PntRefNum):
+        '''
+        Hops along observations from PntRefNum to the nearest vertex
+        :param PntRefNum:
+        :return: int, None if further than MaxDepth
+        '''
+        return self.Hops.get(PntRefNum)
+
+    def BdyConnected(self, PntRefNum, Hops=1):
+        '''
+        Whether PntRefNum reaches a vertex within Hops observations
+        :param PntRefNum:
+        :param Hops: 1 - a connection ends on a vertex, 2 - a connection of a connection etc
+        :return: Boolean
+        '''
+        HopDistance = self.Hops.get(PntRefNum)
+        return HopDistance is not None and HopDistance <= Hops
+
+    def NextBdyStart(self):
+        '''
+        Uncalculated RM with a BDY connection fewest hops from a calculated point
+        Monument order until a nearby point is calculated
+        :return: PntRefNum or None
+        '''
+        for Bucket in self.PendingByHops:
+            for PntRefNum in Bucket:
+                return PntRefNum
+        return None
+
+    def MarkCalculated(self, PntRefNum):
+        '''
+        Updates labels when PntRefNum has been calculated
+        Breadth first pass from PntRefNum out to MaxDepth hops - only continues through
+            points whose CalculatedHops label is lowered
+        :param PntRefNum:
+        :return: Boolean - whether BDY connections should still be prioritised
+        '''
+        if self.PendingBdyRMs.pop(PntRefNum, None) is not None:
+            self.PendingByHops[self.Bucket(PntRefNum)].pop(PntRefNum, None)
+
+        if self.CalculatedHops.get(PntRefNum) != 0:
+            self.CalculatedHops[PntRefNum] = 0
+            Frontier = [PntRefNum]
+            for Depth in range(1, self.MaxDepth + 1):
+                NextFrontier = []
+                for Point in Frontier:
+                    for Neighbour in self.Index.Neighbours(Point):
+                        if self.CalculatedHops.get(Neighbour, self.MaxDepth + 1) <= Depth:
+                            continue
+                        if Neighbour in self.PendingBdyRMs:
+                            self.PendingByHops[self.Bucket(Neighbour)].pop(Neighbour, None)
+                            self.PendingByHops[Depth][Neighbour] = True
+                        self.CalculatedHops[Neighbour] = Depth
+                        NextFrontier.append(Neighbour)
+                Frontier = NextFrontier
+
+        return len(self.PendingBdyRMs) > 0
+
+    def Bucket(self, PntRefNum):
+        #PendingByHops bucket of a pending RM
+        return self.CalculatedHops.get(PntRefNum, self.MaxDepth + 1)
+
+def GetBdyHopLabels(LandXML_Obj):
+    '''
+    Returns the BdyHopLabels of LandXML_Obj, building it on first use
+    Depth is taken from TraverseProps.BdyHopDepth if set
+    :param LandXML_Obj: LandXML data object
+    :return: BdyHopLabels
+    '''
+    Labels = getattr(LandXML_Obj, "BdyHopLabels", None)
+    if Labels is None:
+        MaxDepth = getattr(LandXML_Obj.TraverseProps, "BdyHopDepth", 2)
+        Labels = BdyHopLabels(LandXML_Obj, MaxDepth)
+        setattr(LandXML_Obj, "BdyHopLabels", Labels)
 
-        return False
\ No newline at end of file
+    return Labels
@@ -0,0 +1,282 @@
+'''
+Headless batch processing of LandXML files
+- loads each file, finds the connection tag and builds the observation indexes
+- runs the RM traverse computation with no GUI
+- files are processed in a process pool, one file per task
+- checks the calculated points against the CgPoint coordinates
+- writes a result file per LandXML file and a timing/failure/validation report to the output directory
+  result files are named <file>-<hash of the file's full path>.json so files with the same name
+  in different directories, or named report.xml, do not overwrite each other
+
+usage: python -m LandXML.Batch PATH [PATH ...] -o OUTPUT [-j WORKERS] [--profile] [--cache DIR]
+                               [--tolerance METRES] [--parallel-components [--component-workers N]]
+'''
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from LandXML import DataObjects, LandXML_Objects, Profiling, TraverseObserver, Validation
+
+
+class HeadlessSession(object):
+    '''
+    Stands in for the gui data object when traverses are run without a GUI
+    Holds the CadastralPlan, view is None and the observer has no display so nothing is drawn
+    Points, lines and traverses are the plain DataObjects unless a factory is given
+    '''
+
+    def __init__(self, Factory=None):
+        self.view = None
+        self.Observer = TraverseObserver.TraverseObserver()
+        #DataObjectFactory - DataObjects.GetDataObjects creates the plain one when None
+        self.DataObjects = Factory
+        self.CadastralPlan = DataObjects.CadastralPlanObj()
+        # RefMark_Traverse queries the plan under this name
+        self.CadastralPlanObj = self.CadastralPlan
+
+class HeadlessTraverseProps(object):
+    '''
+    Stands in for the GUI's TraverseProps when LandXML_Traverse_Props is not installed
+    Sets the properties the load and traverse workflow reads before setting them itself
+    '''
+
+    def __init__(self):
+        self.Namespace = "{http://www.landxml.org/schema/LandXML-1.2}"
+        self.FirstTraverse = True
+        self.TraverseType = None
+        self.TraverseClose = False
+        self.BdyConnections = False
+
+
+def TraverseProperties():
+    '''
+    TraverseProps for a run without the GUI
+    :return: LandXML_Traverse_Props.TraverseProps if installed, otherwise HeadlessTraverseProps
+    '''
+    try:
+        from LandXML import LandXML_Traverse_Props
+    except ImportError:
+        return HeadlessTraverseProps()
+
+    return LandXML_Traverse_Props.TraverseProps()
+
+
+def ProcessFile(LandXMLFile, OutputDir, NetworkAdjustment=False, Profile=False, CacheDir=None,
+                Tolerance=Validation.TOLERANCE, ParallelComponents=False, ComponentWorkers=None):
+    '''
+    Loads LandXMLFile and computes its RM traverses
+    Runs in a worker process - returns a report dictionary rather than raising
+    :param LandXMLFile: path to LandXML file
+    :param OutputDir: directory to write the result file to
+    :param NetworkAdjustment: solve RMs by least squares network adjustment instead of traversing
+    :param Profile: record stage timings - added to the report and written as a pstats file
+    :param CacheDir: plan cache directory - files already in the cache are not parsed again
+    :param Tolerance: radial tolerance (m) of calculated points against CgPoints
+    :param ParallelComponents: traverse the RM network components in their own processes
+    :param ComponentWorkers: number of processes for the components - defaults to the number of cores
+    :return: report dictionary (file, status, timings, validation, error)
+    '''
+    Report = {"file": LandXMLFile, "status": "ok", "error": None}
+    Start = time.perf_counter()
+    if Profile:
+        Profiling.Reset()
+        Profiling.Enable()
+    try:
+        from LandXML.RefMarks import RefMark_Traverse
+
+        TraverseProps = TraverseProperties()
+        setattr(TraverseProps, "NetworkAdjustment", NetworkAdjustment)
+        setattr(TraverseProps, "ParallelComponents", ParallelComponents)
+        setattr(TraverseProps, "Workers", ComponentWorkers)
+        if CacheDir is not None:
+            setattr(TraverseProps, "CacheDir", CacheDir)
+        LandXML_Obj = LandXML_Objects.main(LandXMLFile, TraverseProps)
+        setattr(LandXML_Obj, "TriedConnections", LandXML_Objects.TriedConnections())
+        Report["load_s"] = time.perf_counter() - Start
+        Report["cached"] = LandXML_Obj.FromCache
+
+        Stage = time.perf_counter()
+        LandXML_Obj = LandXML_Objects.PrepareTraverse(LandXML_Obj, TraverseProps)
+        LandXML_Objects.SaveToCache(LandXML_Obj)
+        Report["index_s"] = time.perf_counter() - Stage
+
+        Session = HeadlessSession()
+        Stage = time.perf_counter()
+        setattr(LandXML_Obj, "RefMarks", LandXML_Objects.HasRefMarks(LandXML_Obj))
+        if LandXML_Obj.RefMarks:
+            RefMark_Traverse.main(LandXML_Obj, Session)
+        else:
+            Report["status"] = "no reference marks"
+        Report["traverse_s"] = time.perf_counter() - Stage
+
+        Report["dp"] = LandXML_Obj.DP
+        Report["points"] = len(Session.CadastralPlan.Points.__dict__)
+        Stage = time.perf_counter()
+        Report["validation"] = Validation.ValidatePlan(LandXML_Obj, Session.CadastralPlan, Tolerance)
+        Report["validate_s"] = time.perf_counter() - Stage
+        Report["output"] = WriteResult(LandXMLFile, LandXML_Obj, Session, OutputDir)
+    except Exception as e:
+        Report["status"] = "failed"
+        Report["error"] = repr(e)
+        Report["traceback"] = traceback.format_exc()
+
+    Report["total_s"] = time.perf_counter() - Start
+    if Profile:
+        Report["profile"] = Profiling.Summary()
+        Report["profile_output"] = os.path.join(OutputDir, OutputName(LandXMLFile) + ".prof")
+        Profiling.ExportPstats(Report["profile_output"])
+        Profiling.Enable(False)
+
+    return Report
+
+def WriteResult(LandXMLFile, LandXML_Obj, Session, OutputDir):
+    '''
+    Writes the calculated points and lines of Session to a JSON file in OutputDir
+    Only scalar attributes of the point and line objects are written
+    :return: path of the written file
+    '''
+
+    Result = {"file": LandXMLFile, "dp": LandXML_Obj.DP,
+              "points": ScalarAttributes(Session.CadastralPlan.Points),
+              "lines": ScalarAttributes(Session.CadastralPlan.Lines)}
+    OutputFile = os.path.join(OutputDir, OutputName(LandXMLFile) + ".json")
+    with open(OutputFile, "w") as f:
+        json.dump(Result, f, indent=1)
+
+    return OutputFile
+
+def OutputName(LandXMLFile):
+    '''
+    Name of the output files of LandXMLFile, without extension
+    The file name is followed by a short hash of its full path - files with the same name
+        in different directories get different outputs, and no output is named report.json
+    :param LandXMLFile: path to LandXML file
+    :return: name
+    '''
+    PathHash = hashlib.sha1(os.path.abspath(LandXMLFile).encode("utf-8")).hexdigest()[:8]
+
+    return os.path.splitext(os.path.basename(LandXMLFile))[0] + "-" + PathHash
+
+def ScalarAttributes(DataObj):
+    '''
+    Converts the attribute objects of DataObj to dictionaries of their scalar attributes
+    :param DataObj: Points or Lines data object
+    :return: dictionary keyed by attribute name
+    '''
+
+    Values = {}
+    for key, item in DataObj.__dict__.items():
+        if not hasattr(item, "__dict__"):
+            continue
+        Values[key] = {name: value for name, value in item.__dict__.items()
+                       if isinstance(value, (str, int, float, bool, type(None)))}
+
+    return Values
+
+def FindLandXMLFiles(Paths, Pattern="*.xml"):
+    '''
+    Expands directories in Paths to the LandXML files they contain
+    :param Paths: list of file and directory paths
+    :param Pattern: glob pattern for files in directories
+    :return: sorted list of files
+    '''
+
+    Files = []
+    for Path in Paths:
+        if os.path.isdir(Path):
+            Files.extend(glob.glob(os.path.join(Path, "**", Pattern), recursive=True))
+        else:
+            Files.append(Path)
+
+    return sorted(set(Files))
+
+def RunBatch(Files, OutputDir, Workers=None, NetworkAdjustment=False, Profile=False, CacheDir=None,
+             Tolerance=Validation.TOLERANCE, ParallelComponents=False, ComponentWorkers=None):
+    '''
+    Processes Files in a process pool and writes report.json to OutputDir
+    :param Files: list of LandXML files
+    :param OutputDir: output directory
+    :param Workers: number of processes - defaults to the number of cores
+    :param NetworkAdjustment: solve RMs by least squares network adjustment
+    :param Profile: profile the stages of each file
+    :param CacheDir: plan cache directory
+    :param Tolerance: radial tolerance (m) of calculated points against CgPoints
+    :param ParallelComponents: traverse the RM network components of each file in their own processes
+    :param ComponentWorkers: number of processes for the components of each file
+    :return: list of report dictionaries in the order of Files
+    '''
+
+    os.makedirs(OutputDir, exist_ok=True)
+    Start = time.perf_counter()
+    Reports = {}
+    with ProcessPoolExecutor(max_workers=Workers) as Executor:
+        Futures = {Executor.submit(ProcessFile, File, OutputDir, NetworkAdjustment, Profile, CacheDir,
+                                   Tolerance, ParallelComponents, ComponentWorkers): File
+                   for File in Files}
+        for Future in as_completed(Futures):
+            File = Futures[Future]
+            try:
+                Report = Future.result()
+            except Exception as e:
+                #worker process died
+                Report = {"file": File, "status": "failed", "error": repr(e)}
+            Reports[File] = Report
+            print("%-8s %8.3fs  %s" % (Report["status"], Report.get("total_s", 0), File))
+
+    Reports = [Reports[File] for File in Files]
+    Elapsed = time.perf_counter() - Start
+    Summary = {"files": len(Files),
+               "failed": sum(1 for Report in Reports if Report["status"] == "failed"),
+               "exceeding_tolerance": [Report["file"] for Report in Reports
+                                       if Report.get("validation", {}).get("exceeding", 0) > 0],
+               "elapsed_s": Elapsed,
+               "files_per_s": len(Files) / Elapsed if Elapsed > 0 else None,
+               "reports": Reports}
+    with open(os.path.join(OutputDir, "report.json"), "w") as f:
+        json.dump(Summary, f, indent=1)
+
+    return Reports
+
+def main(argv=None):
+    '''
+    Command line entry point
+    :param argv: command line arguments (defaults to sys.argv)
+    :return: exit code - 1 if any file failed
+    '''
+
+    Parser = argparse.ArgumentParser(description="Reduce LandXML files without the GUI")
+    Parser.add_argument("paths", nargs="+", help="LandXML files or directories of LandXML files")
+    Parser.add_argument("-o", "--output", required=True, help="output directory")
+    Parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default: number of cores)")
+    Parser.add_argument("--pattern", default="*.xml", help="file pattern used in directories")
+    Parser.add_argument("--adjust", action="store_true",
+                        help="solve RMs by least squares network adjustment instead of traversing")
+    Parser.add_argument("--profile", action="store_true",
+                        help="record per-stage timings in the report and write a .prof file per LandXML file")
+    Parser.add_argument("--cache", default=None,
+                        help="plan cache directory - compiled plans are reused when files are processed again")
+    Parser.add_argument("--tolerance", type=float, default=Validation.TOLERANCE,
+                        help="radial tolerance (m) of calculated points against CgPoint coordinates")
+    Parser.add_argument("--parallel-components", action="store_true",
+                        help="traverse the independent parts of each RM network in their own processes")
+    Parser.add_argument("--component-workers", type=int, default=None,
+                        help="processes per file for --parallel-components (default: number of cores)")
+    Args = Parser.parse_args(argv)
+
+    Files = FindLandXMLFiles(Args.paths, Args.pattern)
+    Reports = RunBatch(Files, Args.output, Args.workers, Args.adjust, Args.profile, Args.cache,
+                       Args.tolerance, Args.parallel_components, Args.component_workers)
+    Failed = [Report for Report in Reports if Report["status"] == "failed"]
+    print("%d files, %d failed" % (len(Reports), len(Failed)))
+
+    return 1 if len(Failed) > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,239 @@
+'''
+Benchmarks the stages of the LandXML traverse workflow on synthetic plans
+- writes a synthetic plan for each size
+- runs each stage in its own process, after the stages it depends on, and records
+  its time and the growth of the process peak resident set size (includes the
+  lxml/libxml2 allocations that tracemalloc does not see)
+- compares against stored baselines and fails on regressions - and when there is
+  no baseline for a stage, run with --update-baseline to create one
+
+usage: python -m LandXML.Benchmarks.Benchmark [--sizes 100 1000 5000] [--update-baseline]
+'''
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from LandXML.Benchmarks import SyntheticLandXML
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SIZES = [100, 1000, 5000]
+#differences below these are never regressions - timer and page granularity
+SLACK = {"time_s": 0.005, "peak_mb": 1.}
+
+
+class BenchmarkTraverse(object):
+    '''
+    Minimal traverse data object for filter stages - start point only
+    '''
+
+    def __init__(self, PntRefNum):
+        self.refPnts = [PntRefNum]
+
+
+def LoadStage(File, TraverseProps):
+    from LandXML import LandXML_Objects
+    return LandXML_Objects.main(File, TraverseProps)
+
+def PrepareStage(LandXML_Obj, TraverseProps):
+    from LandXML import LandXML_Objects
+    return LandXML_Objects.PrepareTraverse(LandXML_Obj, TraverseProps)
+
+def AllConnectionsStage(LandXML_Obj, Plan):
+    from LandXML import Connections
+    for PntRefNum in Plan.Coords:
+        Connections.AllConnections(PntRefNum, LandXML_Obj)
+
+def BdyConnectionsStage(LandXML_Obj, Plan):
+    from LandXML import BDY_Connections, Connections
+    for Mark, MarkType, Number in Plan.Monuments:
+        Checker = BDY_Connections.CheckBdyConnection(Mark, LandXML_Obj)
+        Checker.FindBdyConnection(Connections.AllConnections(Mark, LandXML_Obj))
+        Checker = BDY_Connections.CheckBdyConnection(Mark, LandXML_Obj)
+        Checker.FilterBdyConnection(Connections.AllConnections(Mark, LandXML_Obj))
+
+def ConnectionFilterStage(LandXML_Obj, Plan):
+    from LandXML import Connections
+    from LandXML.RefMarks import RM_ConnectionFilter
+    setattr(LandXML_Obj.TraverseProps, "BdyConnections", True)
+    setattr(LandXML_Obj.TraverseProps, "TraverseClose", True)
+    for Mark, MarkType, Number in Plan.Monuments:
+        RM_ConnectionFilter.RankConnections(Connections.AllConnections(Mark, LandXML_Obj),
+                                            BenchmarkTraverse(Mark), LandXML_Obj, Mark)
+
+def TraverseStartStage(LandXML_Obj, Plan):
+    from LandXML.RefMarks import TraverseStart
+    TraverseStart.TraverseStart(LandXML_Obj, True)
+
+
+#stages measured after load and prepare, in order
+STAGES = [("AllConnections", AllConnectionsStage),
+          ("BDY_Connections", BdyConnectionsStage),
+          ("RM_ConnectionFilter", ConnectionFilterStage),
+          ("TraverseStart", TraverseStartStage)]
+
+
+def PeakRSS():
+    '''
+    Peak resident set size of this process in MB
+    VmHWM on Linux - ru_maxrss also carries the peak of the process that spawned
+    the worker, from before its exec
+    '''
+    try:
+        with open("/proc/self/status") as f:
+            for Line in f:
+                if Line.startswith("VmHWM:"):
+                    return int(Line.split()[1]) / 1e3
+    except OSError:
+        pass
+    Peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on Linux, bytes on macOS
+    return Peak / 1e6 if sys.platform == "darwin" else Peak / 1e3
+
+def ResetPeakRSS():
+    '''
+    Resets the peak RSS to the current RSS - Linux only, elsewhere the peak from
+    earlier in the process is kept and only growth above it is measured
+    '''
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def Measure(Function, *args):
+    '''
+    Runs Function(*args) and measures wall time and the increase in peak RSS
+    :return: result, dictionary with time_s, peak_mb (increase of the process peak RSS)
+             and error
+    '''
+
+    ResetPeakRSS()
+    PeakBefore = PeakRSS()
+    Start = time.perf_counter()
+    Result = None
+    Error = None
+    try:
+        Result = Function(*args)
+    except Exception as e:
+        Error = repr(e)
+    Elapsed = time.perf_counter() - Start
+
+    return Result, {"time_s": Elapsed, "peak_mb": PeakRSS() - PeakBefore, "error": Error}
+
+def MeasureStage(File, Plan, Stage):
+    '''
+    Runs the stages before Stage unmeasured, then measures Stage
+    Runs in a fresh worker process so the peak RSS belongs to this stage's run only
+    :param File: synthetic LandXML file
+    :param Plan: SyntheticPlan written to File
+    :param Stage: stage name - load, prepare or a name in STAGES
+    :return: measurement dictionary
+    '''
+    from LandXML.Batch import TraverseProperties
+
+    TraverseProps = TraverseProperties()
+    if Stage == "load":
+        return Measure(LoadStage, File, TraverseProps)[1]
+    LandXML_Obj = LoadStage(File, TraverseProps)
+    if Stage == "prepare":
+        return Measure(PrepareStage, LandXML_Obj, TraverseProps)[1]
+    LandXML_Obj = PrepareStage(LandXML_Obj, TraverseProps)
+
+    return Measure(dict(STAGES)[Stage], LandXML_Obj, Plan)[1]
+
+def RunSize(Lots, WorkDir, Tag="IS-"):
+    '''
+    Runs every stage on a synthetic plan of Lots lots, one process per stage
+    RMs and CgPoints scale with the lot count
+    :return: dictionary of stage name -> measurement
+    '''
+    from LandXML.Batch import TraverseProperties
+
+    File = os.path.join(WorkDir, "synthetic_%d.xml" % Lots)
+    Namespace = TraverseProperties().Namespace.strip("{}") or SyntheticLandXML.NAMESPACE
+    Plan = SyntheticLandXML.GenerateLandXML(File, Lots=Lots, RefMarks=max(4, Lots // 10),
+                                            Points=Lots * 3, Tag=Tag, Namespace=Namespace)
+
+    Results = {}
+    for Stage in ["load", "prepare"] + [Name for Name, Function in STAGES]:
+        #spawned so the worker does not start with the parent's peak RSS
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as Executor:
+            try:
+                Results[Stage] = Executor.submit(MeasureStage, File, Plan, Stage).result()
+            except Exception as e:
+                Results[Stage] = {"time_s": 0., "peak_mb": 0., "error": repr(e)}
+        if Results[Stage]["error"] is not None and Stage in ("load", "prepare"):
+            break
+
+    return Results
+
+def CompareBaseline(Results, Baselines, Tolerance):
+    '''
+    Finds stages slower or using more memory than baseline * (1 + Tolerance) + SLACK
+    Stages that raised or have no baseline are always regressions
+    :return: list of regression messages
+    '''
+
+    Regressions = []
+    for Size, Stages in Results.items():
+        for Stage, Measurement in Stages.items():
+            if Measurement["error"] is not None:
+                Regressions.append("%s/%s raised %s" % (Size, Stage, Measurement["error"]))
+                continue
+            Baseline = Baselines.get(Size, {}).get(Stage)
+            if Baseline is None:
+                Regressions.append("%s/%s has no baseline" % (Size, Stage))
+                continue
+            for Key in ("time_s", "peak_mb"):
+                if Measurement[Key] > Baseline[Key] * (1 + Tolerance) + SLACK[Key]:
+                    Regressions.append("%s/%s %s %.4f > baseline %.4f" %
+                                       (Size, Stage, Key, Measurement[Key], Baseline[Key]))
+
+    return Regressions
+
+def main(argv=None):
+    Parser = argparse.ArgumentParser(description="Benchmark the LandXML traverse workflow")
+    Parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="lot counts")
+    Parser.add_argument("--tag", choices=SyntheticLandXML.TAGS, default="IS-")
+    Parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    Parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed fractional increase over baseline")
+    Parser.add_argument("--update-baseline", action="store_true",
+                        help="write these results as the new baseline")
+    Args = Parser.parse_args(argv)
+
+    Results = {}
+    with tempfile.TemporaryDirectory() as WorkDir:
+        for Lots in Args.sizes:
+            Results[str(Lots)] = RunSize(Lots, WorkDir, Args.tag)
+            for Stage, Measurement in Results[str(Lots)].items():
+                print("%6d %-20s %9.4fs %9.2fMB %s" % (Lots, Stage, Measurement["time_s"],
+                                                      Measurement["peak_mb"],
+                                                      Measurement["error"] or ""))
+
+    if Args.update_baseline:
+        with open(Args.baseline, "w") as f:
+            json.dump(Results, f, indent=1)
+        print("baseline written to " + Args.baseline)
+        return 0
+
+    if not os.path.exists(Args.baseline):
+        print("ERROR no baseline file %s - run with --update-baseline to create one" % Args.baseline)
+        return 2
+    with open(Args.baseline) as f:
+        Baselines = json.load(f)
+    Regressions = CompareBaseline(Results, Baselines, Args.tolerance)
+    for Regression in Regressions:
+        print("REGRESSION " + Regression)
+
+    return 1 if len(Regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
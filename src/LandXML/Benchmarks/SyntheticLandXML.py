@@ -0,0 +1,255 @@
+'''
+Generates synthetic LandXML plans for benchmarking the traverse workflow
+
+Plan layout:
+    - proposed lots on a regular grid, lot vertexes are CgPoints and the lot
+      boundaries are reduced observations (a fraction of them arcs)
+    - SSM/PM reference marks around the subdivision, each connected to the nearest
+      lot vertex and to the next mark (a closed RM traverse)
+    - the first mark is the survey origin (desc A, control)
+    - extra CgPoints to make up the requested point count, each a single
+      observation from a lot vertex (dead ends)
+    - one large reserve that is filtered out of the boundary vertexes
+
+usage: python -m LandXML.Benchmarks.SyntheticLandXML OUTPUT.xml --lots 500 --rms 40
+'''
+import argparse
+import math
+import random
+
+from lxml import etree
+
+NAMESPACE = "http://www.landxml.org/schema/LandXML-1.2"
+TAGS = ["IS-", "IS", "S-"]
+
+
+def Decimal2DMS(Bearing):
+    '''
+    Converts a decimal bearing to the LandXML DDD.MMSS string
+    :param Bearing: decimal degrees
+    :return: string
+    '''
+
+    Seconds = int(round((Bearing % 360) * 3600))
+    Degrees, Seconds = divmod(Seconds, 3600)
+    Minutes, Seconds = divmod(Seconds, 60)
+
+    return "%d.%02d%02d" % (Degrees % 360, Minutes, Seconds)
+
+class SyntheticPlan:
+    def __init__(self, Lots=100, RefMarks=20, Points=None, ArcFraction=0.1, Tag="IS-",
+                 Seed=0, Namespace=NAMESPACE):
+        '''
+        Builds the points, observations and parcels of a synthetic plan
+        :param Lots: number of proposed lots
+        :param RefMarks: number of SSM/PM reference marks
+        :param Points: total number of CgPoints - extra points added to reach it
+        :param ArcFraction: fraction of lot boundary observations that are arcs
+        :param Tag: setup ID prefix (IS-, IS or S-)
+        :param Seed: random seed
+        :param Namespace: LandXML namespace
+        '''
+        self.Random = random.Random(Seed)
+        self.Tag = Tag
+        self.ns = "{%s}" % Namespace
+        self.Namespace = Namespace
+        self.ArcFraction = ArcFraction
+        #point name -> (Easting, Northing)
+        self.Coords = {}
+        self.Observations = []
+        self.Parcels = []
+        self.Monuments = []
+        self.Origin = None
+
+        self.LotGrid(Lots)
+        self.RefMarkRing(RefMarks)
+        if Points is not None:
+            self.ExtraPoints(Points - len(self.Coords))
+
+    def AddPoint(self, Easting, Northing):
+        Name = str(len(self.Coords) + 1)
+        self.Coords[Name] = (Easting, Northing)
+        return Name
+
+    def AddObservation(self, SetupID, TargetID, Arc=False):
+        self.Observations.append((SetupID, TargetID, Arc))
+
+    def LotGrid(self, Lots, Width=15.0, Depth=30.0):
+        '''
+        Proposed lots on a grid - Cols x Rows lots, the first Lots cells are used
+        '''
+        self.Cols = max(1, int(math.ceil(math.sqrt(Lots))))
+        self.Rows = max(1, int(math.ceil(Lots / float(self.Cols))))
+        self.Width = Width
+        self.Depth = Depth
+        Grid = {}
+        for r in range(self.Rows + 1):
+            for c in range(self.Cols + 1):
+                Grid[(r, c)] = self.AddPoint(10000 + c * Width, 20000 + r * Depth)
+
+        Edges = set()
+        for Lot in range(Lots):
+            r, c = divmod(Lot, self.Cols)
+            Corners = [Grid[(r, c)], Grid[(r, c + 1)], Grid[(r + 1, c + 1)], Grid[(r + 1, c)]]
+            self.Parcels.append(("Lot", "proposed", Width * Depth, Corners))
+            for i in range(4):
+                Edge = (Corners[i], Corners[(i + 1) % 4])
+                if frozenset(Edge) not in Edges:
+                    Edges.add(frozenset(Edge))
+                    self.AddObservation(Edge[0], Edge[1], self.Random.random() < self.ArcFraction)
+
+        #large reserve along the southern side - excluded from boundary vertexes
+        Reserve = [Grid[(0, 0)], Grid[(0, self.Cols)],
+                   self.AddPoint(10000 + self.Cols * Width, 20000 - 700),
+                   self.AddPoint(10000, 20000 - 700)]
+        self.Parcels.append(("Lot", "proposed", self.Cols * Width * 700, Reserve))
+        self.Grid = Grid
+
+    def RefMarkRing(self, RefMarks, Offset=5.0):
+        '''
+        Reference marks spaced around the subdivision perimeter
+        '''
+        Perimeter = []
+        for c in range(self.Cols + 1):
+            Perimeter.append((0, c))
+        for r in range(1, self.Rows + 1):
+            Perimeter.append((r, self.Cols))
+        for c in range(self.Cols - 1, -1, -1):
+            Perimeter.append((self.Rows, c))
+        for r in range(self.Rows - 1, 0, -1):
+            Perimeter.append((r, 0))
+
+        CentreE = 10000 + self.Cols * self.Width / 2.
+        CentreN = 20000 + self.Rows * self.Depth / 2.
+        Marks = []
+        for i in range(RefMarks):
+            Vertex = self.Grid[Perimeter[int(i * len(Perimeter) / float(RefMarks))]]
+            E, N = self.Coords[Vertex]
+            Scale = 1 + Offset / max(math.hypot(E - CentreE, N - CentreN), 1.)
+            Mark = self.AddPoint(CentreE + (E - CentreE) * Scale, CentreN + (N - CentreN) * Scale)
+            self.Monuments.append((Mark, "SSM" if i % 3 else "PM", str(1000 + i)))
+            self.AddObservation(Mark, Vertex)
+            Marks.append(Mark)
+
+        for i in range(len(Marks)):
+            if len(Marks) > 1:
+                self.AddObservation(Marks[i], Marks[(i + 1) % len(Marks)])
+        if len(Marks) > 0:
+            self.Origin = Marks[0]
+
+    def ExtraPoints(self, Count):
+        '''
+        Dead end points observed from random lot vertexes
+        '''
+        Vertexes = list(self.Grid.values())
+        for i in range(max(0, Count)):
+            Vertex = self.Random.choice(Vertexes)
+            E, N = self.Coords[Vertex]
+            Point = self.AddPoint(E + self.Random.uniform(-3, 3), N + self.Random.uniform(-3, 3))
+            self.AddObservation(Vertex, Point)
+
+    def ToElement(self):
+        '''
+        Creates the LandXML element tree for the plan
+        :return: root element
+        '''
+        ns = self.ns
+        Root = etree.Element(ns + "LandXML", nsmap={None: self.Namespace})
+        Units = etree.SubElement(Root, ns + "Units")
+        etree.SubElement(Units, ns + "Metric", linearUnit="meter", areaUnit="squareMeter",
+                         angularUnit="decimal dd.mm.ss")
+
+        CgPoints = etree.SubElement(Root, ns + "CgPoints")
+        for Name, (E, N) in self.Coords.items():
+            Point = etree.SubElement(CgPoints, ns + "CgPoint", name=Name, oID=Name,
+                                     pntSurv="boundary")
+            if Name == self.Origin:
+                Point.set("desc", "A")
+                Point.set("pntSurv", "control")
+            #alternate leading space formats seen in LandXML files
+            Point.text = ("%.3f %.3f" if int(Name) % 2 else " %.3f %.3f") % (N, E)
+
+        Monuments = etree.SubElement(Root, ns + "Monuments")
+        for Mark, MarkType, Number in self.Monuments:
+            etree.SubElement(Monuments, ns + "Monument", name=Mark, pntRef=Mark, type=MarkType,
+                             state="found", oID=Number)
+
+        Parcels = etree.SubElement(Root, ns + "Parcels")
+        for i, (Class, State, Area, Corners) in enumerate(self.Parcels):
+            Parcel = etree.SubElement(Parcels, ns + "Parcel", name=str(i + 1), area="%.1f" % Area,
+                                      state=State, parcelType="Single")
+            Parcel.set("class", Class)
+            CoordGeom = etree.SubElement(Parcel, ns + "CoordGeom")
+            for j in range(len(Corners)):
+                Line = etree.SubElement(CoordGeom, ns + "Line")
+                etree.SubElement(Line, ns + "Start", pntRef=Corners[j])
+                etree.SubElement(Line, ns + "End", pntRef=Corners[(j + 1) % len(Corners)])
+
+        Survey = etree.SubElement(Root, ns + "Survey")
+        etree.SubElement(Survey, ns + "SurveyHeader", name="DP1000000", type="compiled")
+        for Name in self.Coords:
+            Setup = etree.SubElement(Survey, ns + "InstrumentSetup", id=self.Tag + Name,
+                                     stationName=Name, instrumentHeight="0")
+            etree.SubElement(Setup, ns + "InstrumentPoint", pntRef=Name)
+        Group = etree.SubElement(Survey, ns + "ObservationGroup", id="OG-1")
+        for i, (SetupID, TargetID, Arc) in enumerate(self.Observations):
+            E1, N1 = self.Coords[SetupID]
+            E2, N2 = self.Coords[TargetID]
+            Chord = math.hypot(E2 - E1, N2 - N1)
+            Azimuth = Decimal2DMS(math.degrees(math.atan2(E2 - E1, N2 - N1)))
+            if Arc:
+                Radius = Chord * self.Random.uniform(2, 10)
+                Length = 2 * Radius * math.asin(Chord / (2 * Radius))
+                etree.SubElement(Group, ns + "ReducedArcObservation", name=str(i + 1),
+                                 setupID=self.Tag + SetupID, targetSetupID=self.Tag + TargetID,
+                                 chordAzimuth=Azimuth, length="%.3f" % Length,
+                                 radius="%.3f" % Radius, rot=self.Random.choice(["cw", "ccw"]),
+                                 purpose="normal")
+            else:
+                etree.SubElement(Group, ns + "ReducedObservation", name=str(i + 1),
+                                 setupID=self.Tag + SetupID, targetSetupID=self.Tag + TargetID,
+                                 azimuth=Azimuth, horizDistance="%.3f" % Chord, purpose="normal")
+
+        return Root
+
+    def Write(self, File):
+        '''
+        Writes the plan to File
+        :param File: output path
+        :return: File
+        '''
+        etree.ElementTree(self.ToElement()).write(File, xml_declaration=True, encoding="UTF-8",
+                                                  pretty_print=True)
+        return File
+
+
+def GenerateLandXML(File, Lots=100, RefMarks=20, Points=None, ArcFraction=0.1, Tag="IS-", Seed=0,
+                    Namespace=NAMESPACE):
+    '''
+    Writes a synthetic LandXML plan to File
+    :return: SyntheticPlan
+    '''
+    Plan = SyntheticPlan(Lots, RefMarks, Points, ArcFraction, Tag, Seed, Namespace)
+    Plan.Write(File)
+
+    return Plan
+
+def main(argv=None):
+    Parser = argparse.ArgumentParser(description="Write a synthetic LandXML plan")
+    Parser.add_argument("output", help="output LandXML file")
+    Parser.add_argument("--lots", type=int, default=100)
+    Parser.add_argument("--rms", type=int, default=20)
+    Parser.add_argument("--points", type=int, default=None, help="total CgPoints")
+    Parser.add_argument("--arcs", type=float, default=0.1, help="fraction of arc observations")
+    Parser.add_argument("--tag", choices=TAGS, default="IS-")
+    Parser.add_argument("--seed", type=int, default=0)
+    Args = Parser.parse_args(argv)
+
+    Plan = GenerateLandXML(Args.output, Args.lots, Args.rms, Args.points, Args.arcs, Args.tag,
+                           Args.seed)
+    print("%d points, %d observations, %d parcels" % (len(Plan.Coords), len(Plan.Observations),
+                                                      len(Plan.Parcels)))
+
+
+if __name__ == "__main__":
+    main()
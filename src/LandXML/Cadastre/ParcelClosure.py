@@ -0,0 +1,213 @@
+'''
+Closure, perimeter and area of every parcel in a LandXML file
+The CoordGeom of each parcel (Lines and Curves) is compiled once into flat segment
+arrays and all parcels are then calculated together:
+    Misclose - sum of the segment vectors around the parcel, from the reduced
+               observation between the segment ends where there is one, otherwise
+               from the CgPoint coordinates
+    Perimeter - line lengths plus arc lengths
+    Area - shoelace over the segment ends plus the signed area between each arc and its chord
+    AreaDifference - calculated area less the declared area attribute
+Curve rotation uses the ObservationTable convention - 1 clockwise, -1 anti-clockwise, 0 for lines
+'''
+import numpy as np
+
+from LandXML import Coordinates, ObservationTable, Profiling
+
+#area differences (m2) within the larger of these are accepted
+AREA_TOLERANCE = 1.
+AREA_RELATIVE_TOLERANCE = 0.0005
+
+
+class ParcelClosure:
+
+    @Profiling.Stage("ParcelClosure")
+    def __init__(self, LandXML_Obj):
+        '''
+        Compiles and calculates all parcels with CoordGeom
+            Names, Classes, States, Declared (area attribute, NaN if missing) - per parcel
+            Parcel, StartRefs, EndRefs, CenterRefs, IsArc, Radius, Rotation - per segment
+        Calculated per parcel - MiscloseE, MiscloseN, Misclose, Perimeter, Area,
+            AreaDifference, Complete (every vertex has CgPoint coordinates)
+        :param LandXML_Obj: LandXML data object - observations are used when TraverseProps.tag is set
+        '''
+        self.Compile(LandXML_Obj)
+        self.Calculate(LandXML_Obj)
+
+    def Compile(self, LandXML_Obj):
+        '''
+        Reads the segments of each parcel's CoordGeom into arrays
+        '''
+        ns = LandXML_Obj.TraverseProps.Namespace
+        StartTag, EndTag, CenterTag, CurveTag = ns + "Start", ns + "End", ns + "Center", ns + "Curve"
+        self.Names = []
+        self.Classes = []
+        self.States = []
+        Declared = []
+        Parcel = []
+        self.StartRefs = []
+        self.EndRefs = []
+        self.CenterRefs = []
+        IsArc = []
+        Radius = []
+        Rotation = []
+
+        Parcels = LandXML_Obj.Parcels.getchildren() if LandXML_Obj.Parcels is not None else []
+        for parcel in Parcels:
+            CoordGeom = parcel.find(ns + "CoordGeom")
+            if CoordGeom is None:
+                continue
+            #(segment, Start, End, Center pntRefs) - children read in one pass
+            Segments = []
+            for segment in CoordGeom.getchildren():
+                Refs = {}
+                for child in segment:
+                    Refs[child.tag] = child.get("pntRef")
+                if StartTag in Refs and EndTag in Refs:
+                    Segments.append((segment, Refs[StartTag], Refs[EndTag], Refs.get(CenterTag)))
+            if len(Segments) == 0:
+                continue
+
+            ParcelNum = len(self.Names)
+            self.Names.append(parcel.get("name"))
+            self.Classes.append(parcel.get("class"))
+            self.States.append(parcel.get("state"))
+            Declared.append(ObservationTable.ParseFloat(parcel.get("area")))
+            for segment, StartRef, EndRef, CenterRef in Segments:
+                Parcel.append(ParcelNum)
+                self.StartRefs.append(StartRef)
+                self.EndRefs.append(EndRef)
+                if segment.tag == CurveTag:
+                    self.CenterRefs.append(CenterRef)
+                    IsArc.append(True)
+                    Radius.append(ObservationTable.ParseFloat(segment.get("radius")))
+                    Rotation.append(-1 if segment.get("rot") == "ccw" else 1)
+                else:
+                    self.CenterRefs.append(None)
+                    IsArc.append(False)
+                    Radius.append(np.nan)
+                    Rotation.append(0)
+
+        self.Declared = np.array(Declared, dtype=np.float64)
+        self.Parcel = np.array(Parcel, dtype=np.int64)
+        self.IsArc = np.array(IsArc, dtype=bool)
+        self.Radius = np.array(Radius, dtype=np.float64)
+        self.Rotation = np.array(Rotation, dtype=np.int8)
+
+    def Calculate(self, LandXML_Obj):
+        '''
+        Misclose, perimeter and area of all parcels from the segment arrays
+        '''
+        Count = len(self.Names)
+        Store = Coordinates.GetCoordinateStore(LandXML_Obj)
+        StartE, StartN = Store.GetCoordsBulk(self.StartRefs)
+        EndE, EndN = Store.GetCoordsBulk(self.EndRefs)
+        CenterE, CenterN = Store.GetCoordsBulk([Ref if Ref is not None else "" for Ref in self.CenterRefs])
+
+        dE = EndE - StartE
+        dN = EndN - StartN
+        Chord = np.hypot(dE, dN)
+
+        #arcs - radius from the centre where not given, angle subtended from the centre
+            #azimuths of the ends, otherwise the minor arc on the chord
+        Radius = np.where(np.isnan(self.Radius), np.hypot(StartE - CenterE, StartN - CenterN), self.Radius)
+        StartAzimuth = np.arctan2(StartE - CenterE, StartN - CenterN)
+        EndAzimuth = np.arctan2(EndE - CenterE, EndN - CenterN)
+        with np.errstate(invalid="ignore"):
+            Subtended = np.where(np.isnan(CenterE),
+                                 2 * np.arcsin(np.clip(Chord / (2 * Radius), -1., 1.)),
+                                 np.mod((EndAzimuth - StartAzimuth) * self.Rotation, 2 * np.pi))
+        Subtended = np.where(self.IsArc, Subtended, 0.)
+        Length = np.where(self.IsArc, Radius * Subtended, Chord)
+        #area between arc and chord - positive when the arc is anti-clockwise
+        ArcArea = np.where(self.IsArc, -self.Rotation * Radius ** 2 / 2 * (Subtended - np.sin(Subtended)), 0.)
+
+        VectorE, VectorN = self.ObservedVectors(LandXML_Obj, dE, dN)
+        Missing = np.isnan(StartE) | np.isnan(EndE) | (self.IsArc & np.isnan(Radius))
+        self.Complete = np.bincount(self.Parcel, weights=Missing, minlength=Count) == 0
+
+        self.MiscloseE = np.bincount(self.Parcel, weights=VectorE, minlength=Count)
+        self.MiscloseN = np.bincount(self.Parcel, weights=VectorN, minlength=Count)
+        self.Misclose = np.hypot(self.MiscloseE, self.MiscloseN)
+        self.Perimeter = np.bincount(self.Parcel, weights=Length, minlength=Count)
+        Shoelace = np.bincount(self.Parcel, weights=StartE * EndN - EndE * StartN, minlength=Count) / 2
+        self.Area = np.abs(Shoelace + np.bincount(self.Parcel, weights=ArcArea, minlength=Count))
+        self.AreaDifference = self.Area - self.Declared
+
+    def ObservedVectors(self, LandXML_Obj, dE, dN):
+        '''
+        Segment vectors from the reduced observations - chord azimuth and distance for arcs
+        Segments with no observation between their ends keep the coordinate differences
+        :param dE: coordinate differences of the segments
+        :param dN:
+        :return: Eastings, Northings of the segment vectors
+        '''
+        self.Observed = np.zeros(len(self.Parcel), dtype=bool)
+        if getattr(LandXML_Obj.TraverseProps, "tag", None) is None or LandXML_Obj.ReducedObs is None:
+            return dE, dN
+
+        Table = ObservationTable.GetObservationTable(LandXML_Obj)
+        StartIDs = np.array([Table.PointID(Ref) for Ref in self.StartRefs], dtype=np.int64)
+        EndIDs = np.array([Table.PointID(Ref) for Ref in self.EndRefs], dtype=np.int64)
+        Rows = np.array([Table.EdgeRows.get(frozenset(Edge), [-1])[0] for Edge in
+                         zip(StartIDs.tolist(), EndIDs.tolist())], dtype=np.int64)
+        self.Observed = Rows >= 0
+        Rows = Rows[self.Observed]
+
+        #observations measured from the segment end are reversed
+        Azimuth = np.radians(Table.Azimuth[Rows])
+        Azimuth = np.where(Table.Setup[Rows] != StartIDs[self.Observed], Azimuth + np.pi, Azimuth)
+        VectorE = dE.copy()
+        VectorN = dN.copy()
+        VectorE[self.Observed] = Table.Distance[Rows] * np.sin(Azimuth)
+        VectorN[self.Observed] = Table.Distance[Rows] * np.cos(Azimuth)
+
+        return VectorE, VectorN
+
+    def __len__(self):
+        return len(self.Names)
+
+    def AreaMismatches(self):
+        '''
+        Parcels whose calculated area differs from the declared area by more than
+            AREA_TOLERANCE or AREA_RELATIVE_TOLERANCE of the declared area
+        :return: int array of parcel numbers
+        '''
+        Tolerance = np.maximum(AREA_TOLERANCE, AREA_RELATIVE_TOLERANCE * self.Declared)
+        with np.errstate(invalid="ignore"):
+            return np.nonzero(self.Complete & (np.abs(self.AreaDifference) > Tolerance))[0]
+
+    def Result(self, ParcelNum):
+        '''
+        Calculated values of one parcel
+        :param ParcelNum: parcel number (position in Names)
+        :return: dictionary
+        '''
+        return {"name": self.Names[ParcelNum],
+                "class": self.Classes[ParcelNum],
+                "state": self.States[ParcelNum],
+                "complete": bool(self.Complete[ParcelNum]),
+                "misclose": float(self.Misclose[ParcelNum]),
+                "misclose_e": float(self.MiscloseE[ParcelNum]),
+                "misclose_n": float(self.MiscloseN[ParcelNum]),
+                "perimeter": float(self.Perimeter[ParcelNum]),
+                "area": float(self.Area[ParcelNum]),
+                "declared_area": float(self.Declared[ParcelNum]),
+                "area_difference": float(self.AreaDifference[ParcelNum])}
+
+    def Results(self):
+        return [self.Result(ParcelNum) for ParcelNum in range(len(self))]
+
+
+def GetParcelClosure(LandXML_Obj):
+    '''
+    Returns the ParcelClosure of LandXML_Obj, calculating it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: ParcelClosure
+    '''
+    Closure = getattr(LandXML_Obj, "ParcelClosure", None)
+    if Closure is None:
+        Closure = ParcelClosure(LandXML_Obj)
+        setattr(LandXML_Obj, "ParcelClosure", Closure)
+
+    return Closure
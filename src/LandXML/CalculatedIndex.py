@@ -0,0 +1,187 @@
+'''
+Hash set index of the lines and points already calculated in a data object
+(CadastralPlan or traverse) so connection tests do not loop over every line
+
+Lines are stored as unordered edges - frozenset of StartRef and EndRef
+'''
+
+class CalculatedIndex:
+
+    def __init__(self):
+        '''
+        Empty index - filled from the data object by Sync or as lines/points are added
+            Edges - edge -> number of lines on it
+            Points - calculated points, the Points attributes and the ends of lines
+        '''
+        self.Edges = {}
+        self.Points = set()
+        #lines per end point
+        self.LineEnds = {}
+        #attribute names of Lines/Points already indexed -> edge/whether a point
+            #(None/False for counters and other non line/point attributes)
+        self.LineKeys = {}
+        self.PointKeys = {}
+        #functions called with the pntRef of each newly calculated point and the
+            #attribute name of each newly indexed line
+        self.PointListeners = []
+        self.LineListeners = []
+
+    def AddLine(self, StartRef, EndRef):
+        '''
+        Adds an edge and its end points
+        '''
+        Edge = frozenset((StartRef, EndRef))
+        self.Edges[Edge] = self.Edges.get(Edge, 0) + 1
+        for PntRefNum in (StartRef, EndRef):
+            self.LineEnds[PntRefNum] = self.LineEnds.get(PntRefNum, 0) + 1
+            self.AddPoint(PntRefNum)
+
+    def RemoveLine(self, StartRef, EndRef):
+        '''
+        Removes one line on an edge - the edge and end points stay while other lines
+            or points keep them
+        '''
+        Edge = frozenset((StartRef, EndRef))
+        Count = self.Edges.get(Edge, 0) - 1
+        if Count > 0:
+            self.Edges[Edge] = Count
+        else:
+            self.Edges.pop(Edge, None)
+        for PntRefNum in (StartRef, EndRef):
+            Count = self.LineEnds.get(PntRefNum, 0) - 1
+            if Count > 0:
+                self.LineEnds[PntRefNum] = Count
+            else:
+                self.LineEnds.pop(PntRefNum, None)
+                if not self.PointKeys.get(PntRefNum, False):
+                    self.Points.discard(PntRefNum)
+
+    def AddPoint(self, PntRefNum):
+        '''
+        Adds a point and notifies PointListeners if it is new
+        '''
+        if PntRefNum in self.Points:
+            return
+        self.Points.add(PntRefNum)
+        for Listener in self.PointListeners:
+            Listener(PntRefNum)
+
+    def IndexLine(self, key, line):
+        '''
+        Indexes attribute key of a Lines data object - only line objects add an edge
+        '''
+        if hasattr(line, "StartRef") and hasattr(line, "EndRef"):
+            self.LineKeys[key] = (line.StartRef, line.EndRef)
+            self.AddLine(line.StartRef, line.EndRef)
+            for Listener in self.LineListeners:
+                Listener(key)
+        else:
+            self.LineKeys[key] = None
+
+    def IndexPoint(self, key, point):
+        '''
+        Indexes attribute key of a Points data object - only point objects are points,
+            counters and other scalar attributes are skipped
+        '''
+        self.PointKeys[key] = hasattr(point, "__dict__")
+        if self.PointKeys[key]:
+            self.AddPoint(key)
+
+    def AddPointListener(self, Listener):
+        '''
+        Registers Listener to be called with each newly calculated point
+        Called straight away for points already in the index
+        :param Listener: function taking a pntRef
+        '''
+        self.PointListeners.append(Listener)
+        for PntRefNum in list(self.Points):
+            Listener(PntRefNum)
+
+    def AddLineListener(self, Listener):
+        '''
+        Registers Listener to be called with the attribute name of each newly indexed line
+        Called straight away for lines already in the index
+        :param Listener: function taking a Lines attribute name
+        '''
+        self.LineListeners.append(Listener)
+        for key, Ends in list(self.LineKeys.items()):
+            if Ends is not None:
+                Listener(key)
+
+    def HasEdge(self, SetupID, TargetID):
+        '''
+        Checks if a line between SetupID and TargetID has been calculated - either direction
+        :return: Boolean
+        '''
+        return frozenset((SetupID, TargetID)) in self.Edges
+
+    def HasPoint(self, PntRefNum):
+        return PntRefNum in self.Points
+
+    def Sync(self, DataObj):
+        '''
+        Indexes lines or points added to or removed from DataObj without going through
+            AddLine/AddPoint
+        AddLine/AddPoint keep the index in step, so only the number of attributes is
+            compared - O(1) unless it changed. A line or point replaced under a new name
+            outside AddLine/AddPoint (one removed, one added) is not picked up
+        :param DataObj: object with Lines and Points data objects
+        '''
+        Lines = DataObj.Lines.__dict__
+        if len(Lines) != len(self.LineKeys):
+            for key in self.LineKeys.keys() - Lines.keys():
+                Ends = self.LineKeys.pop(key)
+                if Ends is not None:
+                    self.RemoveLine(*Ends)
+            for key in Lines.keys() - self.LineKeys.keys():
+                self.IndexLine(key, Lines[key])
+
+        Points = DataObj.Points.__dict__
+        if len(Points) != len(self.PointKeys):
+            for key in self.PointKeys.keys() - Points.keys():
+                if self.PointKeys.pop(key) and key not in self.LineEnds:
+                    self.Points.discard(key)
+            for key in Points.keys() - self.PointKeys.keys():
+                self.IndexPoint(key, Points[key])
+
+
+def GetCalculatedIndex(DataObj):
+    '''
+    Returns the CalculatedIndex of DataObj synced with its Lines and Points
+    Index is created on first use and stored on DataObj
+    :param DataObj: CadastralPlan or traverse data object
+    :return: CalculatedIndex
+    '''
+    Index = getattr(DataObj, "CalculatedIndex", None)
+    if Index is None:
+        Index = CalculatedIndex()
+        setattr(DataObj, "CalculatedIndex", Index)
+    Index.Sync(DataObj)
+
+    return Index
+
+def AddLine(DataObj, key, line):
+    '''
+    Adds line to DataObj.Lines and to its index
+    :param DataObj: CadastralPlan or traverse data object
+    :param key: attribute name for the line
+    :param line: line object with StartRef and EndRef
+    '''
+    Index = GetCalculatedIndex(DataObj)
+    #line replacing another under the same key
+    Ends = Index.LineKeys.get(key)
+    if Ends is not None:
+        Index.RemoveLine(*Ends)
+    setattr(DataObj.Lines, key, line)
+    Index.IndexLine(key, line)
+
+def AddPoint(DataObj, PntRefNum, point):
+    '''
+    Adds point to DataObj.Points and to its index
+    :param DataObj: CadastralPlan or traverse data object
+    :param PntRefNum: point reference - attribute name for the point
+    :param point: point object
+    '''
+    Index = GetCalculatedIndex(DataObj)
+    setattr(DataObj.Points, PntRefNum, point)
+    Index.IndexPoint(PntRefNum, point)
@@ -1,29 +1,147 @@
 '''
 Methods to retreive connections for a given point in the Land XML file
 '''
+import numpy as np
+
+from LandXML import ObservationTable, Profiling
+
+class ConnectionIndex:
+
+    def __init__(self, LandXML_Obj, Cached=None):
+        '''
+        Adjacency index of the reduced observations, built once per LandXML file
+        Maps each pntRef to the observations it is a setup or target of
+        Built from the ObservationTable - the rows of point ID are
+            AdjacencyRows[AdjacencyStart[ID]:AdjacencyStart[ID + 1]] in document order
+            and their elements are looked up the first time the point is queried
+        :param LandXML_Obj: LandXML data object - TraverseProps.tag must be set
+        :param Cached: (AdjacencyStart, AdjacencyRows) from the plan cache
+        '''
+        self.tag = LandXML_Obj.TraverseProps.tag
+        self.Table = ObservationTable.GetObservationTable(LandXML_Obj)
+        if Cached is None:
+            Cached = AdjacencyArrays(self.Table)
+        self.AdjacencyStart, self.AdjacencyRows = Cached
+        # pntRef -> list of observation elements, filled as points are queried
+        self.Adjacency = {}
+
+    def PointRows(self, PntRefNum):
+        '''
+        Table rows of the observations connected to PntRefNum
+        :return: int array
+        '''
+        PointID = self.Table.PointIDs.get(PntRefNum)
+        if PointID is None:
+            return self.AdjacencyRows[:0]
+        return self.AdjacencyRows[self.AdjacencyStart[PointID]:self.AdjacencyStart[PointID + 1]]
+
+    def Observations(self, PntRefNum):
+        '''
+        Returns the list of observations connected to PntRefNum
+        :param PntRefNum: pntRef to query
+        :return: list of observation elements (empty if no connections)
+        '''
+        Observations = self.Adjacency.get(PntRefNum)
+        if Observations is None:
+            Observations = [self.Table.Element(Row) for Row in self.PointRows(PntRefNum).tolist()]
+            self.Adjacency[PntRefNum] = Observations
+
+        return Observations
+
+    def Neighbours(self, PntRefNum):
+        '''
+        Points at the other end of the observations connected to PntRefNum
+        Read from the table arrays - no elements are looked up
+        :param PntRefNum: pntRef to query
+        :return: list of pntRefs, one per observation (as OtherEnd)
+        '''
+        Rows = self.PointRows(PntRefNum)
+        Setup = self.Table.Setup[Rows]
+        Other = np.where(Setup == self.Table.PointIDs.get(PntRefNum, -1), self.Table.Target[Rows], Setup)
+
+        return [self.Table.PointNames[PointID] for PointID in Other.tolist()]
+
+    def Degree(self, PntRefNum):
+        '''
+        Number of observations connected to PntRefNum
+        :param PntRefNum: pntRef to query
+        :return: int
+        '''
+        return len(self.PointRows(PntRefNum))
+
+    def EndPoints(self, Observation):
+        '''
+        Normalised setup and target IDs of an observation
+        :param Observation: reduced observation element
+        :return: SetupID, TargetID
+        '''
+        try:
+            Row = self.Table.Row(Observation)
+            return self.Table.PointNames[self.Table.Setup[Row]], self.Table.PointNames[self.Table.Target[Row]]
+        except KeyError:
+            return Observation.get("setupID").replace(self.tag, ""), \
+                   Observation.get("targetSetupID").replace(self.tag, "")
+
+    def OtherEnd(self, Observation, PntRefNum):
+        '''
+        Gets the point at the other end of Observation from PntRefNum
+        :param Observation: reduced observation element
+        :param PntRefNum: pntRef at the known end of the observation
+        :return: TargetID
+        '''
+        SetupID, TargetID = self.EndPoints(Observation)
+        if SetupID == PntRefNum:
+            return TargetID
+        return SetupID
+
+
+def AdjacencyArrays(Table):
+    '''
+    Groups the rows of Table by the points they connect - self connections are listed once
+    :param Table: ObservationTable
+    :return: AdjacencyStart (offsets by point ID, one extra at the end), AdjacencyRows
+    '''
+    Rows = np.arange(len(Table), dtype=np.int64)
+    Other = Table.Target != Table.Setup
+    PointIDs = np.concatenate((Table.Setup, Table.Target[Other])).astype(np.int64)
+    Rows = np.concatenate((Rows, Rows[Other]))
+    # lexsort uses the last key as the primary key
+    Order = np.lexsort((Rows, PointIDs))
+    Counts = np.bincount(PointIDs, minlength=len(Table.PointNames))
+    AdjacencyStart = np.zeros(len(Counts) + 1, dtype=np.int64)
+    np.cumsum(Counts, out=AdjacencyStart[1:])
+
+    return AdjacencyStart, Rows[Order]
+
+def GetConnectionIndex(LandXML_Obj):
+    '''
+    Returns the ConnectionIndex of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: ConnectionIndex
+    '''
+    Index = getattr(LandXML_Obj, "ConnectionIndex", None)
+    if Index is None or Index.tag != LandXML_Obj.TraverseProps.tag:
+        Index = ConnectionIndex(LandXML_Obj)
+        setattr(LandXML_Obj, "ConnectionIndex", Index)
+
+    return Index
+
 
 class AllConnections:
 
+    @Profiling.Stage("AllConnections")
     def __init__(self, PntRefNum, LandXML_Obj):
         '''
         Looks for connections containing PntRefNUm in ReducedObservations
+        Connections are read from the ConnectionIndex of LandXML_Obj
         :param PntRefNum: Integer refNum to pointsin the LandXML file
         :param ReducedObs: LandXML element from the Survey parent element
         '''
-        #Counter for number of connections for PntRefNum
-        ConnectionNum = 0
-        
-        # loop through observations
-        for ob in LandXML_Obj.ReducedObs.getchildren():
-            #check if observation contains PntRefNum
-            attrib = ob.attrib
-            if "targetSetupID" in attrib.keys():
-                SetupID = ob.get("setupID").replace(LandXML_Obj.TraverseProps.tag, "")
-                TargetID = ob.get("targetSetupID").replace(LandXML_Obj.TraverseProps.tag, "")
-                if PntRefNum == SetupID or PntRefNum == TargetID:
-                    # pntRef in ob -> add to Obs
-                    ConnectionNum += 1
-                    setattr(self, ("connection" + str(ConnectionNum)), ob)
+        Index = GetConnectionIndex(LandXML_Obj)
+
+        #add each connection as connection1, connection2 ...
+        for ConnectionNum, ob in enumerate(Index.Observations(PntRefNum), 1):
+            setattr(self, ("connection" + str(ConnectionNum)), ob)
 
 
 def RemoveSelectedConnections(Observations, RemoveObs):
@@ -41,4 +159,4 @@ def RemoveSelectedConnections(Observations, RemoveObs):
 
         
 
-        
\ No newline at end of file
+        
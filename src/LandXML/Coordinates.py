@@ -1,6 +1,93 @@
 '''
 Set routines to work with coordinates in LandXML files
 '''
+import numpy as np
+
+class CoordinateStore:
+
+    def __init__(self, CgPoints, Cached=None):
+        '''
+        Array backed store of CgPoint coordinates, built once per LandXML file
+        Coordinate text is parsed once - Northing first, leading spaces ignored
+        :param CgPoints: CgPoints element from LandXML
+        :param Cached: (Names, Eastings, Northings) from the plan cache - CgPoints is not read
+        '''
+        if Cached is not None:
+            self.Names, self.Eastings, self.Northings = Cached
+            self.Index = {Point_Name: Row for Row, Point_Name in enumerate(self.Names)}
+            return
+
+        #point name -> row in Eastings/Northings
+        self.Index = {}
+        Eastings = []
+        Northings = []
+
+        for point in CgPoints.getchildren():
+            Point_Name = point.get("name")
+            if Point_Name is None or point.text is None:
+                continue
+            Coords = point.text.split()
+            self.Index[Point_Name] = len(Eastings)
+            Northings.append(float(Coords[0]))
+            Eastings.append(float(Coords[1]))
+
+        self.Names = list(self.Index.keys())
+        self.Eastings = np.array(Eastings, dtype=np.float64)
+        self.Northings = np.array(Northings, dtype=np.float64)
+
+    def __contains__(self, PntRefNum):
+        return PntRefNum in self.Index
+
+    def __len__(self):
+        return len(self.Index)
+
+    def GetCoords(self, PntRefNum):
+        '''
+        Single point lookup
+        :param PntRefNum: point name
+        :return: East, North
+        '''
+        Row = self.Index[PntRefNum]
+        return float(self.Eastings[Row]), float(self.Northings[Row])
+
+    def Rows(self, PntRefNums):
+        '''
+        Row numbers of a list of point names, -1 where the point is not in CgPoints
+        :param PntRefNums: list of point names
+        :return: int array of rows
+        '''
+        return np.array([self.Index.get(PntRefNum, -1) for PntRefNum in PntRefNums],
+                        dtype=np.int64)
+
+    def GetCoordsBulk(self, PntRefNums):
+        '''
+        Vectorised lookup for a list of points
+        Points not in CgPoints return NaN coordinates
+        :param PntRefNums: list of point names
+        :return: Eastings, Northings (arrays in order of PntRefNums)
+        '''
+        Rows = self.Rows(PntRefNums)
+        Found = Rows >= 0
+        Eastings = np.full(len(Rows), np.nan)
+        Northings = np.full(len(Rows), np.nan)
+        Eastings[Found] = self.Eastings[Rows[Found]]
+        Northings[Found] = self.Northings[Rows[Found]]
+
+        return Eastings, Northings
+
+
+def GetCoordinateStore(LandXML_Obj):
+    '''
+    Returns the CoordinateStore of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: CoordinateStore
+    '''
+    Store = getattr(LandXML_Obj, "CoordinateStore", None)
+    if Store is None:
+        Store = CoordinateStore(LandXML_Obj.Coordinates)
+        setattr(LandXML_Obj, "CoordinateStore", Store)
+
+    return Store
 
 def getPointCoords(PntRefNum, LandXML_Obj):
     '''
@@ -10,18 +97,6 @@ def getPointCoords(PntRefNum, LandXML_Obj):
     :return:
     '''
 
-    #loop through points to get coords of pntRef
-    for point in LandXML_Obj.Coordinates:
-        Point_Name = point.get("name")
-        if Point_Name == PntRefNum:
-            #check for leading space in coordinate string
-            if point.text.split(' ')[0] == "":
-                East = float(point.text.split(' ')[2])
-                North = float(point.text.split(' ')[1])
-            else:
-                East = float(point.text.split(' ')[1])
-                North = float(point.text.split(' ')[0])
-
-            break
-
-    return East, North
\ No newline at end of file
+    East, North = GetCoordinateStore(LandXML_Obj).GetCoords(PntRefNum)
+
+    return East, North
@@ -0,0 +1,120 @@
+'''
+Plain point, line, traverse and plan data objects for the traverse workflow
+Used when traverses are run without the GUI - the GUI front-end sets gui.DataObjects
+to a DataObjectFactory creating its own objects (CadastreClasses, TraverseOperations),
+so the core package never imports the GUI modules
+'''
+import numpy as np
+
+
+class Point(object):
+
+    def __init__(self, PntRefNum, E, N, NorthingScreen, Elev, Code, Layer):
+        '''
+        Calculated point - same arguments as CadastreClasses.Point
+        :param PntRefNum: point reference from the LandXML
+        :param E: Easting
+        :param N: Northing
+        :param NorthingScreen: Northing in scene coordinates
+        :param Elev: elevation, None if not known
+        :param Code: point code (eg RMSSM-1234)
+        :param Layer: layer name (eg "REFERENCE MARKS")
+        '''
+        self.PntRefNum = PntRefNum
+        self.E = E
+        self.N = N
+        self.NorthingScreen = NorthingScreen
+        self.Elev = Elev
+        self.Code = Code
+        self.Layer = Layer
+
+class Line(object):
+
+    def __init__(self, StartRef, EndRef, bearing, distance, Layer, radius=np.nan, arcLength=np.nan,
+                 rotation=0):
+        '''
+        Calculated traverse side - arcs have a finite radius
+        :param StartRef: point the side is calculated from
+        :param EndRef: point the side calculates
+        :param bearing: bearing from StartRef in decimal degrees (chord bearing for arcs)
+        :param distance: horizontal distance (chord length for arcs)
+        :param Layer: layer name
+        :param radius: arc radius, NaN for lines
+        :param arcLength: arc length, NaN for lines
+        :param rotation: 1 for clockwise arcs, -1 for anti-clockwise
+        '''
+        self.StartRef = StartRef
+        self.EndRef = EndRef
+        self.bearing = bearing
+        self.distance = distance
+        self.Layer = Layer
+        self.radius = radius
+        self.arcLength = arcLength
+        self.rotation = rotation
+
+class Traverse(object):
+
+    def __init__(self, TraverseType, PntRefNum, FirstTraverse, point):
+        '''
+        Traverse started from point
+            refPnts - pntRefs in traverse order, Points/Lines - calculated points and sides
+        :param TraverseType: traverse type (eg "REFERENCE MARKS")
+        :param PntRefNum: start point reference
+        :param FirstTraverse: True for the first traverse of the plan
+        :param point: start point data object
+        '''
+        self.type = TraverseType
+        self.FirstTraverse = FirstTraverse
+        self.refPnts = [PntRefNum]
+        self.Points = PointsObj()
+        self.Lines = LinesObj()
+        setattr(self.Points, PntRefNum, point)
+
+class CadastralPlanObj(object):
+
+    def __init__(self):
+        '''
+        Set up plan object with the attributes queried by the traverse workflow
+        '''
+        self.Points = PointsObj()
+        self.Lines = LinesObj()
+
+class PointsObj(object):
+    pass
+
+class LinesObj(object):
+    pass
+
+
+def NewTraverse(TraverseType, PntRefNum, FirstTraverse, point):
+    '''
+    Creates a traverse - same arguments as TraverseOperations.NewTraverse
+    :return: Traverse
+    '''
+    return Traverse(TraverseType, PntRefNum, FirstTraverse, point)
+
+
+class DataObjectFactory(object):
+    '''
+    Creates the point, line and traverse objects of the traverse workflow
+    Plain objects from this module by default - the GUI front-end replaces Point and
+        NewTraverse with its own
+    '''
+    Point = Point
+    Line = Line
+    NewTraverse = staticmethod(NewTraverse)
+
+
+def GetDataObjects(gui):
+    '''
+    Returns the DataObjectFactory of gui - gui.DataObjects if set, otherwise a factory
+    of the plain objects in this module
+    :param gui: gui data object (or HeadlessSession)
+    :return: DataObjectFactory
+    '''
+    Factory = getattr(gui, "DataObjects", None)
+    if Factory is None:
+        Factory = DataObjectFactory()
+        setattr(gui, "DataObjects", Factory)
+
+    return Factory
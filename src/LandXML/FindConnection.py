@@ -2,9 +2,10 @@
 Workflow and decision tree to find connection for traverse
 '''
 from LandXML.RefMarks import RM_ConnectionFilter
-from LandXML import TraverseClose
+from LandXML import TraverseClose, TraverseNoConnection, Connections, CalculatedIndex, Profiling
 
 class FindNextConnection:
+    @Profiling.Stage("FindNextConnection")
     def __init__(self, Observations, traverse, PntRefNum,
                  TraverseProps, CadastralPlan, LandXML_Obj):
         '''
@@ -19,6 +20,8 @@ class FindNextConnection:
         self.CadastralPlan = CadastralPlan
         self.LandXML_Obj = LandXML_Obj
         self.TraverseClose = False
+        #ConnectionRank of each candidate from RM_ConnectionFilter, best first
+        self.Ranked = []
         self.Connection = self.FilterConnections()
 
     def FilterConnections(self):
@@ -29,10 +32,12 @@ class FindNextConnection:
         '''
         # 1) Remove connections already calculated and those where end point is a traverse midpoint
         # - lines in CadastralPlanObj and traverse
-        self.Observations = self.RemoveCalculatedConnections(self.Observations, self.CadastralPlan)
+        self.Observations = self.RemoveCalculatedObservations(self.Observations, self.CadastralPlan)
+        Profiling.Count("FindNextConnection.candidates", len(self.Observations.__dict__))
         if len(self.Observations.__dict__.keys()) == 0:
             # deal with no connection
-            TraverseNoConnection(self.traverse, self.TraverseProps, self.PntRefNum, self.LandXML_Obj)
+            TraverseNoConnection.TraverseNoConnection(self.traverse, self.TraverseProps, self.PntRefNum,
+                                                      self.LandXML_Obj)
             return None
 
         # 2) Check whether a traverse close is possible - only RMs or BDY traverse
@@ -44,15 +49,16 @@ class FindNextConnection:
             # Close operations
             print("Close found")
             self.TraverseClose = self.CloseCheck.Close
-            return self.Close.Connection
+            return self.Close.CloseConnection
         
         #3) Perform filters specific to traverse type
         if self.TraverseProps.TraverseType == "REFERENCE MARKS":
-            self.Observations = RM_ConnectionFilter.FilterObservations(self.Observations,
-                                                                     self.traverse, 
-                                                                     self.CadastralPlan,
-                                                                     self.LandXML_Obj,
-                                                                     self.PntRefNum)
+            Connection, self.Ranked = RM_ConnectionFilter.FilterConnections(self.Observations,
+                                                                            self.traverse,
+                                                                            self.CadastralPlan,
+                                                                            self.LandXML_Obj,
+                                                                            self.PntRefNum)
+            return Connection
         elif self.TraverseProps.TraverseType == "BOUNDARY":
             # 2) Check whether a traverse close is possible
             Close = CloseCheck.RM_Close(self.LandXML_Obj.TraverseProps, self.gui.CadastralPlan,
@@ -75,42 +81,25 @@ class FindNextConnection:
         :return: updated Observations
         '''
 
+        # hash set indexes of calculated lines and points
+        PlanIndex = CalculatedIndex.GetCalculatedIndex(CadastralPlan)
+        TraverseIndex = CalculatedIndex.GetCalculatedIndex(self.traverse)
+        ConnectionIndex = Connections.GetConnectionIndex(self.LandXML_Obj)
+
         # loop through Observations
-        for key in Observations.__dict__.keys():
+        for key in list(Observations.__dict__.keys()):
             connection = Observations.__getattribute__(key)
+            SetupID, TargetSetupID = ConnectionIndex.EndPoints(connection)
+            EndRefNum = ConnectionIndex.OtherEnd(connection, self.PntRefNum)
             # check if cadastralPlan contains connection
-            if self.CheckLinesObject(connection, CadastralPlan.Lines, CadastralPlan.Points):
+            if PlanIndex.HasEdge(SetupID, TargetSetupID):
+                delattr(Observations, key)
+            # check if traverse already contains connection
+            elif TraverseIndex.HasEdge(SetupID, TargetSetupID):
                 delattr(Observations, key)
-            # check if traverse already contains connection or end point is traverse midpoint
-            elif self.CheckLinesObject(connection, self.traverse.Lines, self.traverse.Points):
+            # end point is a traverse midpoint - first point is kept for closes
+            elif TraverseIndex.HasPoint(EndRefNum) and EndRefNum != self.traverse.refPnts[0]:
                 delattr(Observations, key)
-            #check
 
         return Observations
 
-
-    def CheckLinesObject(self, connection, Lines, Points):
-        '''
-        Checks Lines data object if it contains connection
-        :param connection:
-        :param Lines:
-        :return:
-        '''
-        SetupID = connection.get("setupID").replace(self.TraverseProps.tag, "")
-        TargetSetupID = connection.get("targetSetupID").replace(self.TraverseProps.tag, "")
-        for key in Lines.__dict__.keys():
-            if key == "LineNum":
-                continue
-
-            line = Lines.__getattribute__(key)
-            StartRef = line.__getattribute__("StartRef")
-            EndRef = line.__getattribute__("StartRef")
-
-            if (SetupID == StartRef and TargetSetupID == EndRef) or \
-                    (SetupID == EndRef and TargetSetupID == StartRef):
-                return True
-            elif hasattr(Points, EndRefNum):
-                return True
-
-        return False
-
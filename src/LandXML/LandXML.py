@@ -4,11 +4,11 @@ Coordinates the processing of landXML files
 - calls to create objects
     - landXML group
     - landXML traverse properties
+GUI front-end - points and traverses are created as the GUI's CadastreClasses and
+TraverseOperations objects, set on the gui as its DataObjects factory
 '''
 
-from PyQt5.QtWidgets import QFileDialog
-
-from LandXML import LandXML_Traverse_Props, LandXML_IO
+from LandXML import DataObjects, LandXML_Traverse_Props, LandXML_IO, LandXML_Objects
 from LandXML.RefMarks import RefMark_Traverse
 
 
@@ -21,34 +21,39 @@ def LandXML(gui):
 
     #get LandXML props object
     TraverseProps = LandXML_Traverse_Props.TraverseProps()
+    #traverse workflow creates the GUI's point and traverse objects
+    if getattr(gui, "DataObjects", None) is None:
+        setattr(gui, "DataObjects", GuiDataObjects())
+
+    #load and traverse on a worker thread - points are drawn in batches as they are calculated
+    if getattr(TraverseProps, "Background", True):
+        LandXMLFile = LandXML_IO.SelectLandXMLFile()
+        if LandXMLFile is not None:
+            from LandXML import TraverseWorker
+            TraverseWorker.StartTraverse(gui, LandXMLFile, TraverseProps)
+        return
     
     #LandXML dialog and file load
-    LandXML_Obj = LandXML_IO.main(TraverseProps)
+    LandXML_Obj = LandXML_IO.main(TraverseProps, gui)
 
     if LandXML_Obj is not None:
-        #get connection tag in reduced observaations, assign as TraverseProps.tag
-        setattr(TraverseProps, "tag", ReducedObsTag(LandXML_Obj))
-        setattr(LandXML_Obj, "TraverseProps", TraverseProps)
-    
-    
+        #get connection tag and build the observation indexes
+        LandXML_Obj = LandXML_Objects.PrepareTraverse(LandXML_Obj, TraverseProps)
+        LandXML_Objects.SaveToCache(LandXML_Obj)
+
         if LandXML_Obj.RefMarks:
             RefMark_Traverse.main(LandXML_Obj, gui)
 
-def ReducedObsTag(LandXML_Obj):
+def GuiDataObjects():
     '''
-    Determines what tag is used in the Reduced Observation connection
-    :param LandXML_Obj:
-    :return:
+    DataObjectFactory creating the GUI's point and traverse objects
+    :return: DataObjectFactory
     '''
+    import CadastreClasses
+    from TraverseOperations import TraverseOperations
 
-    Obs = LandXML_Obj.ReducedObs.getchildren()[0]
-    #possible tags
-    tags = ["IS-", "IS", "S-"]
-    ID = Obs.get("setupID")
-    for tag in tags:
-        tagLen = len(tag)
-        if ID[:(tagLen)] == tag:
-            return tag
-
-
+    Factory = DataObjects.DataObjectFactory()
+    Factory.Point = CadastreClasses.Point
+    Factory.NewTraverse = TraverseOperations.NewTraverse
 
+    return Factory
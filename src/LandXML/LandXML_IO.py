@@ -1,67 +1,69 @@
 '''
 Workflow to prompt user to select landXML file and loads its objects
+PyQt5 is only imported when the file dialog is opened
 '''
 
-from PyQt5.QtWidgets import QDialog, QFileDialog
-from GUI_Objects import Fonts, ObjectStyleSheets, GroupBoxes, InputObjects, ButtonObjects
-from LandXML import LandXML_Objects
-import MessageBoxes
+from LandXML import LandXML_Objects, TraverseObserver
 
 
-def main(TraverseProps):
+def main(TraverseProps, gui=None):
     '''
     Calls the QDialog to select landXML
     Loads landXML and creates data objects
+    :param gui: gui data object - messages are sent to its observer
     :return: 
     '''
     
     #Get LandXML file from QFileDialog
-    Dialog = SelectLandXMLFile()
-    LandXMLFile = Dialog.file
+    LandXMLFile = SelectLandXMLFile()
 
     if LandXMLFile is not None:
         #Get LandXML objects from file
         LandXML_Obj = LandXML_Objects.main(LandXMLFile, TraverseProps)
-        setattr(LandXML_Obj, "TriedConnections", TriedConnections())
+        setattr(LandXML_Obj, "TriedConnections", LandXML_Objects.TriedConnections())
 
         # Check for Reference marks in landXML
-        setattr(LandXML_Obj, "RefMarks", RefMarkCheck(LandXML_Obj, LandXMLFile))
+        if gui is not None:
+            Observer = TraverseObserver.GetObserver(gui)
+        else:
+            Observer = TraverseObserver.SceneObserver(None)
+        setattr(LandXML_Obj, "RefMarks", RefMarkCheck(LandXML_Obj, LandXMLFile, Observer))
 
         return LandXML_Obj
 
     return None
 
-class SelectLandXMLFile(QFileDialog):
-    def __init__(self):
-        super().__init__()
-        dialog = QFileDialog(self)
-        dialog.setFileMode(QFileDialog.ExistingFile)
-        dialog.setNameFilter("XML files (*.xml)")
-        dialog.selectNameFilter("XML files (*.xml)")
-        if dialog.exec_():
-            self.file = dialog.selectedFiles()[0]
-        else:
-            self.file = None
-            
-        self.accept()
-        
-class TriedConnections(object):
-    pass
+def SelectLandXMLFile():
+    '''
+    Opens a QFileDialog to select a LandXML file
+    :return: selected file, None if the dialog was cancelled
+    '''
+    from PyQt5.QtWidgets import QFileDialog
 
-def RefMarkCheck(LandXML_Obj, LandXMLFile):
+    dialog = QFileDialog()
+    dialog.setFileMode(QFileDialog.ExistingFile)
+    dialog.setNameFilter("XML files (*.xml)")
+    dialog.selectNameFilter("XML files (*.xml)")
+    if dialog.exec_():
+        return dialog.selectedFiles()[0]
+
+    return None
+        
+def RefMarkCheck(LandXML_Obj, LandXMLFile, Observer=None):
     '''
     Checks if there are SSMs/PMs in the LandXML file
     Effects the traverse workflow
     :param LandXML_Obj:
+    :param Observer: TraverseObserver told when there are no RMs
     :return: boolean whether RMs are present or not
     '''
 
-    for monument in LandXML_Obj.Monuments.getchildren():
-        markType = monument.get("type")
-        if markType == "SSM" or markType == "PM":
-            return True
-    
+    if LandXML_Objects.HasRefMarks(LandXML_Obj):
+        return True
+
+    if Observer is None:
+        Observer = TraverseObserver.TraverseObserver()
     msg = "No SSMs or PMs in the selected LandXML file: " + LandXMLFile 
-    MessageBoxes.genericMessage(msg, "No Reference Marks in LandXML")
+    Observer.Message(msg, "No Reference Marks in LandXML")
     return False
         
\ No newline at end of file
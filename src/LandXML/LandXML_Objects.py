@@ -3,20 +3,35 @@ Load landXML file into data objects
 '''
 from lxml import etree
 
+from LandXML import Coordinates, BDY_Connections, Connections, ObservationTable, PlanCache, Profiling
+from LandXML.RefMarks import RefMarkQueries
+
+#element attributes of the data object - read lazily for plans loaded from the cache
+ELEMENT_ATTRIBUTES = ("Monuments", "Coordinates", "Parcels", "ObservationGroups", "ReducedObs")
+
+@Profiling.Stage("parse")
 def main(file, TraverseProps):
     '''
     opens landXML file and puts elements in relevant dataobjects of the landXML class
+    File is streamed so only the elements used by the traverse workflow are kept
     :param file:
     :return:
     '''
+    #compiled plan from the cache directory if the file has been opened before
+    Cache = PlanCache.GetPlanCache(TraverseProps)
+    if Cache is not None:
+        LandXML_Obj = Cache.Load(file, TraverseProps)
+        if LandXML_Obj is not None:
+            return LandXML_Obj
+
     #Create data object to pass around program
     LandXML_Obj = FileObj()
+    #path kept so worker processes can reload the file
+    setattr(LandXML_Obj, "File", file)
+    setattr(LandXML_Obj, "PlanCache", Cache)
 
-    #open landXML file
-    lxml = etree.parse(file)
-
-    ##populated data classes of LandXML_Obj
-    LandXML_Obj = PopulateLandXML_Object(lxml, LandXML_Obj, TraverseProps)
+    #stream landXML file and populate data classes of LandXML_Obj
+    LandXML_Obj = StreamLandXML_Object(file, LandXML_Obj, TraverseProps)
     
     return LandXML_Obj
 
@@ -36,10 +51,163 @@ def PopulateLandXML_Object(lxml, LandXML_Obj, TraverseProps):
     SurveyHeader = Survey.find(TraverseProps.Namespace + "SurveyHeader")
     setattr(LandXML_Obj, "DP", SurveyHeader.get("name"))
     # get reduced observations
+    LandXML_Obj.ObservationGroups = Survey.findall(TraverseProps.Namespace + "ObservationGroup")
     LandXML_Obj.ReducedObs = Survey.find(TraverseProps.Namespace + "ObservationGroup")
-    
+
+    LandXML_Obj = BuildIndexes(LandXML_Obj, TraverseProps)
+
+    return LandXML_Obj
+
+def StreamLandXML_Object(file, LandXML_Obj, TraverseProps):
+    '''
+    Streams landXML file with iterparse and adds the elements used by the traverse workflow
+        to LandXML_Obj. Same attributes as PopulateLandXML_Object
+    Kept elements are detached from the document, everything else is cleared once parsed
+        so peak memory is bounded by the kept elements
+    :param file: path or file object of the landXML file
+    :param LandXML_Obj:
+    :param TraverseProps:
+    :return: LandXML_Obj
+    '''
+
+    ns = TraverseProps.Namespace
+    #kept elements and the path of their parent from the root element
+    KeepElements = {ns + "Monuments": (), ns + "CgPoints": (), ns + "Parcels": (),
+                    ns + "SurveyHeader": (ns + "Survey",),
+                    ns + "ObservationGroup": (ns + "Survey",)}
+    Kept = {}
+    ObservationGroups = []
+    #path of open elements below the root
+    Path = []
+    KeepDepth = None
+
+    for event, elem in etree.iterparse(file, events=("start", "end"), remove_comments=True):
+        if event == "start":
+            Path.append(elem.tag)
+            #check if a kept element is opened at its expected location
+            if KeepDepth is None and len(Path) > 1 and elem.tag in KeepElements and \
+                    tuple(Path[1:-1]) == KeepElements[elem.tag]:
+                KeepDepth = len(Path)
+            continue
+
+        Depth = len(Path)
+        Path.pop()
+        #inside a kept element - leave for the whole element
+        if KeepDepth is not None and Depth > KeepDepth:
+            continue
+
+        Parent = elem.getparent()
+        if KeepDepth == Depth:
+            #detach kept element from document so cleared siblings can be freed
+            KeepDepth = None
+            if elem.tag == ns + "ObservationGroup":
+                ObservationGroups.append(elem)
+            elif elem.tag not in Kept:
+                Kept[elem.tag] = elem
+            Parent.remove(elem)
+            continue
+
+        #element not used - free it and any earlier siblings
+        elem.clear()
+        if Parent is not None:
+            while elem.getprevious() is not None:
+                del Parent[0]
+
+    LandXML_Obj.Monuments = Kept.get(ns + "Monuments")
+    LandXML_Obj.Coordinates = Kept.get(ns + "CgPoints")
+    LandXML_Obj.Parcels = Kept.get(ns + "Parcels")
+    # get DP number
+    SurveyHeader = Kept.get(ns + "SurveyHeader")
+    setattr(LandXML_Obj, "DP", SurveyHeader.get("name") if SurveyHeader is not None else None)
+    # get reduced observations
+    LandXML_Obj.ObservationGroups = ObservationGroups
+    LandXML_Obj.ReducedObs = ObservationGroups[0] if len(ObservationGroups) > 0 else None
+
+    LandXML_Obj = BuildIndexes(LandXML_Obj, TraverseProps)
+
     return LandXML_Obj
 
+@Profiling.Stage("index")
+def BuildIndexes(LandXML_Obj, TraverseProps):
+    '''
+    Builds the lookup structures that only depend on the loaded elements
+    :param LandXML_Obj:
+    :param TraverseProps:
+    :return: LandXML_Obj
+    '''
+
+    # hashed coordinate store for CgPoints
+    LandXML_Obj.CoordinateStore = Coordinates.CoordinateStore(LandXML_Obj.Coordinates)
+    # vertexes of proposed lots for boundary connection tests
+    LandXML_Obj.BdyVertices = BDY_Connections.ProposedLotVertices(LandXML_Obj.Parcels, TraverseProps)
+    # monument lookup table for RM queries
+    LandXML_Obj.MonumentTable = RefMarkQueries.MonumentTable(LandXML_Obj)
+
+    return LandXML_Obj
+
+
+@Profiling.Stage("PrepareTraverse")
+def PrepareTraverse(LandXML_Obj, TraverseProps):
+    '''
+    Sets the reduced observation connection tag and builds the indexes that need it
+    :param LandXML_Obj:
+    :param TraverseProps:
+    :return: LandXML_Obj
+    '''
+
+    #columnar table of reduced observations and connection index - kept if loaded from the
+        #cache, where the connection tag is known without reading the observations
+    Table = getattr(LandXML_Obj, "ObservationTable", None)
+    Index = getattr(LandXML_Obj, "ConnectionIndex", None)
+    if Table is not None and Index is not None:
+        setattr(TraverseProps, "tag", Table.tag)
+        setattr(LandXML_Obj, "TraverseProps", TraverseProps)
+    else:
+        #get connection tag in reduced observaations, assign as TraverseProps.tag
+        setattr(TraverseProps, "tag", ReducedObsTag(LandXML_Obj))
+        setattr(LandXML_Obj, "TraverseProps", TraverseProps)
+        setattr(LandXML_Obj, "ObservationTable", ObservationTable.ObservationTable(LandXML_Obj))
+        #index reduced observations by pntRef - needs the connection tag
+        setattr(LandXML_Obj, "ConnectionIndex", Connections.ConnectionIndex(LandXML_Obj))
+    #label points by hops to a proposed lot vertex
+    BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+
+    return LandXML_Obj
+
+def SaveToCache(LandXML_Obj):
+    '''
+    Stores the compiled plan in the plan cache for the next time the file is opened
+    Call after PrepareTraverse - nothing is written when there is no cache or the plan
+        was loaded from it
+    :param LandXML_Obj:
+    '''
+    Cache = getattr(LandXML_Obj, "PlanCache", None)
+    if Cache is not None and not LandXML_Obj.FromCache:
+        Cache.Save(LandXML_Obj)
+
+def HasRefMarks(LandXML_Obj):
+    '''
+    Checks if there are SSMs/PMs in the LandXML file
+    :param LandXML_Obj:
+    :return: boolean whether RMs are present or not
+    '''
+
+    return len(RefMarkQueries.GetMonumentTable(LandXML_Obj).ControlMarks) > 0
+
+def ReducedObsTag(LandXML_Obj):
+    '''
+    Determines what tag is used in the Reduced Observation connection
+    :param LandXML_Obj:
+    :return:
+    '''
+
+    Obs = LandXML_Obj.ReducedObs.getchildren()[0]
+    ID = Obs.get("setupID")
+    for tag in ObservationTable.SETUP_TAGS:
+        tagLen = len(tag)
+        if ID[:(tagLen)] == tag:
+            return tag
+
 
 class FileObj(object):
 
@@ -51,6 +219,20 @@ class FileObj(object):
         self.Monuments = MonumentsObj()
         self.ReducedObs = ReducedObsObj()
         self.Parcels = ParcelObj()
+        self.FromCache = False
+
+    def __getattr__(self, name):
+        '''
+        Elements of a plan loaded from the cache (ELEMENT_ATTRIBUTES) are read on first use
+            by its ElementLoader, which sets all of them
+        '''
+        Loader = self.__dict__.get("ElementLoader")
+        if Loader is None or name not in ELEMENT_ATTRIBUTES:
+            raise AttributeError(name)
+        del self.ElementLoader
+        Loader(self)
+
+        return getattr(self, name)
 
 class CoordinatesObj(object):
     pass
@@ -62,4 +244,7 @@ class ReducedObsObj(object):
     pass
 
 class ParcelObj(object):
-    pass
\ No newline at end of file
+    pass
+
+class TriedConnections(object):
+    pass
@@ -4,12 +4,16 @@ Universal function for all traverse types (RMs, Boundaries, Easements).
 - calls relevant methods to run the different traver types
 '''
 
-from LandXML import Connections, TraverseClose, TraverseNoConnection, FindConnection
+from LandXML import CalculatedIndex, Connections, DataObjects, FindConnection, TraverseObserver, \
+    TraverseSideCalcs
+from LandXML.RefMarks import RefMarkQueries, TraversePlanner
 
 class Traverse:
     def __init__(self, traverse, gui, LandXML_Obj, PntRefNum):
         '''
         Contains methods to calculate a traverse
+        Each side is calculated from the coordinates of the point it starts at and added,
+            with its new point, to the traverse and gui.CadastralPlan
         :param traverse: traverse object to store all traverse attributes
         :param gui: ui data object
         :param LandXML_Obj: LandXML data object
@@ -20,10 +24,27 @@ class Traverse:
         self.PntRefNum = PntRefNum
         self.gui = gui
         self.LandXML_Obj = LandXML_Obj
+        self.Factory = DataObjects.GetDataObjects(gui)
+        self.Observer = TraverseObserver.GetObserver(gui)
+        self.Layer = LandXML_Obj.TraverseProps.TraverseType
+        #number of sides calculated
+        self.Legs = 0
 
         # defines whether a finish to a traverse has been found
         # not neccesarily a close
-        self.TraverseFinished = False        
+        self.TraverseFinished = False
+
+        #plan the whole RM traverse up front - sides are searched for one at a time if no
+        #closing traverse is found
+        self.Plan = None
+        if LandXML_Obj.TraverseProps.TraverseType == "REFERENCE MARKS" and \
+                getattr(LandXML_Obj.TraverseProps, "PlanTraverses", True):
+            self.Plan = TraversePlanner.PlanTraverse(LandXML_Obj, self.PntRefNum, gui.CadastralPlan)
+
+        if self.Plan is not None:
+            #all sides of the planned traverse in one calculation
+            self.PlannedTraverse()
+            return
 
         #loop to add sides to a traverse
         while(not self.TraverseFinished):
@@ -31,19 +52,99 @@ class Traverse:
             Observations = Connections.AllConnections(self.PntRefNum, self.LandXML_Obj)
             #select connection
             connection = FindConnection.FindNextConnection(Observations, self.traverse,
-                                                           self.PntRefNum, 
+                                                           self.PntRefNum,
                                                            self.LandXML_Obj.TraverseProps,
-                                                           self.gui.CadastralPlan, 
+                                                           self.gui.CadastralPlan,
                                                            self.LandXML_Obj)
-            
-            #calculate new point and create line object - send gui and update drawing canvas
-            #text etc
-            point = DataObjects.Point(StartPoint.PntRefNum, StartPoint.Easting, StartPoint.Northing,
-                                      StartPoint.Northing, None, StartPoint.Code, "REFERENCE MARKS")
-            if connection.TraverseClose:
-                self.TraverseFinished = True
+            if connection.Connection is None:
                 break
+            EndRefNum = Connections.GetConnectionIndex(LandXML_Obj).OtherEnd(connection.Connection,
+                                                                             self.PntRefNum)
+
+            #calculate new point and create line object - added to the traverse and plan
+            Side = TraverseSideCalcs.TraverseSide(self.PntRefNum, self.traverse,
+                                                  connection.Connection, gui, LandXML_Obj)
+            Side.CalcPointCoordsWorkflow(*self.PointCoords(self.PntRefNum))
+            line = self.Factory.Line(self.PntRefNum, EndRefNum, Side.bearing, Side.distance,
+                                     self.Layer, Side.radius, Side.arcLength, Side.rotation)
+            Closes = self.AddSide(line, Side.Easting, Side.Northing)
+            self.PntRefNum = EndRefNum
+            if connection.TraverseClose or Closes:
+                self.TraverseFinished = True
+
+    def PlannedTraverse(self):
+        '''
+        Calculates every side of self.Plan with one TraverseSideCalcs.PathSides call
+            and adds them to the traverse and CadastralPlan
+        '''
+        Legs = TraverseSideCalcs.PathSides(self.LandXML_Obj, self.Plan.Rows, self.Plan.PntRefNums,
+                                           *self.PointCoords(self.PntRefNum))
+        for Leg, EndRefNum in enumerate(self.Plan.PntRefNums[1:]):
+            line = self.Factory.Line(self.PntRefNum, EndRefNum, float(Legs.Bearings[Leg]),
+                                     float(Legs.ChordLengths[Leg]), self.Layer,
+                                     float(Legs.Radii[Leg]), float(Legs.ArcLengths[Leg]),
+                                     int(Legs.Rotations[Leg]))
+            self.AddSide(line, float(Legs.Eastings[Leg]), float(Legs.Northings[Leg]))
+            self.PntRefNum = EndRefNum
+        self.TraverseFinished = True
+
+    def PointCoords(self, PntRefNum):
+        '''
+        Calculated coordinates of PntRefNum - from the traverse, or the CadastralPlan
+        :return: Easting, Northing
+        '''
+        point = getattr(self.traverse.Points, PntRefNum, None)
+        if point is None:
+            point = getattr(self.gui.CadastralPlan.Points, PntRefNum)
+
+        return point.E, point.N
+
+    def AddSide(self, line, Easting, Northing):
+        '''
+        Adds a calculated side to the traverse and CadastralPlan, with its end point
+            if that is not already calculated, and passes both to the observer to draw
+        :param line: line data object from line.StartRef to line.EndRef
+        :param Easting: calculated Easting of line.EndRef
+        :param Northing: calculated Northing of line.EndRef
+        :return: True if line.EndRef was already calculated - the side closes the traverse
+        '''
+        Plan = self.gui.CadastralPlan
+        Closes = hasattr(Plan.Points, line.EndRef)
+        if not Closes:
+            point = self.Factory.Point(line.EndRef, Easting, Northing, Northing, None,
+                                       PointCode(self.LandXML_Obj, line.EndRef), self.Layer)
+            CalculatedIndex.AddPoint(self.traverse, line.EndRef, point)
+            CalculatedIndex.AddPoint(Plan, line.EndRef, point)
+            self.Observer.PointAdded(point, self.Layer)
+
+        for DataObj in (self.traverse, Plan):
+            CalculatedIndex.AddLine(DataObj, NextLineKey(DataObj), line)
+        #line or arc and its bearing/distance label
+        self.Observer.LineAdded(line, self.Layer)
+        self.traverse.refPnts.append(line.EndRef)
+        self.Legs += 1
+
+        return Closes
+
+
+def NextLineKey(DataObj):
+    '''
+    Attribute name for the next line of DataObj - counted by Lines.LineNum
+    :param DataObj: CadastralPlan or traverse data object
+    :return: key
+    '''
+    LineNum = getattr(DataObj.Lines, "LineNum", 0) + 1
+    setattr(DataObj.Lines, "LineNum", LineNum)
 
+    return "Line" + str(LineNum)
 
+def PointCode(LandXML_Obj, PntRefNum):
+    '''
+    Code of a calculated point - RM<type>-<mark number> for reference marks
+    :return: code string
+    '''
+    MarkType = RefMarkQueries.FindMarkType(LandXML_Obj, PntRefNum)
+    if MarkType is None:
+        return ""
 
-        
\ No newline at end of file
+    return "RM" + MarkType + "-" + RefMarkQueries.GetMarkNumber(LandXML_Obj, PntRefNum)
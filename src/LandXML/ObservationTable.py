@@ -0,0 +1,294 @@
+'''
+Columnar table of the reduced observations in a LandXML file
+Numeric fields are parsed once at load so filters and side calculations
+work on NumPy arrays instead of element attribute strings
+'''
+import numpy as np
+
+#array attributes of the table - stored by the plan cache
+ARRAYS = ("Setup", "Target", "Azimuth", "Distance", "IsArc", "Radius", "ArcLength", "Rotation", "Degree")
+#prefixes of setup IDs in reduced observations - in the order they are tested
+SETUP_TAGS = ["IS-", "IS", "S-"]
+
+class ObservationTable:
+
+    def __init__(self, LandXML_Obj, Cached=None):
+        '''
+        Builds parallel arrays from LandXML_Obj.ReducedObs, one row per connection
+            Setup, Target - interned point IDs (index into PointNames)
+            Azimuth - decimal degrees (chordAzimuth for arcs)
+            Distance - horizontal distance (chord length for arcs)
+            IsArc, Radius, ArcLength, Rotation (1 clockwise, -1 anti-clockwise, 0 for lines)
+        Elements holds the source element of each row (Element, Row to look up)
+        :param LandXML_Obj: LandXML data object - TraverseProps.tag must be set
+        :param Cached: (PointNames, dictionary of ARRAYS) from the plan cache - ReducedObs
+                       is only read when an element is first looked up
+        '''
+        tag = LandXML_Obj.TraverseProps.tag
+        self.tag = tag
+        self.LandXML_Obj = LandXML_Obj
+        #point name -> interned point ID
+        self.PointIDs = {}
+        self.PointNames = []
+        self.Elements = []
+        #element -> row
+        self.RowOf = {}
+
+        if Cached is not None:
+            self.PointNames = list(Cached[0])
+            self.PointIDs = {PntRefNum: PointID for PointID, PntRefNum in enumerate(self.PointNames)}
+            self.Elements = None
+            self.RowOf = None
+            for Name in ARRAYS:
+                setattr(self, Name, Cached[1][Name])
+            self.IndexEdges()
+            return
+
+        Setup = []
+        Target = []
+        Azimuth = []
+        Distance = []
+        IsArc = []
+        Radius = []
+        ArcLength = []
+        Rotation = []
+
+        for ob in LandXML_Obj.ReducedObs.getchildren():
+            if "targetSetupID" not in ob.attrib.keys():
+                continue
+            self.RowOf[ob] = len(self.Elements)
+            self.Elements.append(ob)
+            Setup.append(self.InternPoint(ob.get("setupID").replace(tag, "")))
+            Target.append(self.InternPoint(ob.get("targetSetupID").replace(tag, "")))
+
+            if ob.get("azimuth") is not None:
+                Azimuth.append(DMS2Decimal(ob.get("azimuth")))
+                Distance.append(ParseFloat(ob.get("horizDistance")))
+                IsArc.append(False)
+                Radius.append(np.nan)
+                ArcLength.append(np.nan)
+                Rotation.append(0)
+            else:
+                Azimuth.append(DMS2Decimal(ob.get("chordAzimuth")))
+                ArcRadius = ParseFloat(ob.get("radius"))
+                Length = ParseFloat(ob.get("length"))
+                Distance.append(2 * ArcRadius * np.sin(Length / (2 * ArcRadius)))
+                IsArc.append(True)
+                Radius.append(ArcRadius)
+                ArcLength.append(Length)
+                Rotation.append(-1 if ob.get("rot") == "ccw" else 1)
+
+        self.Setup = np.array(Setup, dtype=np.int32)
+        self.Target = np.array(Target, dtype=np.int32)
+        self.Azimuth = np.array(Azimuth, dtype=np.float64)
+        self.Distance = np.array(Distance, dtype=np.float64)
+        self.IsArc = np.array(IsArc, dtype=bool)
+        self.Radius = np.array(Radius, dtype=np.float64)
+        self.ArcLength = np.array(ArcLength, dtype=np.float64)
+        self.Rotation = np.array(Rotation, dtype=np.int8)
+
+        #observations per point, by interned point ID - self connections counted once
+        self.Degree = self.CountDegree()
+        self.IndexEdges()
+
+    def IndexEdges(self):
+        #unordered point ID pair -> rows, for removing edges from the degree count
+        self.EdgeRows = {}
+        for Row, Edge in enumerate(zip(self.Setup.tolist(), self.Target.tolist())):
+            self.EdgeRows.setdefault(frozenset(Edge), []).append(Row)
+
+    def __len__(self):
+        return len(self.Setup)
+
+    def IndexElements(self):
+        '''
+        Reads the row elements from ReducedObs - only needed for a table from the plan cache
+        '''
+        self.Elements = []
+        self.RowOf = {}
+        for ob in self.LandXML_Obj.ReducedObs.getchildren():
+            if "targetSetupID" in ob.attrib.keys():
+                self.RowOf[ob] = len(self.Elements)
+                self.Elements.append(ob)
+
+    def Element(self, Row):
+        '''
+        Source element of Row
+        :param Row: int
+        :return: reduced observation element
+        '''
+        if self.Elements is None:
+            self.IndexElements()
+        return self.Elements[Row]
+
+    def Row(self, Observation):
+        '''
+        Row of an observation element
+        :param Observation: reduced observation element
+        :return: int - KeyError if Observation is not in the table
+        '''
+        if self.RowOf is None:
+            self.IndexElements()
+        return self.RowOf[Observation]
+
+    def InternPoint(self, PntRefNum):
+        '''
+        Returns the interned ID of PntRefNum, adding it if not seen
+        :param PntRefNum: point name
+        :return: int
+        '''
+        PointID = self.PointIDs.get(PntRefNum)
+        if PointID is None:
+            PointID = len(self.PointNames)
+            self.PointIDs[PntRefNum] = PointID
+            self.PointNames.append(PntRefNum)
+
+        return PointID
+
+    def PointID(self, PntRefNum):
+        '''
+        Interned ID of PntRefNum without adding it
+        :param PntRefNum: point name
+        :return: int, -1 if the point has no observations
+        '''
+        return self.PointIDs.get(PntRefNum, -1)
+
+    def Rows(self, Observations):
+        '''
+        Rows of a set of observations
+        :param Observations: list of elements or a connections object (connectionN attributes)
+        :return: int array of rows
+        '''
+        if hasattr(Observations, "__dict__"):
+            Observations = Observations.__dict__.values()
+        if self.RowOf is None:
+            self.IndexElements()
+        return np.array([self.RowOf[ob] for ob in Observations], dtype=np.int64)
+
+    def CountDegree(self, Use=None):
+        '''
+        Counts observations per point
+        :param Use: boolean array of rows to count, all rows if None
+        :return: int array of degree by point ID
+        '''
+        Setup = self.Setup
+        Target = self.Target
+        if Use is not None:
+            Setup = Setup[Use]
+            Target = Target[Use]
+        PointCount = len(self.PointNames)
+        Degree = np.bincount(Setup, minlength=PointCount) + \
+                 np.bincount(Target[Target != Setup], minlength=PointCount)
+        return Degree.astype(np.int32)
+
+    def DegreeExcluding(self, Edges):
+        '''
+        Change in degree of the end points of Edges when Edges are taken out - eg lines
+            already calculated. Only the points on Edges are touched
+        :param Edges: iterable of point name pairs (tuples or frozensets)
+        :return: dictionary of point ID -> degree change (negative)
+        '''
+        Changes = {}
+        for Edge in Edges:
+            PointIDs = frozenset(self.PointIDs.get(PntRefNum, -1) for PntRefNum in Edge)
+            for Row in self.EdgeRows.get(PointIDs, []):
+                Setup, Target = int(self.Setup[Row]), int(self.Target[Row])
+                Changes[Setup] = Changes.get(Setup, 0) - 1
+                if Target != Setup:
+                    Changes[Target] = Changes.get(Target, 0) - 1
+
+        return Changes
+
+    def PointDegree(self, PntRefNum, Changes=None):
+        '''
+        Number of observations at PntRefNum
+        :param PntRefNum: point name
+        :param Changes: degree changes from DegreeExcluding - defaults to all observations
+        :return: int
+        '''
+        PointID = self.PointIDs.get(PntRefNum)
+        if PointID is None:
+            return 0
+        Degree = int(self.Degree[PointID])
+        if Changes:
+            Degree += Changes.get(PointID, 0)
+        return Degree
+
+    def OrientedAzimuth(self, Rows, PntRefNum):
+        '''
+        Azimuths of Rows measured from PntRefNum
+        Flips by 180 degrees where PntRefNum is the target of the observation
+        :param Rows: int array of rows
+        :param PntRefNum: point name at the start of each connection
+        :return: array of azimuths (decimal degrees)
+        '''
+        Azimuth = self.Azimuth[Rows]
+        Flip = self.Setup[Rows] != self.PointID(PntRefNum)
+        Azimuth[Flip] = (Azimuth[Flip] + 180) % 360
+
+        return Azimuth
+
+    def OtherEnd(self, Rows, PntRefNum):
+        '''
+        Interned ID of the other end of each row from PntRefNum
+        :param Rows: int array of rows
+        :param PntRefNum: point name at the known end of each connection
+        :return: int array of point IDs
+        '''
+        PointID = self.PointID(PntRefNum)
+        return np.where(self.Setup[Rows] == PointID, self.Target[Rows], self.Setup[Rows])
+
+
+def DMS2Decimal(Bearing):
+    '''
+    Converts a LandXML bearing string (DDD.MMSS) to decimal degrees
+    :param Bearing: bearing string
+    :return: float (NaN if Bearing is None)
+    '''
+    if Bearing is None:
+        return np.nan
+
+    Bearing = Bearing.strip()
+    Negative = Bearing.startswith("-")
+    Degrees, _, Fraction = Bearing.lstrip("-").partition(".")
+    Fraction = Fraction.ljust(4, "0")
+    Decimal = float(Degrees or 0) + float(Fraction[:2]) / 60 + \
+              float(Fraction[2:4] + "." + Fraction[4:]) / 3600
+    if Negative:
+        return -Decimal
+
+    return Decimal
+
+def SetupPointName(SetupID):
+    '''
+    Point name of a setupID/targetSetupID - the ID with its tag removed
+    :param SetupID: setup ID string
+    :return: point name
+    '''
+    for tag in SETUP_TAGS:
+        if SetupID[:len(tag)] == tag:
+            return SetupID[len(tag):]
+    return SetupID
+
+def ParseFloat(Value):
+    '''
+    Converts an attribute string to float, NaN if missing
+    :param Value: attribute string
+    :return: float
+    '''
+    if Value is None:
+        return np.nan
+    return float(Value)
+
+def GetObservationTable(LandXML_Obj):
+    '''
+    Returns the ObservationTable of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: ObservationTable
+    '''
+    Table = getattr(LandXML_Obj, "ObservationTable", None)
+    if Table is None:
+        Table = ObservationTable(LandXML_Obj)
+        setattr(LandXML_Obj, "ObservationTable", Table)
+
+    return Table
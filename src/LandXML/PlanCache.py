@@ -0,0 +1,254 @@
+'''
+On-disk cache of compiled LandXML plans
+Each file opened is stored in CacheDir/<key>/ where key is the SHA-256 of the
+loader version and the file bytes:
+    header.json - DP, connection tag, point names, monuments, proposed lot vertices
+    *.npy - coordinate, observation table and connection adjacency arrays, loaded memory mapped
+    elements.xml - the elements kept by the loader (CgPoints, Monuments, Parcels,
+                   ObservationGroups), needed by the traverse workflow
+Reopening a cached file costs a hash and an mmap of the arrays - no XML is parsed
+until an element is first used (eg the observation elements of a traverse).
+Entries are evicted least recently used first once the cache exceeds MaxBytes
+
+Enabled by TraverseProps.CacheDir or the LANDXML_CACHE_DIR environment variable.
+Plans are written by LandXML_Objects.SaveToCache
+'''
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from lxml import etree
+
+from LandXML import Connections, Coordinates, ObservationTable
+from LandXML.RefMarks import RefMarkQueries
+
+#increase when the loader or the cached structures change - old entries are then ignored
+LOADER_VERSION = 2
+#connection index arrays stored with the observation table arrays
+ADJACENCY_ARRAYS = ("AdjacencyStart", "AdjacencyRows")
+#default size limit of the cache directory
+MAX_BYTES = 2 ** 30
+
+
+class PlanCache:
+
+    def __init__(self, CacheDir, MaxBytes=MAX_BYTES):
+        '''
+        Cache of compiled plans in CacheDir
+        :param CacheDir: cache directory - created if missing
+        :param MaxBytes: total size the cache is trimmed to after each save
+        '''
+        self.CacheDir = CacheDir
+        self.MaxBytes = MaxBytes
+        #(path, size, mtime) -> key, so a file is only hashed once per session
+        self.Keys = {}
+        os.makedirs(CacheDir, exist_ok=True)
+
+    def Key(self, File):
+        '''
+        SHA-256 of the loader version and the bytes of File
+        :param File: path to LandXML file
+        :return: hex digest
+        '''
+        Stat = os.stat(File)
+        FileID = (os.path.abspath(File), Stat.st_size, Stat.st_mtime_ns)
+        if FileID not in self.Keys:
+            Hash = hashlib.sha256(("LandXML plan cache " + str(LOADER_VERSION)).encode())
+            with open(File, "rb") as f:
+                for Chunk in iter(lambda: f.read(1 << 20), b""):
+                    Hash.update(Chunk)
+            self.Keys[FileID] = Hash.hexdigest()
+
+        return self.Keys[FileID]
+
+    def EntryDir(self, Key):
+        return os.path.join(self.CacheDir, Key)
+
+    def Load(self, File, TraverseProps):
+        '''
+        Builds the LandXML data object of File from the cache
+        :param File: path to LandXML file
+        :param TraverseProps: traverse properties - uses Namespace
+        :return: LandXML data object, None if File is not cached
+        '''
+        from LandXML import LandXML_Objects
+
+        if not isinstance(File, str):
+            return None
+        Entry = self.EntryDir(self.Key(File))
+        HeaderFile = os.path.join(Entry, "header.json")
+        try:
+            with open(HeaderFile) as f:
+                Header = json.load(f)
+            if Header["version"] != LOADER_VERSION or Header["namespace"] != TraverseProps.Namespace:
+                return None
+            Arrays = {Name: np.load(os.path.join(Entry, Name + ".npy"), mmap_mode="r")
+                      for Name in ObservationTable.ARRAYS + ADJACENCY_ARRAYS + ("Eastings", "Northings")}
+        except (OSError, ValueError, KeyError):
+            return None
+        #mark entry as recently used
+        os.utime(HeaderFile)
+
+        LandXML_Obj = LandXML_Objects.FileObj()
+        setattr(LandXML_Obj, "File", File)
+        setattr(LandXML_Obj, "PlanCache", self)
+        LandXML_Obj.FromCache = True
+        setattr(LandXML_Obj, "DP", Header["dp"])
+        #elements are read from the entry when first used
+        for Name in LandXML_Objects.ELEMENT_ATTRIBUTES:
+            LandXML_Obj.__dict__.pop(Name, None)
+        setattr(LandXML_Obj, "ElementLoader",
+                functools.partial(LoadElements, os.path.join(Entry, "elements.xml"), TraverseProps.Namespace))
+
+        #indexes from the cached arrays and header
+        LandXML_Obj.CoordinateStore = Coordinates.CoordinateStore(
+            None, (Header["coordinate_names"], Arrays["Eastings"], Arrays["Northings"]))
+        LandXML_Obj.BdyVertices = frozenset(Header["bdy_vertices"])
+        LandXML_Obj.MonumentTable = RefMarkQueries.MonumentTable(
+            LandXML_Obj, [tuple(Row) for Row in Header["monuments"]])
+        if Header["tag"] is not None:
+            setattr(TraverseProps, "tag", Header["tag"])
+            setattr(LandXML_Obj, "TraverseProps", TraverseProps)
+            LandXML_Obj.ObservationTable = ObservationTable.ObservationTable(
+                LandXML_Obj, (Header["point_names"], {Name: Arrays[Name] for Name in ObservationTable.ARRAYS}))
+            LandXML_Obj.ConnectionIndex = Connections.ConnectionIndex(
+                LandXML_Obj, (Arrays["AdjacencyStart"], Arrays["AdjacencyRows"]))
+
+        return LandXML_Obj
+
+    def Save(self, LandXML_Obj):
+        '''
+        Writes the compiled plan of LandXML_Obj to the cache - after PrepareTraverse, see
+            LandXML_Objects.SaveToCache
+        Entries are written to a temporary directory and renamed into place
+        :param LandXML_Obj: LandXML data object loaded from LandXML_Obj.File
+        '''
+        File = getattr(LandXML_Obj, "File", None)
+        if not isinstance(File, str):
+            return
+        Entry = self.EntryDir(self.Key(File))
+        if os.path.isdir(Entry):
+            return
+
+        Store = LandXML_Obj.CoordinateStore
+        Table = LandXML_Obj.ObservationTable
+        Index = LandXML_Obj.ConnectionIndex
+        Header = {"version": LOADER_VERSION,
+                  "source": os.path.basename(File),
+                  "namespace": LandXML_Obj.TraverseProps.Namespace,
+                  "dp": LandXML_Obj.DP,
+                  "tag": Table.tag,
+                  "coordinate_names": Store.Names,
+                  "point_names": Table.PointNames,
+                  "monuments": LandXML_Obj.MonumentTable.Rows(),
+                  "bdy_vertices": sorted(LandXML_Obj.BdyVertices)}
+
+        TempDir = tempfile.mkdtemp(prefix=".tmp-", dir=self.CacheDir)
+        try:
+            np.save(os.path.join(TempDir, "Eastings.npy"), np.asarray(Store.Eastings))
+            np.save(os.path.join(TempDir, "Northings.npy"), np.asarray(Store.Northings))
+            for Name in ObservationTable.ARRAYS:
+                np.save(os.path.join(TempDir, Name + ".npy"), np.asarray(getattr(Table, Name)))
+            for Name in ADJACENCY_ARRAYS:
+                np.save(os.path.join(TempDir, Name + ".npy"), np.asarray(getattr(Index, Name)))
+            with open(os.path.join(TempDir, "elements.xml"), "wb") as f:
+                f.write(b"<PlanCache>")
+                for Element in KeptElements(LandXML_Obj):
+                    f.write(etree.tostring(Element))
+                f.write(b"</PlanCache>")
+            #header last - entries without one are never loaded
+            with open(os.path.join(TempDir, "header.json"), "w") as f:
+                json.dump(Header, f)
+            os.replace(TempDir, Entry)
+        except OSError:
+            shutil.rmtree(TempDir, ignore_errors=True)
+            return
+
+        self.Evict()
+
+    def Entries(self):
+        '''
+        Cache entries with their size and last use
+        :return: list of (last used time, size in bytes, entry directory), least recently used first
+        '''
+        Entries = []
+        for Name in os.listdir(self.CacheDir):
+            Entry = os.path.join(self.CacheDir, Name)
+            HeaderFile = os.path.join(Entry, "header.json")
+            if not os.path.isfile(HeaderFile):
+                continue
+            Size = sum(os.path.getsize(os.path.join(Entry, EntryFile)) for EntryFile in os.listdir(Entry))
+            Entries.append((os.path.getmtime(HeaderFile), Size, Entry))
+
+        return sorted(Entries)
+
+    def Evict(self):
+        '''
+        Removes least recently used entries until the cache is within MaxBytes
+        The most recently used entry is always kept
+        '''
+        Entries = self.Entries()
+        Total = sum(Size for LastUsed, Size, Entry in Entries)
+        for LastUsed, Size, Entry in Entries[:-1]:
+            if Total <= self.MaxBytes:
+                break
+            shutil.rmtree(Entry, ignore_errors=True)
+            Total -= Size
+
+
+def LoadElements(ElementsFile, Namespace, LandXML_Obj):
+    '''
+    ElementLoader of a plan loaded from the cache - sets the element attributes of LandXML_Obj
+    Elements are read from the source file if the entry has been evicted since
+    :param ElementsFile: elements.xml of the cache entry
+    :param Namespace: LandXML namespace
+    :param LandXML_Obj: LandXML data object from PlanCache.Load
+    '''
+    try:
+        Elements = etree.parse(ElementsFile).getroot()
+        Survey = Elements
+    except (OSError, etree.XMLSyntaxError):
+        Elements = etree.parse(LandXML_Obj.File).getroot()
+        Survey = Elements.find(Namespace + "Survey")
+
+    LandXML_Obj.Monuments = Elements.find(Namespace + "Monuments")
+    LandXML_Obj.Coordinates = Elements.find(Namespace + "CgPoints")
+    LandXML_Obj.Parcels = Elements.find(Namespace + "Parcels")
+    LandXML_Obj.ObservationGroups = Survey.findall(Namespace + "ObservationGroup") if Survey is not None else []
+    if len(LandXML_Obj.ObservationGroups) > 0:
+        LandXML_Obj.ReducedObs = LandXML_Obj.ObservationGroups[0]
+    else:
+        LandXML_Obj.ReducedObs = None
+
+def KeptElements(LandXML_Obj):
+    '''
+    Elements of LandXML_Obj written to the cache - the DP from SurveyHeader is stored in the header
+    :return: list of elements
+    '''
+    Elements = [LandXML_Obj.Monuments, LandXML_Obj.Coordinates, LandXML_Obj.Parcels]
+    Elements.extend(LandXML_Obj.ObservationGroups)
+
+    return [Element for Element in Elements if Element is not None]
+
+def GetPlanCache(TraverseProps):
+    '''
+    Returns the PlanCache set up by TraverseProps.CacheDir or LANDXML_CACHE_DIR
+    Cache size limit from TraverseProps.CacheSize (bytes)
+    :param TraverseProps: traverse properties
+    :return: PlanCache, None if no cache directory is set
+    '''
+    Cache = getattr(TraverseProps, "PlanCache", None)
+    if Cache is not None:
+        return Cache
+
+    CacheDir = getattr(TraverseProps, "CacheDir", None) or os.environ.get("LANDXML_CACHE_DIR")
+    if not CacheDir:
+        return None
+    Cache = PlanCache(CacheDir, getattr(TraverseProps, "CacheSize", MAX_BYTES))
+    setattr(TraverseProps, "PlanCache", Cache)
+
+    return Cache
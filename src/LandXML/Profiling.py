@@ -0,0 +1,165 @@
+'''
+Optional per-stage instrumentation of the LandXML pipeline
+Stages are timed with the Stage decorator and candidate set sizes recorded
+with Count. Records per stage:
+    call count, cumulative time, own time (less nested stages), percentile timings
+Results are exported as JSON or as a marshal dump that pstats.Stats can load
+
+Disabled by default - a disabled stage costs one attribute lookup. Enable with
+Enable() or by setting the LANDXML_PROFILE environment variable
+'''
+import functools
+import json
+import marshal
+import os
+import time
+from array import array
+
+import numpy as np
+
+
+class Profiler:
+
+    def __init__(self):
+        '''
+        Empty profile
+            Times - stage name -> array of call durations (s)
+            OwnTimes - stage name -> time not spent in nested stages (s)
+            Callers - stage name -> {calling stage name: calls}
+            Sizes - name -> array of recorded sizes
+        '''
+        self.Enabled = bool(os.environ.get("LANDXML_PROFILE"))
+        self.Reset()
+
+    def Reset(self):
+        self.Times = {}
+        self.OwnTimes = {}
+        self.Callers = {}
+        self.Sizes = {}
+        #stages currently running - [name, time spent in nested stages]
+        self.Stack = []
+
+    def Enter(self, Name):
+        self.Stack.append([Name, 0.])
+        return time.perf_counter()
+
+    def Exit(self, Name, Start):
+        Elapsed = time.perf_counter() - Start
+        Nested = self.Stack.pop()[1]
+        self.Times.setdefault(Name, array("d")).append(Elapsed)
+        self.OwnTimes[Name] = self.OwnTimes.get(Name, 0.) + Elapsed - Nested
+        if len(self.Stack) > 0:
+            Caller = self.Stack[-1]
+            Caller[1] += Elapsed
+            Callers = self.Callers.setdefault(Name, {})
+            Callers[Caller[0]] = Callers.get(Caller[0], 0) + 1
+
+    def Count(self, Name, Size):
+        self.Sizes.setdefault(Name, array("d")).append(Size)
+
+    def Summary(self):
+        '''
+        Statistics per stage and per recorded size, slowest stages first
+        :return: dictionary with "stages" and "sizes"
+        '''
+        Stages = {}
+        for Name, Times in self.Times.items():
+            Times = np.frombuffer(Times, dtype=np.float64)
+            Stages[Name] = {"calls": len(Times),
+                            "total_s": float(Times.sum()),
+                            "own_s": self.OwnTimes[Name],
+                            "mean_s": float(Times.mean()),
+                            "p50_s": float(np.percentile(Times, 50)),
+                            "p90_s": float(np.percentile(Times, 90)),
+                            "p99_s": float(np.percentile(Times, 99)),
+                            "max_s": float(Times.max()),
+                            "callers": dict(self.Callers.get(Name, {}))}
+        Stages = dict(sorted(Stages.items(), key=lambda Item: Item[1]["total_s"], reverse=True))
+
+        Sizes = {}
+        for Name, Values in self.Sizes.items():
+            Values = np.frombuffer(Values, dtype=np.float64)
+            Sizes[Name] = {"count": len(Values),
+                           "mean": float(Values.mean()),
+                           "p50": float(np.percentile(Values, 50)),
+                           "p90": float(np.percentile(Values, 90)),
+                           "max": float(Values.max())}
+
+        return {"stages": Stages, "sizes": Sizes}
+
+    def PstatsKey(self, Name):
+        #pstats keys are (file, line, function)
+        return ("LandXML", 0, Name)
+
+    def PstatsDict(self):
+        '''
+        Profile in the format cProfile dumps - loadable with pstats.Stats
+        :return: dictionary {(file, line, name): (calls, calls, own time, total time, callers)}
+        '''
+        Stats = {}
+        for Name, Times in self.Times.items():
+            Calls = len(Times)
+            Total = float(sum(Times))
+            Own = self.OwnTimes[Name]
+            Callers = {}
+            for Caller, CallerCalls in self.Callers.get(Name, {}).items():
+                #share of this stage's time spent under each caller
+                Share = CallerCalls / Calls
+                Callers[self.PstatsKey(Caller)] = (CallerCalls, CallerCalls, Own * Share, Total * Share)
+            Stats[self.PstatsKey(Name)] = (Calls, Calls, Own, Total, Callers)
+
+        return Stats
+
+
+#profiler shared by the pipeline modules
+PROFILER = Profiler()
+
+
+def Stage(Name):
+    '''
+    Decorator timing each call of the decorated function as stage Name
+    :param Name: stage name
+    '''
+    def Decorator(Function):
+        @functools.wraps(Function)
+        def Wrapper(*args, **kwargs):
+            if not PROFILER.Enabled:
+                return Function(*args, **kwargs)
+            Start = PROFILER.Enter(Name)
+            try:
+                return Function(*args, **kwargs)
+            finally:
+                PROFILER.Exit(Name, Start)
+        return Wrapper
+    return Decorator
+
+def Count(Name, Size):
+    '''
+    Records a size (eg number of candidate connections) when profiling is enabled
+    '''
+    if PROFILER.Enabled:
+        PROFILER.Count(Name, Size)
+
+def Enable(Enabled=True):
+    PROFILER.Enabled = Enabled
+
+def Reset():
+    PROFILER.Reset()
+
+def Summary():
+    return PROFILER.Summary()
+
+def ExportJSON(File):
+    '''
+    Writes the profile summary to File as JSON
+    '''
+    with open(File, "w") as f:
+        json.dump(PROFILER.Summary(), f, indent=1)
+
+def ExportPstats(File):
+    '''
+    Writes the profile to File in the cProfile dump format
+    Read with pstats.Stats(File)
+    '''
+    with open(File, "wb") as f:
+        marshal.dump(PROFILER.PstatsDict(), f)
@@ -0,0 +1,198 @@
+'''
+Least squares adjustment of the reference mark observation network
+Alternative to stepping through RM traverses - every RM coordinate is solved at once
+
+Each reduced observation (setup -> target) gives a coordinate difference
+    dE = distance * sin(azimuth), dN = distance * cos(azimuth)
+so the problem is linear in the unknown coordinates. Easting and Northing share
+the same sparse design matrix and are solved from one set of normal equations.
+Each connected part of the network needs a fixed point - by default the
+first point of the part with CgPoint coordinates is held.
+'''
+import numpy as np
+
+try:
+    from scipy import sparse
+    from scipy.sparse import linalg as sparse_linalg
+except ImportError:
+    sparse = None
+
+from LandXML import Coordinates, ObservationTable
+from LandXML.RefMarks import RefMarkQueries
+
+
+class AdjustmentResult(object):
+    '''
+    Results of AdjustNetwork
+    Points - PointNames, Eastings, Northings, Fixed (bool per point)
+    Observations (one entry per adjusted observation) - Elements, ResidualE, ResidualN,
+        ResidualRadial, DistanceMisclose, BearingMisclose (seconds)
+    Sigma0 - standard error of unit weight, Unreachable - points with no fixed point
+    '''
+
+    def Coords(self, PntRefNum):
+        '''
+        Adjusted coordinates of PntRefNum
+        :return: East, North
+        '''
+        Row = self.PointNames.index(PntRefNum)
+        return float(self.Eastings[Row]), float(self.Northings[Row])
+
+
+def AdjustNetwork(LandXML_Obj, Fixed=None, RefMarksOnly=True, Weighted=True):
+    '''
+    Solves the coordinates of every point in the observation network at once
+    :param LandXML_Obj: LandXML data object
+    :param Fixed: dictionary of pntRef -> (Easting, Northing) to hold fixed
+    :param RefMarksOnly: only use observations between reference marks
+    :param Weighted: weight observations by 1/distance, otherwise equal weights
+    :return: AdjustmentResult
+    '''
+
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    Store = Coordinates.GetCoordinateStore(LandXML_Obj)
+    Fixed = dict(Fixed or {})
+
+    #select observations - no self connections or missing values
+    Use = (Table.Setup != Table.Target) & np.isfinite(Table.Azimuth) & np.isfinite(Table.Distance)
+    if RefMarksOnly:
+        RefMark = np.array([RefMarkQueries.CheckIfRefMark(LandXML_Obj, PntRefNum)
+                            for PntRefNum in Table.PointNames], dtype=bool)
+        Use &= RefMark[Table.Setup] & RefMark[Table.Target]
+    Rows = np.nonzero(Use)[0]
+    Setup = Table.Setup[Rows]
+    Target = Table.Target[Rows]
+
+    #network points in order of first appearance
+    PointIDs = np.unique(np.concatenate((Setup, Target)))
+    Names = [Table.PointNames[PointID] for PointID in PointIDs]
+
+    #hold one point in each connected part of the network
+    Parts = NetworkParts(len(Table.PointNames), Setup, Target)
+    HeldParts = set(Parts[Table.PointIDs[Name]] for Name in Fixed if Name in Table.PointIDs)
+    for Name, PointID in zip(Names, PointIDs):
+        if Parts[PointID] not in HeldParts and Name in Store:
+            Fixed[Name] = Store.GetCoords(Name)
+            HeldParts.add(Parts[PointID])
+    Reachable = np.array([Parts[PointID] in HeldParts for PointID in PointIDs], dtype=bool)
+    Unreachable = [Name for Name, Reach in zip(Names, Reachable) if not Reach]
+
+    #drop observations in parts with no fixed point
+    Keep = np.array([Parts[PointID] in HeldParts for PointID in Setup], dtype=bool)
+    Rows, Setup, Target = Rows[Keep], Setup[Keep], Target[Keep]
+    PointIDs = PointIDs[Reachable]
+    Names = [Name for Name, Reach in zip(Names, Reachable) if Reach]
+
+    #fixed coordinates and unknown columns, by interned point ID
+    FixedE = np.zeros(len(Table.PointNames))
+    FixedN = np.zeros(len(Table.PointNames))
+    Column = np.full(len(Table.PointNames), -1, dtype=np.int64)
+    Unknowns = 0
+    for Name, PointID in zip(Names, PointIDs):
+        if Name in Fixed:
+            FixedE[PointID], FixedN[PointID] = Fixed[Name]
+        else:
+            Column[PointID] = Unknowns
+            Unknowns += 1
+
+    #observed coordinate differences
+    Azimuth = np.radians(Table.Azimuth[Rows])
+    Distance = Table.Distance[Rows]
+    ObsE = Distance * np.sin(Azimuth)
+    ObsN = Distance * np.cos(Azimuth)
+    if Weighted:
+        Weights = 1 / np.maximum(Distance, 1.)
+    else:
+        Weights = np.ones(len(Rows))
+
+    #design matrix - target +1, setup -1, fixed points moved to the observation side
+    SetupCol = Column[Setup]
+    TargetCol = Column[Target]
+    LE = ObsE + FixedE[Setup] - FixedE[Target]
+    LN = ObsN + FixedN[Setup] - FixedN[Target]
+    ObsIndex = np.arange(len(Rows))
+    A_Rows = np.concatenate((ObsIndex[TargetCol >= 0], ObsIndex[SetupCol >= 0]))
+    A_Cols = np.concatenate((TargetCol[TargetCol >= 0], SetupCol[SetupCol >= 0]))
+    A_Vals = np.concatenate((np.ones(np.count_nonzero(TargetCol >= 0)),
+                             -np.ones(np.count_nonzero(SetupCol >= 0))))
+    SolE, SolN = SolveNormals(A_Rows, A_Cols, A_Vals, len(Rows), Unknowns, Weights, LE, LN)
+
+    #adjusted coordinates
+    AdjE = FixedE.copy()
+    AdjN = FixedN.copy()
+    Unknown = Column >= 0
+    AdjE[Unknown] = SolE[Column[Unknown]]
+    AdjN[Unknown] = SolN[Column[Unknown]]
+
+    #residuals and misclosures per observation
+    CalcE = AdjE[Target] - AdjE[Setup]
+    CalcN = AdjN[Target] - AdjN[Setup]
+    Result = AdjustmentResult()
+    Result.PointNames = Names
+    Result.Eastings = AdjE[PointIDs]
+    Result.Northings = AdjN[PointIDs]
+    Result.Fixed = np.array([Name in Fixed for Name in Names], dtype=bool)
+    Result.Unreachable = Unreachable
+    Result.Elements = [Table.Element(Row) for Row in Rows]
+    Result.ResidualE = CalcE - ObsE
+    Result.ResidualN = CalcN - ObsN
+    Result.ResidualRadial = np.hypot(Result.ResidualE, Result.ResidualN)
+    Result.DistanceMisclose = np.hypot(CalcE, CalcN) - Distance
+    Result.BearingMisclose = ((np.degrees(np.arctan2(CalcE, CalcN)) - Table.Azimuth[Rows] + 180)
+                              % 360 - 180) * 3600
+    Redundancy = 2 * (len(Rows) - Unknowns)
+    if Redundancy > 0:
+        Result.Sigma0 = float(np.sqrt(np.sum(Weights * (Result.ResidualE ** 2 + Result.ResidualN ** 2))
+                                      / Redundancy))
+    else:
+        Result.Sigma0 = None
+
+    return Result
+
+def SolveNormals(A_Rows, A_Cols, A_Vals, Observations, Unknowns, Weights, LE, LN):
+    '''
+    Solves the weighted normal equations (At W A) x = At W l for both coordinate axes
+    Uses scipy.sparse when available, dense NumPy otherwise
+    :return: solution for Eastings, solution for Northings
+    '''
+
+    if Unknowns == 0:
+        return np.zeros(0), np.zeros(0)
+
+    if sparse is not None:
+        A = sparse.csr_matrix((A_Vals, (A_Rows, A_Cols)), shape=(Observations, Unknowns))
+        AtW = A.T.multiply(Weights).tocsr()
+        Normals = (AtW @ A).tocsc()
+        Solution = sparse_linalg.spsolve(Normals, np.column_stack((AtW @ LE, AtW @ LN)))
+        Solution = np.asarray(Solution).reshape(Unknowns, 2)
+    else:
+        A = np.zeros((Observations, Unknowns))
+        np.add.at(A, (A_Rows, A_Cols), A_Vals)
+        AtW = A.T * Weights
+        Solution = np.linalg.solve(AtW @ A, np.column_stack((AtW @ LE, AtW @ LN)))
+
+    return Solution[:, 0], Solution[:, 1]
+
+def NetworkParts(PointCount, Setup, Target):
+    '''
+    Labels each point with the connected part of the network it belongs to (union find)
+    :param PointCount: number of interned points
+    :param Setup: setup point IDs of the observations
+    :param Target: target point IDs of the observations
+    :return: list of part labels by point ID
+    '''
+
+    Parent = list(range(PointCount))
+
+    def Root(Point):
+        while Parent[Point] != Point:
+            Parent[Point] = Parent[Parent[Point]]
+            Point = Parent[Point]
+        return Point
+
+    for SetupID, TargetID in zip(Setup.tolist(), Target.tolist()):
+        SetupRoot, TargetRoot = Root(SetupID), Root(TargetID)
+        if SetupRoot != TargetRoot:
+            Parent[TargetRoot] = SetupRoot
+
+    return [Root(Point) for Point in range(PointCount)]
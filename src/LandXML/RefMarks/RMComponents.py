@@ -0,0 +1,189 @@
+'''
+Connected components of the reference mark observation network
+RM traverses only follow reduced observations between RMs, so marks in different
+components never share a traverse. Components containing an SSM/PM are traversed
+independently in a process pool and their points and lines merged into the CadastralPlan
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from LandXML import CalculatedIndex, DataObjects, LandXML_Traverses, ObservationTable, TraverseObserver
+from LandXML.RefMarks import NetworkAdjustment, RefMarkQueries
+
+
+def RMComponents(LandXML_Obj):
+    '''
+    Splits the RMs into the connected parts of the reduced observation network
+    RMs with no observation to another RM are a component of their own
+    :param LandXML_Obj: LandXML data object
+    :return: list of frozensets of pntRefs - only components with an SSM/PM, largest first
+    '''
+
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    Monuments = RefMarkQueries.GetMonumentTable(LandXML_Obj)
+
+    #label points by the part of the RM only network they belong to
+    RefMark = np.array([PntRefNum in Monuments.RefMarks for PntRefNum in Table.PointNames],
+                       dtype=bool)
+    Use = (Table.Setup != Table.Target) & RefMark[Table.Setup] & RefMark[Table.Target]
+    Parts = NetworkAdjustment.NetworkParts(len(Table.PointNames), Table.Setup[Use],
+                                           Table.Target[Use])
+
+    #group RMs by part in monument order
+    Components = {}
+    for PntRefNum in Monuments.Records:
+        if PntRefNum not in Monuments.RefMarks:
+            continue
+        PointID = Table.PointIDs.get(PntRefNum)
+        Label = PntRefNum if PointID is None else Parts[PointID]
+        Components.setdefault(Label, []).append(PntRefNum)
+
+    Components = [frozenset(Component) for Component in Components.values()
+                  if not Monuments.ControlMarkSet.isdisjoint(Component)]
+    #largest first so the longest traverses are started first in the pool
+    Components.sort(key=len, reverse=True)
+
+    return Components
+
+def GetRMComponents(LandXML_Obj):
+    '''
+    Returns the RM components of LandXML_Obj, building them on first use
+    :param LandXML_Obj: LandXML data object
+    :return: list of frozensets of pntRefs
+    '''
+    Components = getattr(LandXML_Obj, "RMComponents", None)
+    if Components is None:
+        Components = RMComponents(LandXML_Obj)
+        setattr(LandXML_Obj, "RMComponents", Components)
+
+    return Components
+
+def TraverseOptions(TraverseProps):
+    '''
+    Scalar TraverseProps attributes passed to the worker processes
+    :return: dictionary
+    '''
+    return {name: value for name, value in TraverseProps.__dict__.items()
+            if isinstance(value, (str, int, float, bool, type(None)))}
+
+def HeadlessProps(Options):
+    '''
+    TraverseProps for a worker process with Options set
+    :param Options: TraverseProps attributes to set
+    :return: TraverseProps
+    '''
+    from LandXML.Batch import TraverseProperties
+
+    TraverseProps = TraverseProperties()
+    for name, value in Options.items():
+        setattr(TraverseProps, name, value)
+    setattr(TraverseProps, "ParallelComponents", False)
+
+    return TraverseProps
+
+#plan loaded by LoadWorkerPlan - one per worker process
+WorkerPlan = None
+
+def LoadWorkerPlan(LandXMLFile, Options):
+    '''
+    Worker initializer - loads and indexes LandXMLFile once for all the components traversed
+        by this process
+    :param LandXMLFile: path to LandXML file
+    :param Options: TraverseProps attributes to set
+    '''
+    from LandXML import LandXML_Objects
+
+    global WorkerPlan
+    TraverseProps = HeadlessProps(Options)
+    LandXML_Obj = LandXML_Objects.main(LandXMLFile, TraverseProps)
+    WorkerPlan = LandXML_Objects.PrepareTraverse(LandXML_Obj, TraverseProps)
+
+def ResetTraverseState(LandXML_Obj, Options, Component):
+    '''
+    Clears the state left on LandXML_Obj by the previous component's traverses
+    The parsed elements and indexes are kept
+    :param LandXML_Obj: LandXML data object from LoadWorkerPlan
+    :param Options: TraverseProps attributes to set
+    :param Component: frozenset of pntRefs to traverse
+    '''
+    from LandXML import LandXML_Objects
+
+    TraverseProps = HeadlessProps(Options)
+    setattr(TraverseProps, "tag", LandXML_Obj.TraverseProps.tag)
+    setattr(TraverseProps, "Component", Component)
+    setattr(LandXML_Obj, "TraverseProps", TraverseProps)
+    setattr(LandXML_Obj, "TriedConnections", LandXML_Objects.TriedConnections())
+    RefMarkQueries.GetMonumentTable(LandXML_Obj).Reset()
+    #rebuilt on first use
+    setattr(LandXML_Obj, "BdyHopLabels", None)
+    setattr(LandXML_Obj, "RMProgress", None)
+
+def TraverseComponent(Component, Options, Factory=None):
+    '''
+    Worker - traverses the RMs of one component of the plan loaded by LoadWorkerPlan with no GUI
+    :param Component: frozenset of pntRefs to traverse
+    :param Options: TraverseProps attributes to set
+    :param Factory: DataObjectFactory of the gui the results are merged into
+    :return: calculated Points and Lines - dictionaries keyed by attribute name
+    '''
+    from LandXML.Batch import HeadlessSession
+    from LandXML.RefMarks import RefMark_Traverse
+
+    ResetTraverseState(WorkerPlan, Options, Component)
+    Session = HeadlessSession(Factory)
+    RefMark_Traverse.main(WorkerPlan, Session)
+
+    return dict(Session.CadastralPlan.Points.__dict__), dict(Session.CadastralPlan.Lines.__dict__)
+
+def ParallelMain(LandXML_Obj, gui, Workers=None):
+    '''
+    Traverses each RM component in a worker process and merges the results into gui.CadastralPlan
+    Each worker loads the file once and is then sent only the pntRefs of its components
+    :param LandXML_Obj: LandXML data object - loaded from a file
+    :param gui: data object for GUI
+    :param Workers: number of processes - defaults to the number of cores
+    :return: list of (Points, Lines) per component, None if there are fewer than 2 components
+    '''
+
+    Components = GetRMComponents(LandXML_Obj)
+    if len(Components) < 2 or getattr(LandXML_Obj, "File", None) is None:
+        return None
+
+    Options = TraverseOptions(LandXML_Obj.TraverseProps)
+    Factory = DataObjects.GetDataObjects(gui)
+    with ProcessPoolExecutor(max_workers=Workers, initializer=LoadWorkerPlan,
+                             initargs=(LandXML_Obj.File, Options)) as Executor:
+        Futures = [Executor.submit(TraverseComponent, Component, Options, Factory)
+                   for Component in Components]
+        Results = [Future.result() for Future in Futures]
+
+    for Points, Lines in Results:
+        MergeComponent(gui, Points, Lines)
+    TraverseObserver.GetObserver(gui).Refresh()
+
+    return Results
+
+def MergeComponent(gui, Points, Lines):
+    '''
+    Adds the points and lines calculated for one component to gui.CadastralPlan
+    Lines already in the plan are skipped, the others are renamed in the plan's line count
+    :param gui: data object for GUI
+    :param Points: dictionary of point objects keyed by pntRef
+    :param Lines: dictionary of line objects keyed by attribute name
+    '''
+
+    Plan = gui.CadastralPlan
+    Index = CalculatedIndex.GetCalculatedIndex(Plan)
+    Observer = TraverseObserver.GetObserver(gui)
+    for PntRefNum, point in Points.items():
+        if Index.HasPoint(PntRefNum):
+            continue
+        CalculatedIndex.AddPoint(Plan, PntRefNum, point)
+        Observer.PointAdded(point, "REFERENCE MARKS")
+
+    for key, line in Lines.items():
+        if key == "LineNum" or Index.HasEdge(line.StartRef, line.EndRef):
+            continue
+        CalculatedIndex.AddLine(Plan, LandXML_Traverses.NextLineKey(Plan), line)
+        Observer.LineAdded(line, "REFERENCE MARKS")
@@ -0,0 +1,156 @@
+'''
+Incremental tracking of reference mark traverse progress
+Updated as points are added to the CadastralPlan so the RM loop condition and
+the next traverse start are lookups instead of monument scans
+'''
+from LandXML import BDY_Connections, CalculatedIndex, Connections
+from LandXML.RefMarks import RefMarkQueries
+
+
+class RMProgress:
+
+    def __init__(self, LandXML_Obj):
+        '''
+        Progress of the RM traverses for LandXML_Obj
+            Calculated - points calculated so far
+            Frontier - calculated RMs with observations to uncalculated RMs
+                       (pntRef -> number of those observations), in order calculated
+        Uncalculated SSMs/PMs are held in the MonumentTable
+        :param LandXML_Obj: LandXML data object
+        '''
+        self.LandXML_Obj = LandXML_Obj
+        self.Monuments = RefMarkQueries.GetMonumentTable(LandXML_Obj)
+        self.Index = Connections.GetConnectionIndex(LandXML_Obj)
+        self.BdyLabels = BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+        self.Calculated = set()
+        self.Frontier = {}
+
+    def Track(self, CadastralPlan):
+        '''
+        Updates progress whenever a point is added to CadastralPlan
+        Points already in the plan are counted straight away
+        :param CadastralPlan: CadastralPlan data object
+        '''
+        CalculatedIndex.GetCalculatedIndex(CadastralPlan).AddPointListener(self.PointCalculated)
+
+    def Restrict(self, Component):
+        '''
+        Limits the traverses to the RMs of one network component
+        SSMs/PMs outside Component are no longer counted as uncalculated or used as starts
+        :param Component: set of pntRefs (from RMComponents)
+        '''
+        for PntRefNum in list(self.Monuments.Uncalculated):
+            if PntRefNum not in Component:
+                self.Monuments.MarkCalculated(PntRefNum)
+                self.BdyLabels.MarkCalculated(PntRefNum)
+
+    def RefMarkNeighbours(self, PntRefNum):
+        '''
+        RMs observed from PntRefNum - one entry per observation
+        '''
+        Neighbours = []
+        for Neighbour in self.Index.Neighbours(PntRefNum):
+            if Neighbour in self.Monuments.RefMarks:
+                Neighbours.append(Neighbour)
+
+        return Neighbours
+
+    def PointCalculated(self, PntRefNum):
+        '''
+        Updates the uncalculated SSMs/PMs, frontier and BDY labels for a new point
+        O(number of observations at PntRefNum)
+        :param PntRefNum: calculated point
+        '''
+        if PntRefNum in self.Calculated:
+            return
+        self.Calculated.add(PntRefNum)
+        self.Monuments.MarkCalculated(PntRefNum)
+        self.BdyLabels.MarkCalculated(PntRefNum)
+        if PntRefNum not in self.Monuments.RefMarks:
+            return
+
+        Uncalculated = 0
+        for Neighbour in self.RefMarkNeighbours(PntRefNum):
+            if Neighbour not in self.Calculated:
+                Uncalculated += 1
+            elif Neighbour in self.Frontier:
+                #Neighbour has one less uncalculated RM to traverse to
+                self.Frontier[Neighbour] -= 1
+                if self.Frontier[Neighbour] == 0:
+                    del self.Frontier[Neighbour]
+        if Uncalculated > 0:
+            self.Frontier[PntRefNum] = Uncalculated
+
+    def Remaining(self):
+        '''
+        Number of SSMs/PMs still to calculate
+        '''
+        return self.Monuments.Remaining()
+
+    def NextStart(self):
+        '''
+        Point to start the next traverse from, in order of preference
+            1) a calculated RM with an observation to an uncalculated RM
+            2) an uncalculated SSM/PM with a BDY connection
+            3) any uncalculated SSM/PM
+        Points in LandXML_Obj.TriedConnections (no connection to traverse on) are skipped
+        :return: pntRef, None when all SSMs/PMs are calculated or tried
+        '''
+        if self.Remaining() == 0:
+            return None
+        Tried = getattr(self.LandXML_Obj, "TriedConnections", None)
+        for PntRefNum in self.Frontier:
+            if not hasattr(Tried, PntRefNum):
+                return PntRefNum
+        PntRefNum = self.BdyLabels.NextBdyStart()
+        if PntRefNum is not None and not hasattr(Tried, PntRefNum):
+            return PntRefNum
+        for PntRefNum in self.Monuments.Uncalculated:
+            if not hasattr(Tried, PntRefNum):
+                return PntRefNum
+
+        return None
+
+    def Unreachable(self):
+        '''
+        Uncalculated SSMs/PMs with no path of RM observations from a calculated point
+        Breadth first search from the calculated points - O(RM network)
+        :return: list of pntRefs in monument order
+        '''
+        Reached = set(self.Calculated)
+        Frontier = list(self.Calculated)
+        while len(Frontier) > 0:
+            NextFrontier = []
+            for PntRefNum in Frontier:
+                for Neighbour in self.RefMarkNeighbours(PntRefNum):
+                    if Neighbour not in Reached:
+                        Reached.add(Neighbour)
+                        NextFrontier.append(Neighbour)
+            Frontier = NextFrontier
+
+        return [PntRefNum for PntRefNum in self.Monuments.Uncalculated if PntRefNum not in Reached]
+
+    def Summary(self):
+        '''
+        Progress summary for display or reports
+        :return: dictionary
+        '''
+        return {"ControlMarks": len(self.Monuments.ControlMarks),
+                "Remaining": self.Remaining(),
+                "Calculated": len(self.Calculated),
+                "Frontier": len(self.Frontier),
+                "Unreachable": self.Unreachable()}
+
+
+def GetRMProgress(LandXML_Obj):
+    '''
+    Returns the RMProgress of LandXML_Obj, creating it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: RMProgress
+    '''
+    Progress = getattr(LandXML_Obj, "RMProgress", None)
+    if Progress is None:
+        Progress = RMProgress(LandXML_Obj)
+        setattr(LandXML_Obj, "RMProgress", Progress)
+
+    return Progress
@@ -1,229 +1,192 @@
 '''
 Workflow to filter Connections for a RM traverse
 '''
+import numpy as np
+
 from LandXML.RefMarks import RefMarkQueries
-from LandXML import BDY_Connections, Connections
+from LandXML import BDY_Connections, Connections, Coordinates, ObservationTable, Profiling, TraverseNoConnection
+
+@Profiling.Stage("RM_ConnectionFilter.FilterConnections")
 def FilterConnections(Observations, traverse, CadastralPlan, LandXML_Obj, PntRefNum):
     '''
     Perfroms specific filtering criteria to Connections for A RM traverse
+    Criteria are applied together by RankConnections
     :param Connections: Set of connections to be queried - from LandXML
     :param traverse: current traverse data object
     :param CadastralPlan: CadastralPlan data object
     :param LandXML_Obj: Data object from LandXML file
-    :return: Connections
+    :return: Connection (None if no connection is eligible),
+             list of ConnectionRank best first - the scores the connection was chosen by
     '''
 
-    #1) Remove connections not between RMs and dead ends when no more closes to find
-    Connections = RemoveNonRM_Connections(Observations, traverse, LandXML_Obj, PntRefNum)
-    if len(Connections.__dict__.keys()) == 0:
+    Connection, Ranked = RankConnections(Observations, traverse, LandXML_Obj, PntRefNum)
+    if Connection is None:
         # deal with no connection
-        TraverseNoConnection(traverse, LandXML_Obj.TraverseProps, PntRefNum, LandXML_Obj)
+        TraverseNoConnection.TraverseNoConnection(traverse, LandXML_Obj.TraverseProps, PntRefNum,
+                                                  LandXML_Obj)
+
+    return Connection, Ranked
+
+@Profiling.Stage("RM_ConnectionFilter.RankConnections")
+def RankConnections(Observations, traverse, LandXML_Obj, PntRefNum):
+    '''
+    Scores all candidate connections in one pass and ranks them by, in order:
+        1) end point is an RM and not a dead end (dead ends only when looking for closes)
+        2) end point has a BDY connection - only while TraverseProps.BdyConnections
+        3) bearing within 45 degrees of the last traverse connection
+        4) shortest distance, to the mm
+        5) end point nearest the start of the traverse
+    :param Observations: Set of connections to be queried - from LandXML
+    :param traverse: current traverse data object
+    :param LandXML_Obj: Data object from LandXML file
+    :param PntRefNum: point the connections are made from
+    :return: Connection (None if no connection passes 1), list of ConnectionRank best first
+    '''
+
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    Index = Connections.GetConnectionIndex(LandXML_Obj)
+    BdyLabels = BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+    TraverseProps = LandXML_Obj.TraverseProps
+
+    Candidates = list(Observations.__dict__.values())
+    Profiling.Count("RankConnections.candidates", len(Candidates))
+    if len(Candidates) == 0:
+        return None, []
+    Rows = Table.Rows(Candidates)
+    EndRefNums = [Index.OtherEnd(connection, PntRefNum) for connection in Candidates]
+
+    #point queries - dictionary lookups per end point
+    RefMark = np.array([RefMarkQueries.CheckIfRefMark(LandXML_Obj, EndRefNum)
+                        for EndRefNum in EndRefNums], dtype=bool)
+    DeadEndLegs = getattr(TraverseProps, "DeadEndLegs", 1)
+    if DeadEndLegs > 1:
+        DeadEnd = np.array([DeadEndConnection(EndRefNum, LandXML_Obj, PntRefNum, Legs=DeadEndLegs)
+                            for EndRefNum in EndRefNums], dtype=bool)
+    else:
+        DeadEnd = Table.Degree[Table.OtherEnd(Rows, PntRefNum)] == 1
+    if getattr(TraverseProps, "BdyConnections", False):
+        Bdy = np.array([BdyLabels.BdyConnected(EndRefNum) for EndRefNum in EndRefNums], dtype=bool)
+    else:
+        Bdy = np.zeros(len(Candidates), dtype=bool)
+
+    #numeric criteria - from the observation table
+    Distance = Table.Distance[Rows]
+    LastBearing = LastConnectionBearing(traverse, LandXML_Obj)
+    if LastBearing is None:
+        Deviation = np.zeros(len(Candidates))
+    else:
+        Deviation = np.abs((Table.OrientedAzimuth(Rows, PntRefNum) - LastBearing + 180) % 360 - 180)
+
+    #lines within 1mm are tied on distance
+    RoundedDistance = np.round(Distance, 3)
+    StartDistance = DistanceToStart(traverse, LandXML_Obj, EndRefNums)
+
+    Eligible = RefMark & ~(DeadEnd & bool(getattr(TraverseProps, "TraverseClose", False)))
+    # lexsort uses the last key as the primary key
+    Order = np.lexsort((StartDistance, RoundedDistance, Deviation > 45, ~Bdy, ~Eligible))
+
+    Ranked = []
+    for i in Order:
+        Rank = ConnectionRank()
+        Rank.Connection = Candidates[i]
+        Rank.EndRefNum = EndRefNums[i]
+        Rank.RefMark = bool(RefMark[i])
+        Rank.DeadEnd = bool(DeadEnd[i])
+        Rank.Eligible = bool(Eligible[i])
+        Rank.BdyConnection = bool(Bdy[i])
+        Rank.BearingDeviation = float(Deviation[i])
+        Rank.Distance = float(Distance[i])
+        Rank.DistanceToStart = float(StartDistance[i])
+        Ranked.append(Rank)
+
+    if not Ranked[0].Eligible:
+        return None, Ranked
+
+    return Ranked[0].Connection, Ranked
+
+class ConnectionRank(object):
+    '''
+    Scores of one candidate connection from RankConnections
+    '''
+    pass
+
+def LastConnectionBearing(traverse, LandXML_Obj):
+    '''
+    Bearing of the last connection in the traverse, in the direction of travel
+    :param traverse: traverse data object
+    :param LandXML_Obj: Data object from LandXML file
+    :return: bearing in decimal degrees, None for the first connection
+    '''
+    if len(traverse.refPnts) < 2:
         return None
-    #2) Check for boundary connections if still looking for boundary connections
-    # defined by whether RMs in LandXML have not been calculated  that have a BDY connection
-    # LandXML_Obj.Traverse_Props.BdyConnections
-    # remove non-boundary connected RMs only if there is choice of one with a BDY connection
-    if LandXML_Obj.TraverseProps.BdyConnections:
-        # create instance of Boundary checker
-        ConnectionChecker = BDY_Connections.CheckBdyConnection(PntRefNum, LandXML_Obj)
-        Observations = ConnectionChecker.FilterBdyConnection(Observations)
-
-    # 3) More than 1 connection - select connections with bearing within 45 degrees.
-    if len(Observations.__dict__.keys()) > 1:
-        FinalConnectionFilter = FinalFilter(traverse, LandXML_Obj.TraverseProps)
-        Observations =  FinalConnectionFilter.SimilarBearingConnection(Observations)
-    # 4) if still more than one connection (or no connections) select shortest connection
-    if len(Observations.__dict__.keys()) > 1:
-        Observations = FinalConnectionFilter.FilterByDistance(Observations)
-
-
-    #return connection
-    for key in Observations.__dict__.keys():
-        return Observations.__getattribute__(key)
-    
-def RemoveNonRM_Connections(Observations, traverse, LandXML_Obj, PntRefNum):
+
+    StartRefNum = traverse.refPnts[-2]
+    EndRefNum = traverse.refPnts[-1]
+    Index = Connections.GetConnectionIndex(LandXML_Obj)
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    for connection in Index.Observations(StartRefNum):
+        if Index.OtherEnd(connection, StartRefNum) == EndRefNum:
+            return float(Table.OrientedAzimuth(Table.Rows([connection]), StartRefNum)[0])
+
+    return None
+
+def DistanceToStart(traverse, LandXML_Obj, EndRefNums):
     '''
-    Removes connections that are not between RMs
-    Prioritises BDY connections for enbd point of tested connection (If still applicable)
-    :return: 
+    Distance from the traverse start point to each connection end point
+    :param traverse: traverse data object
+    :param LandXML_Obj: Data object from LandXML file
+    :param EndRefNums: end points of the connections
+    :return: array of distances (inf where either point has no CgPoint coordinates)
     '''
-    #list of connections to delete
-    RemoveObs = []
-    #loop through connections
-    for key in Observations.__dict__.keys():
-        connection = Observations.__getattribute__(key)
-        
-        #get point ref numbers of connection
-        SetupID = connection.get("setupID").replace(LandXML_Obj.TraverseProps.tag, "")
-        TargetSetupID = connection.get("targetSetupID").replace(LandXML_Obj.TraverseProps.tag, "")
-        # get end point of connection
-        if SetupID == PntRefNum:
-            EndRefNum =  TargetSetupID
-        else:
-            EndRefNum = SetupID
-
-        #check if EndPoint is an RM
-        if not RefMarkQueries.CheckIfRefMark(LandXML_Obj, EndRefNum):
-            RemoveObs.append(key)
-            continue
-
-        #remove dead traverses
-        if DeadEndConnection(EndRefNum, LandXML_Obj) and LandXML_Obj.TraverseProps.TraverseClose:
-            RemoveObs.append(key)
-            continue
-            
-    #if Observations were found to delete remove them
-    if len(RemoveObs) > 0:
-        Observations = Connections.RemoveSelectedConnections(Observations, RemoveObs)
-
-    return Observations
-
-def DeadEndConnection(PntRefNum, LandXML_Obj):
+    Store = Coordinates.GetCoordinateStore(LandXML_Obj)
+    Eastings, Northings = Store.GetCoordsBulk(EndRefNums)
+    StartE, StartN = Store.GetCoordsBulk([traverse.refPnts[0]])
+    Distances = np.hypot(Eastings - StartE[0], Northings - StartN[0])
+
+    return np.where(np.isnan(Distances), np.inf, Distances)
+
+@Profiling.Stage("RM_ConnectionFilter.DeadEndConnection")
+def DeadEndConnection(PntRefNum, LandXML_Obj, FromRefNum=None, ExcludeEdges=None, Legs=1):
     '''
     Checks if PntRefNum is a dead end
+    With Legs > 1 follows the chain of single onward connections from PntRefNum
+        (away from FromRefNum) and checks if it dead ends within Legs connections
     :param PntRefNum: Point to query (Point number from LandXML)
     :param LandXML_Obj: LadnXML data object
+    :param FromRefNum: point the chain is entered from - required when Legs > 1
+    :param ExcludeEdges: point name pairs to leave out of the degree count (eg calculated lines)
+    :param Legs: number of connections to follow
     :return:
     '''
-    #Find all connections to PntRefNum - has one connection iof its a dead end
-    Observations = Connections.AllConnections(PntRefNum, LandXML_Obj)
-    if len(Observations.__dict__.keys()) == 1:
+    #degree of each point from the load pass - one connection if its a dead end
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    if ExcludeEdges:
+        Degree = Table.DegreeExcluding(ExcludeEdges)
+        Excluded = set(frozenset(Edge) for Edge in ExcludeEdges)
+    else:
+        Degree = None
+        Excluded = set()
+
+    if Table.PointDegree(PntRefNum, Degree) == 1:
         return True
-    return False
-
+    if Legs <= 1 or FromRefNum is None:
+        return False
+
+    #follow points with one onward connection
+    Index = Connections.GetConnectionIndex(LandXML_Obj)
+    for Leg in range(1, Legs):
+        if Table.PointDegree(PntRefNum, Degree) != 2:
+            return False
+        NextRefNum = None
+        for connection in Index.Observations(PntRefNum):
+            OtherEnd = Index.OtherEnd(connection, PntRefNum)
+            if OtherEnd != FromRefNum and frozenset((PntRefNum, OtherEnd)) not in Excluded:
+                NextRefNum = OtherEnd
+                break
+        if NextRefNum is None:
+            return False
+        FromRefNum, PntRefNum = PntRefNum, NextRefNum
+        if Table.PointDegree(PntRefNum, Degree) == 1:
+            return True
 
-class FinalFilter:
-    def __init__(self, traverse, TraverseProps):
-        '''
-        Filters used when other prioritisation methods have not selected
-            a single connection
-        Contains methods to filter by bearing or distance
-        :param traverse: traverse data object
-        '''
-        self.traverse = traverse
-        self.TraverseProps = TraverseProps
-
-
-    def SimilarBearingConnection(self, Observations):
-        '''
-        Finds a Observations with a bearing within 45 dgrees of last connection
-        if first connection returns all Observations
-        :param Observations: Set of Observations to be queried
-        :param traverse: traverse data object
-        :return: Observations
-        '''
-
-        #Check if first connection
-        if len(self.traverse.refPnts) == 1:
-            return Observations
-
-        #get bearing of last connection
-        LastBearing, EndRefNum = self.FindLastConnectionBearing()
-        #Find Observations within 45 degrees of LastBearing
-        ConnectionList = self.ObservationsWithinBearing(LastBearing, Observations, EndRefNum)
-        #if find Observations within 45 degrees, delete other bearings
-        if len(ConnectionList.__dict__.keys()) > len(Observations.__dict__.keys()):
-            Observations = Connections.RemoveSelectedConnections(Observations, ConnectionList)
-
-        return Observations
-
-    def FindLastConnectionBearing(self):
-        '''
-        Finds the bearing of last connection in the traverse
-        :return:
-        '''
-        StartRefNum = traverse.refPnts[-2]
-        EndRefNum = traverse.refPnts[-1]
-        #get line bearing of lasat connection
-        for key in traverse.Lines.__dict__.keys():
-            Line = traverse.Lines.__getatttribute(key)
-            if Line.StartRef == StartRefNum and Line.EndRef == EndRefNum:
-                return float(Line.bearing), EndRefNum
-
-    def ConnectionsWithinBearing(self, LastBearing, Connections, PntRefNum):
-        '''
-        Finds the connections in Connections object that are within 45 degrees
-            of LastBearing
-        :param LastBearing: Bearing of last connection in traverese
-        :param Connections: Set of Connections from LandXML to query
-        :param PntRefNum: Starting point reference of all connections to be queried
-        :return: ConnectionList (List of connections that pass query)
-        '''
-
-        #Create a list to store connections to remove - only when 1 or more connections pass
-            #bearing query
-        ConnectionList = []
-        #Loop through connections and check if their bearings are within 45 degrees
-        for key in Connections.__dict__.keys():
-            connection = Connections.__getattribute__(key)
-            #Get connections bearing - normalised to same orientation as lat traverse connection
-                #that is setupiD (Last connection) = TargetID (queried connection)
-            if connection.get("setupID").replace(self.Traverse_Props.tag, "") == PntRefNum:
-                azimuth = float(connection.get("azimuth"))
-            else:
-                azimuth = self.FlipBearing(float(connection.get("azimuth")))
-
-            #test of bearing with 45 degrees
-            if abs(LastBearing - azimuth) > 45:
-                ConnectionList.append(key)
-
-        return ConnectionList
-
-    def FlipBearing(self, Bearing):
-        '''
-        Flips bearing by 180 degrees
-        :param Bearing:
-        :return:
-        '''
-
-        Bearing = Bearing + 180
-        if Bearing >= 360:
-            Bearing = Bearing - 360
-
-        return Bearing
-
-    def DeleteConnections(self, Connections, ConnectionsList):
-        '''
-        Deletes Connection that are not in Connection list
-        :param Connections:
-        :param ConnectionsList:
-        :return:
-        '''
-
-        for key in Connections.__dict__.keys():
-            connection = Connections.__getattribute__(key)
-            if connection not in ConnectionsList:
-                delattr(Connections, key)
-
-        return Connections
-
-
-    def FilterByDistance(self, Observations):
-        '''
-        Filters the Observations for the line with the shortest distance
-        :param Observations:
-        :return:
-        '''
-
-        ShortestDistance = 10000
-        ConnectionList = []
-        #Loop through Observations
-        for key in Observations.__dict__.keys():
-            connection = Observations.__getattribute__(key)
-            distance  = float(connection.get("horizDistance"))
-            if distance < ShortestDistance:
-                KeepConnection = key
-                ShortestDistance = distance
-
-
-        #delete all but shortest side
-        for key in Observations.__dict__.keys():
-            if key != KeepConnection:
-                ConnectionList.append(key)
-        Observations = Connections.RemoveSelectedConnections(Observations, ConnectionList)
-
-        return Observations
-
-
-    
-    
\ No newline at end of file
+    return False
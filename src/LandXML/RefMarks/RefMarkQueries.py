@@ -0,0 +1,149 @@
+'''
+Queries on the reference marks in a LandXML file
+All queries are answered from a MonumentTable built once per file
+'''
+
+#monument types treated as reference marks in RM traverses
+REF_MARK_TYPES = ("SSM", "PM")
+#control marks - every one of these is calculated by the RM traverses
+CONTROL_MARK_TYPES = ("SSM", "PM")
+
+
+class MonumentRecord(object):
+    '''
+    Attributes of one monument - Type, MarkNumber, oID, State
+    '''
+    pass
+
+class MonumentTable:
+
+    def __init__(self, LandXML_Obj, Records=None):
+        '''
+        Table of monuments keyed by pntRef
+        MarkNumber is the CgPoint oID of the monument's point (used in RM codes),
+            oID the monument's own oID attribute
+        :param LandXML_Obj: LandXML data object with Monuments and Coordinates
+        :param Records: list of (pntRef, Type, MarkNumber, oID, State) from the plan cache -
+                        the elements are not read
+        '''
+        #pntRef -> MonumentRecord, in monument order
+        self.Records = {}
+        if Records is None:
+            Records = MonumentRows(LandXML_Obj)
+        for PntRefNum, Type, MarkNumber, oID, State in Records:
+            Record = MonumentRecord()
+            Record.Type = Type
+            Record.MarkNumber = MarkNumber
+            Record.oID = oID
+            Record.State = State
+            self.Records[PntRefNum] = Record
+
+        self.RefMarks = frozenset(PntRefNum for PntRefNum, Record in self.Records.items()
+                                  if Record.Type in REF_MARK_TYPES)
+        #SSMs/PMs in monument order
+        self.ControlMarks = [PntRefNum for PntRefNum, Record in self.Records.items()
+                             if Record.Type in CONTROL_MARK_TYPES]
+        self.ControlMarkSet = frozenset(self.ControlMarks)
+        #SSMs/PMs not yet calculated - ordered dict in monument order
+        self.Uncalculated = dict.fromkeys(self.ControlMarks, True)
+
+    def Reset(self):
+        '''
+        Marks every SSM/PM as uncalculated again - for the next traverse of the same file
+        '''
+        self.Uncalculated = dict.fromkeys(self.ControlMarks, True)
+
+    def MarkCalculated(self, PntRefNum):
+        '''
+        Removes PntRefNum from the uncalculated SSMs/PMs
+        :return: number of SSMs/PMs still to calculate
+        '''
+        self.Uncalculated.pop(PntRefNum, None)
+        return len(self.Uncalculated)
+
+    def Remaining(self):
+        '''
+        Number of SSMs/PMs still to calculate
+        '''
+        return len(self.Uncalculated)
+
+    def Rows(self):
+        '''
+        Records as (pntRef, Type, MarkNumber, oID, State) - for the plan cache
+        '''
+        return [(PntRefNum, Record.Type, Record.MarkNumber, Record.oID, Record.State)
+                for PntRefNum, Record in self.Records.items()]
+
+
+def MonumentRows(LandXML_Obj):
+    '''
+    Reads the monuments of LandXML_Obj, first monument of each pntRef only
+    :param LandXML_Obj: LandXML data object with Monuments and Coordinates
+    :return: list of (pntRef, Type, MarkNumber, oID, State) in monument order
+    '''
+    #CgPoint oIDs by point name
+    PointOIDs = {}
+    if hasattr(LandXML_Obj.Coordinates, "getchildren"):
+        for point in LandXML_Obj.Coordinates.getchildren():
+            PointOIDs[point.get("name")] = point.get("oID")
+
+    Rows = []
+    Found = set()
+    for monument in LandXML_Obj.Monuments.getchildren():
+        PntRefNum = monument.get("pntRef")
+        if PntRefNum is None or PntRefNum in Found:
+            continue
+        Found.add(PntRefNum)
+        Rows.append((PntRefNum, monument.get("type"), PointOIDs.get(PntRefNum) or "",
+                     monument.get("oID"), monument.get("state")))
+
+    return Rows
+
+def GetMonumentTable(LandXML_Obj):
+    '''
+    Returns the MonumentTable of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: MonumentTable
+    '''
+    Table = getattr(LandXML_Obj, "MonumentTable", None)
+    if Table is None:
+        Table = MonumentTable(LandXML_Obj)
+        setattr(LandXML_Obj, "MonumentTable", Table)
+
+    return Table
+
+def CheckIfRefMark(LandXML_Obj, PntRefNum):
+    '''
+    Checks if PntRefNum is a reference mark
+    :param LandXML_Obj: LandXML data object
+    :param PntRefNum: point to query
+    :return: Boolean
+    '''
+    return PntRefNum in GetMonumentTable(LandXML_Obj).RefMarks
+
+def CheckIfControlMark(LandXML_Obj, PntRefNum):
+    '''
+    Checks if PntRefNum is an SSM or PM
+    :return: Boolean
+    '''
+    return PntRefNum in GetMonumentTable(LandXML_Obj).ControlMarkSet
+
+def FindMarkType(LandXML_Obj, PntRefNum):
+    '''
+    Monument type of PntRefNum (eg SSM, PM)
+    :return: type string, None if PntRefNum is not a monument
+    '''
+    Record = GetMonumentTable(LandXML_Obj).Records.get(PntRefNum)
+    if Record is None:
+        return None
+    return Record.Type
+
+def GetMarkNumber(LandXML_Obj, PntRefNum):
+    '''
+    Mark number of PntRefNum - oID of its CgPoint
+    :return: mark number string, empty if not known
+    '''
+    Record = GetMonumentTable(LandXML_Obj).Records.get(PntRefNum)
+    if Record is None:
+        return ""
+    return Record.MarkNumber
@@ -1,12 +1,9 @@
 '''
 Workflow for Reference mark traverses
 '''
-import CadastreClasses as DataObjects
-from LandXML import Connections, BDY_Connections, LandXML_Traverses
-from LandXML.RefMarks import TraverseStart
-from TraverseOperations import TraverseOperations
-
-from DrawingObjects import LinesPoints
+from LandXML import Connections, BDY_Connections, DataObjects, LandXML_Traverses, CalculatedIndex, \
+    TraverseNoConnection, TraverseObserver
+from LandXML.RefMarks import TraverseStart, NetworkAdjustment, RefMarkQueries, RMProgress, RMComponents
 
 def main(LandXML_Obj, gui):
     '''
@@ -16,53 +13,123 @@ def main(LandXML_Obj, gui):
     :param gui:
     :return:
     '''
-    
-    #Find start of first traverse
-    StartPoint = TraverseStart.TraverseStart(LandXML_Obj, True)
-    # create point object
-    point = DataObjects.Point(StartPoint.PntRefNum, StartPoint.Easting, StartPoint.Northing,
-                              StartPoint.Northing, None, StartPoint.Code, "REFERENCE MARKS")
-    
-    #create new traverse and add start point
-    traverse = TraverseOperations.NewTraverse("REFERENCE MARKS", StartPoint.PntRefNum, True, point)
+
+    #solve all RMs at once instead of traversing
+    if getattr(LandXML_Obj.TraverseProps, "NetworkAdjustment", False):
+        return AdjustmentMain(LandXML_Obj, gui)
+
+    #traverse independent RM components in worker processes
+    if getattr(LandXML_Obj.TraverseProps, "ParallelComponents", False):
+        Results = RMComponents.ParallelMain(LandXML_Obj, gui,
+                                            getattr(LandXML_Obj.TraverseProps, "Workers", None))
+        if Results is not None:
+            return Results
+
+    #track uncalculated SSMs/PMs - limited to one component when run in a worker
+    Progress = RMProgress.GetRMProgress(LandXML_Obj)
+    Component = getattr(LandXML_Obj.TraverseProps, "Component", None)
+    if Component is not None:
+        Progress.Restrict(Component)
 
     #set traverse props for RM traverses
     setattr(LandXML_Obj.TraverseProps, "TraverseType", "REFERENCE MARKS")
-    setattr(LandXML_Obj.TraverseProps, "BdyConnections", True)
+    #update progress as points are added to the plan
+    Progress.Track(gui.CadastralPlan)
+    BdyLabels = BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+    # GUI objects when run from the GUI, plain data objects otherwise
+    Factory = DataObjects.GetDataObjects(gui)
+    #draws points and lines on the canvas - nothing is drawn when run headless
+    Observer = TraverseObserver.GetObserver(gui)
 
-    #draw point on canvas
-    pointObj = LinesPoints.AddPointToScene(gui.view, point, "REFERENCE MARKS")
-    gui.view.scene.update()
-    
-    #calculate first traverse
-    traverseObj = LandXML_Traverses.Traverse(traverse, gui, LandXML_Obj, StartPoint.PntRefNum)
-    #set traverseProps to prioritise BDY connections
-    setattr(LandXML_Obj.TraverseProps, "BdyConnections", True)
+    #Find start of first traverse
+    StartPoint = TraverseStart.TraverseStart(LandXML_Obj, True)
+    if StartPoint.PntRefNum is None:
+        StartPoint = TraverseStart.TraverseStart(LandXML_Obj, False)
+    FirstTraverse = True
 
     #calculate RM traverses - keeps calculating traverses until all SSMs/PMs are calcd
-    while(not CheckRMsNotCalculated(gui, LandXML_Obj.Monuments)):
-        #complete a traqverse to its close or finish
-        traverseObj = LandXML_Traverses.Traverse(traverse, gui, LandXML_Obj, StartPoint)
+    while StartPoint.PntRefNum is not None:
+        #prioritise BDY connections while uncalculated RMs with a BDY connection remain
+        setattr(LandXML_Obj.TraverseProps, "BdyConnections", BdyLabels.NextBdyStart() is not None)
+        traverse = StartTraverse(StartPoint, FirstTraverse, gui, Factory, Observer)
+        Observer.Refresh()
+        #complete a traverse to its close or finish
+        traverseObj = LandXML_Traverses.Traverse(traverse, gui, LandXML_Obj, StartPoint.PntRefNum)
+        if traverseObj.Legs == 0:
+            #nothing to calculate from here - not used as a start again
+            TraverseNoConnection.TraverseNoConnection(traverse, LandXML_Obj.TraverseProps,
+                                                      StartPoint.PntRefNum, LandXML_Obj)
+        FirstTraverse = False
+        if not CheckRMsNotCalculated(gui, LandXML_Obj):
+            break
         # get start point for new traverse
         StartPoint = TraverseStart.TraverseStart(LandXML_Obj, False)
 
-    
-def CheckRMsNotCalculated(gui, Monuments):
+    #draw anything still queued
+    Observer.Refresh()
+
+def StartTraverse(StartPoint, FirstTraverse, gui, Factory, Observer):
+    '''
+    Creates the traverse from StartPoint
+    The start point is added to the CadastralPlan if it isn't already calculated
+    :param StartPoint: TraverseStart
+    :param FirstTraverse: True for the first traverse of the plan
+    :param gui: gui data object
+    :param Factory: DataObjectFactory
+    :param Observer: TraverseObserver
+    :return: traverse
+    '''
+    point = getattr(gui.CadastralPlan.Points, StartPoint.PntRefNum, None)
+    if point is None:
+        point = Factory.Point(StartPoint.PntRefNum, StartPoint.Easting, StartPoint.Northing,
+                              StartPoint.Northing, None, StartPoint.Code, "REFERENCE MARKS")
+        CalculatedIndex.AddPoint(gui.CadastralPlan, StartPoint.PntRefNum, point)
+        Observer.PointAdded(point, "REFERENCE MARKS")
+
+    return Factory.NewTraverse("REFERENCE MARKS", StartPoint.PntRefNum, FirstTraverse, point)
+
+
+def AdjustmentMain(LandXML_Obj, gui):
+    '''
+    Network adjustment mode - calculates every RM from one least squares solve
+    Holds the traverse start point fixed and adds the adjusted RMs to the CadastralPlan
+    :param LandXML_Obj:
+    :param gui:
+    :return: AdjustmentResult with residuals and misclosures per observation
+    '''
+
+    setattr(LandXML_Obj.TraverseProps, "TraverseType", "REFERENCE MARKS")
+    StartPoint = TraverseStart.TraverseStart(LandXML_Obj, True)
+    Fixed = {}
+    if StartPoint.PntRefNum is not None:
+        Fixed[StartPoint.PntRefNum] = (StartPoint.Easting, StartPoint.Northing)
+    Adjustment = NetworkAdjustment.AdjustNetwork(LandXML_Obj, Fixed)
+    Observer = TraverseObserver.GetObserver(gui)
+    Factory = DataObjects.GetDataObjects(gui)
+
+    for PntRefNum, Easting, Northing in zip(Adjustment.PointNames, Adjustment.Eastings,
+                                            Adjustment.Northings):
+        Code = "RM" + RefMarkQueries.FindMarkType(LandXML_Obj, PntRefNum) + "-" + \
+               RefMarkQueries.GetMarkNumber(LandXML_Obj, PntRefNum)
+        point = Factory.Point(PntRefNum, float(Easting), float(Northing), float(Northing),
+                              None, Code, "REFERENCE MARKS")
+        CalculatedIndex.AddPoint(gui.CadastralPlan, PntRefNum, point)
+        RefMarkQueries.GetMonumentTable(LandXML_Obj).MarkCalculated(PntRefNum)
+        Observer.PointAdded(point, "REFERENCE MARKS")
+
+    Observer.Refresh()
+
+    return Adjustment
+
+def CheckRMsNotCalculated(gui, LandXML_Obj):
     '''
     Checks cadastral plan whether any RMs hav not been calculated from a traverse
     :param gui: data object for GUI
-    :param Monuments: MOnuments element from LandXML
+    :param LandXML_Obj: LandXML data object - progress from its RMProgress
     :return: Boolean (True if RMs haven't been calculated, False otherwise)
     '''
-    
-    for monument in Monuments.getchildren():
-        monumentRefPnt = monument.get("pntRef")
-        if hasattr(gui.CadastralPlanObj.Points, monumentRefPnt):
-            return False
-
-    return True
-
 
-    
+    #picks up any points added to the plan outside CalculatedIndex.AddPoint
+    CalculatedIndex.GetCalculatedIndex(gui.CadastralPlanObj)
 
-    
\ No newline at end of file
+    return RMProgress.GetRMProgress(LandXML_Obj).Remaining() > 0
@@ -0,0 +1,196 @@
+'''
+Plans a complete RM traverse before it is calculated
+The RM observation graph is built once per file. From the traverse start a
+Dijkstra search (weighted by distance) through uncalculated RMs finds the shortest
+traverse that closes - either back onto the start point or onto an RM already in
+the CadastralPlan - so legs no longer need to be searched for one at a time
+
+A loop back to the start is found from the search tree: every point is labelled
+with the first leg of its shortest path, an observation joining two points with
+different first legs closes the loop start -> u -> v -> start. Repeat observations
+of a leg are the same line so they never close a loop
+
+While TraverseProps.BdyConnections is set, traverses through an RM with a BDY
+connection are preferred to shorter traverses without one - the same priority
+RM_ConnectionFilter.RankConnections gives BDY connections over distance
+'''
+import heapq
+
+import numpy as np
+
+from LandXML import BDY_Connections, CalculatedIndex, ObservationTable, Profiling
+from LandXML.RefMarks import RefMarkQueries
+
+
+class RMGraph:
+
+    def __init__(self, LandXML_Obj):
+        '''
+        Adjacency of the reduced observations between reference marks
+            Neighbours - pntRef -> list of (neighbour pntRef, observation row, distance)
+        :param LandXML_Obj: LandXML data object
+        '''
+        Table = ObservationTable.GetObservationTable(LandXML_Obj)
+        Monuments = RefMarkQueries.GetMonumentTable(LandXML_Obj)
+        self.Table = Table
+
+        RefMark = np.array([PntRefNum in Monuments.RefMarks for PntRefNum in Table.PointNames],
+                           dtype=bool)
+        Use = (Table.Setup != Table.Target) & RefMark[Table.Setup] & RefMark[Table.Target] & \
+              np.isfinite(Table.Distance)
+
+        self.Neighbours = {}
+        for Row in np.nonzero(Use)[0].tolist():
+            Setup = Table.PointNames[Table.Setup[Row]]
+            Target = Table.PointNames[Table.Target[Row]]
+            Distance = float(Table.Distance[Row])
+            self.Neighbours.setdefault(Setup, []).append((Target, Row, Distance))
+            self.Neighbours.setdefault(Target, []).append((Setup, Row, Distance))
+
+    def Edges(self, PntRefNum):
+        return self.Neighbours.get(PntRefNum, [])
+
+
+class TraversePlan(object):
+    '''
+    Planned traverse - one entry per leg in traverse order
+    PntRefNums - points from the start to the close (start point first)
+    Rows/Connections - observation row and LandXML element of each leg
+    Length - total distance, Loop - True if the traverse closes on its start point
+    '''
+    pass
+
+def GetRMGraph(LandXML_Obj):
+    '''
+    Returns the RMGraph of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: RMGraph
+    '''
+    Graph = getattr(LandXML_Obj, "RMGraph", None)
+    if Graph is None:
+        Graph = RMGraph(LandXML_Obj)
+        setattr(LandXML_Obj, "RMGraph", Graph)
+
+    return Graph
+
+@Profiling.Stage("TraversePlanner.PlanTraverse")
+def PlanTraverse(LandXML_Obj, StartRef, CadastralPlan):
+    '''
+    Finds the shortest closing traverse from StartRef through uncalculated RMs
+    Calculated RMs (other than StartRef) end a traverse, observations already
+        in the CadastralPlan are not used
+    Closes are ranked by length, after passing through an RM with a BDY connection
+        while TraverseProps.BdyConnections
+    :param LandXML_Obj: LandXML data object
+    :param StartRef: pntRef of the traverse start
+    :param CadastralPlan: CadastralPlan data object
+    :return: TraversePlan, None if no traverse from StartRef closes
+    '''
+
+    Graph = GetRMGraph(LandXML_Obj)
+    PlanIndex = CalculatedIndex.GetCalculatedIndex(CadastralPlan)
+    if getattr(LandXML_Obj.TraverseProps, "BdyConnections", False):
+        BdyLabels = BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+        BdyConnected = BdyLabels.BdyConnected
+    else:
+        BdyConnected = lambda PntRefNum: False
+
+    def Calculated(PntRefNum):
+        return PntRefNum != StartRef and PlanIndex.HasPoint(PntRefNum)
+
+    def Usable(SetupRef, TargetRef):
+        return not PlanIndex.HasEdge(SetupRef, TargetRef)
+
+    #Dijkstra from StartRef - calculated points are reached but not passed through
+    Distance = {StartRef: 0.}
+    Previous = {StartRef: (None, None)}
+    FirstLeg = {StartRef: None}
+    #new point with a BDY connection on the path from StartRef
+    BdyOnPath = {StartRef: False}
+    Settled = set()
+    Heap = [(0., 0, StartRef)]
+    Counter = 1
+    while len(Heap) > 0:
+        Dist, _, PntRefNum = heapq.heappop(Heap)
+        if PntRefNum in Settled:
+            continue
+        Settled.add(PntRefNum)
+        if Calculated(PntRefNum):
+            continue
+        for Neighbour, Row, Length in Graph.Edges(PntRefNum):
+            if Neighbour == StartRef or not Usable(PntRefNum, Neighbour):
+                continue
+            NewDist = Dist + Length
+            if NewDist < Distance.get(Neighbour, np.inf):
+                Distance[Neighbour] = NewDist
+                Previous[Neighbour] = (PntRefNum, Row)
+                FirstLeg[Neighbour] = Row if PntRefNum == StartRef else FirstLeg[PntRefNum]
+                BdyOnPath[Neighbour] = BdyOnPath[PntRefNum] or \
+                    (not Calculated(Neighbour) and BdyConnected(Neighbour))
+                heapq.heappush(Heap, (NewDist, Counter, Neighbour))
+                Counter += 1
+
+    #best close - (no BDY connection, length, loop, path end, closing leg)
+    Best = None
+    for PntRefNum in Settled:
+        if PntRefNum == StartRef:
+            continue
+        if Calculated(PntRefNum):
+            #close onto a point already in the plan - needs at least one new point
+            if Previous[PntRefNum][0] == StartRef:
+                continue
+            Close = (not BdyOnPath[PntRefNum], Distance[PntRefNum], False, PntRefNum, None)
+            if Best is None or Close[:2] < Best[:2]:
+                Best = Close
+            continue
+        for Neighbour, Row, Length in Graph.Edges(PntRefNum):
+            #a repeat observation of the last leg is the same line - not a loop
+            if not Usable(PntRefNum, Neighbour) or Neighbour == Previous[PntRefNum][0]:
+                continue
+            if Neighbour == StartRef:
+                Close = (not BdyOnPath[PntRefNum], Distance[PntRefNum] + Length, True, PntRefNum,
+                         (StartRef, Row))
+            elif Neighbour in Settled and not Calculated(Neighbour) and \
+                    FirstLeg[Neighbour] != FirstLeg[PntRefNum]:
+                Close = (not (BdyOnPath[PntRefNum] or BdyOnPath[Neighbour]),
+                         Distance[PntRefNum] + Length + Distance[Neighbour], True, PntRefNum,
+                         (Neighbour, Row))
+            else:
+                continue
+            if Best is None or Close[:2] < Best[:2]:
+                Best = Close
+
+    if Best is None:
+        return None
+
+    NoBdy, Length, Loop, EndRef, ClosingLeg = Best
+    PntRefNums, Rows = PathTo(Previous, EndRef)
+    if ClosingLeg is not None:
+        #return leg to the start back down the other branch of the search tree
+        ReturnRefs, ReturnRows = PathTo(Previous, ClosingLeg[0])
+        PntRefNums = PntRefNums + ReturnRefs[::-1]
+        Rows = Rows + [ClosingLeg[1]] + ReturnRows[::-1]
+
+    Plan = TraversePlan()
+    Plan.PntRefNums = PntRefNums
+    Plan.Rows = Rows
+    Plan.Connections = [Graph.Table.Element(Row) for Row in Rows]
+    Plan.Length = Length
+    Plan.Loop = Loop
+
+    return Plan
+
+def PathTo(Previous, PntRefNum):
+    '''
+    Path from the search start to PntRefNum
+    :param Previous: pntRef -> (previous pntRef, observation row) from the search
+    :return: list of pntRefs (start first), list of observation rows
+    '''
+    PntRefNums = [PntRefNum]
+    Rows = []
+    while Previous[PntRefNum][0] is not None:
+        PntRefNum, Row = Previous[PntRefNum]
+        PntRefNums.append(PntRefNum)
+        Rows.append(Row)
+
+    return PntRefNums[::-1], Rows[::-1]
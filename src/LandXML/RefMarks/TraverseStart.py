@@ -1,8 +1,8 @@
 '''
 Workflow for finding a point ot start a RefMark from
 '''
-from LandXML import BDY_Connections, Coordinates, Connections
-from LandXML.RefMarks import RefMarkQueries
+from LandXML import BDY_Connections, Coordinates, Connections, SpatialIndex
+from LandXML.RefMarks import RefMarkQueries, RMProgress
 
 class TraverseStart:
     def __init__(self, LandXML_Obj, FirstTraverse):
@@ -14,6 +14,8 @@ class TraverseStart:
 
         #If first traverse Check if control point A is connected to BDY
         self.PntRefNum = None
+        #coordinates of the survey origin when it has no BDY connection
+        self.OriginCoords = None
 
         if FirstTraverse:
             self.CheckSurveyOrigin(LandXML_Obj)
@@ -22,6 +24,19 @@ class TraverseStart:
             if self.PntRefNum is None:
                 self.BdyConnectionStart(LandXML_Obj)
 
+            #a component with no BDY connected RMs starts from any of its SSMs/PMs
+            if self.PntRefNum is None and self.Component(LandXML_Obj) is not None:
+                self.NextTraverseStart(LandXML_Obj)
+        else:
+            self.NextTraverseStart(LandXML_Obj)
+
+    def Component(self, LandXML_Obj):
+        '''
+        RMs the traverses are limited to when traversing one network component
+        :return: set of pntRefs, None when the whole network is traversed
+        '''
+        return getattr(LandXML_Obj.TraverseProps, "Component", None)
+
     def CheckSurveyOrigin(self, LandXML_Obj):
         '''
         Checks survey origin if it is connected to a BDY
@@ -29,45 +44,62 @@ class TraverseStart:
         :param LandXML_obj:
         :return:
         '''
+        Component = self.Component(LandXML_Obj)
         # create instance of Boundary checker
         ConnectionChecker = BDY_Connections.CheckBdyConnection(self.PntRefNum, LandXML_Obj)
 
         #Loop through coordinate points and finds the survey origin
         for point in LandXML_Obj.Coordinates.getchildren():
             if point.get("desc") == "A" and point.get("pntSurv") == "control":
+                if Component is not None and point.get("name") not in Component:
+                    continue
+                self.OriginCoords = Coordinates.getPointCoords(point.get("name"), LandXML_Obj)
                 Observations = Connections.AllConnections(point.get("name"), LandXML_Obj)
                 setattr(ConnectionChecker, "PntRefNum", point.get("name"))
                 if ConnectionChecker.FindBdyConnection(Observations):
                     self.PntRefNum = point.get("name")
                     self.Code = "RM" + RefMarkQueries.FindMarkType(LandXML_Obj, self.PntRefNum) + "-" + \
                                 point.get("oID")
-                    self.Easting, self.Northing = Coordinates.getPointCoords(self.PntRefNum, LandXML_Obj)
+                    self.Easting, self.Northing = self.OriginCoords
+                    self.OriginCoords = None
                     break
     
     def BdyConnectionStart(self, LandXML_Obj):
         '''
         find a reference mark with a boundary connection
+        Takes the one nearest the survey origin if there is one, otherwise the
+            first in monument order
         
         :param LandXML_Obj: 
         :return: 
         '''
-        # create instance of Boundary checker
-        ConnectionChecker = BDY_Connections.CheckBdyConnection(self.PntRefNum, LandXML_Obj)
-
-        #Loop through monuments checking for first SSM/PM with a parcel connection
-        for monument in LandXML_Obj.Monuments.getchildren():
-            MarkType = monument.get("type")
-            if MarkType == "SSM" or MarkType == "PM":                
-                Observations = Connections.AllConnections(monument.get("pntRef"), LandXML_Obj)
-                setattr(ConnectionChecker, "PntRefNum", monument.get("pntRef"))
-                if ConnectionChecker.FindBdyConnection(Observations):
-                    self.PntRefNum = monument.get("pntRef")
-                    self.Code = "RM" + MarkType + "-" + RefMarkQueries.GetMarkNumber(LandXML_Obj, self.PntRefNum)
-                    self.Easting, self.Northing = Coordinates.getPointCoords(self.PntRefNum, LandXML_Obj)
-                    break
-                        
-                    
-                    
-
+        Labels = BDY_Connections.GetBdyHopLabels(LandXML_Obj)
+        PntRefNum = None
+        if self.OriginCoords is not None:
+            Names, Distances = SpatialIndex.GetSpatialIndex(LandXML_Obj).Nearest(
+                *self.OriginCoords, k=1, Filter=lambda Name: Name in Labels.PendingBdyRMs)
+            if len(Names) > 0:
+                PntRefNum = Names[0]
+        #first SSM/PM with a parcel connection - from the boundary hop labels
+        if PntRefNum is None:
+            PntRefNum = Labels.NextBdyStart()
+        if PntRefNum is not None:
+            self.PntRefNum = PntRefNum
+            MarkType = RefMarkQueries.FindMarkType(LandXML_Obj, self.PntRefNum)
+            self.Code = "RM" + MarkType + "-" + RefMarkQueries.GetMarkNumber(LandXML_Obj, self.PntRefNum)
+            self.Easting, self.Northing = Coordinates.getPointCoords(self.PntRefNum, LandXML_Obj)
 
+    def NextTraverseStart(self, LandXML_Obj):
+        '''
+        Start point for traverses after the first - from the RM progress tracker
+        Prefers calculated RMs with observations to uncalculated RMs
 
+        :param LandXML_Obj:
+        :return:
+        '''
+        PntRefNum = RMProgress.GetRMProgress(LandXML_Obj).NextStart()
+        if PntRefNum is not None:
+            self.PntRefNum = PntRefNum
+            MarkType = RefMarkQueries.FindMarkType(LandXML_Obj, self.PntRefNum)
+            self.Code = "RM" + MarkType + "-" + RefMarkQueries.GetMarkNumber(LandXML_Obj, self.PntRefNum)
+            self.Easting, self.Northing = Coordinates.getPointCoords(self.PntRefNum, LandXML_Obj)
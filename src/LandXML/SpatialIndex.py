@@ -0,0 +1,152 @@
+'''
+Uniform grid spatial index over the CgPoint coordinates
+Points are bucketed into square cells (about one point per cell) and stored
+sorted by cell, so a query only looks at the points in the cells it overlaps
+    Radius - points within a distance of a location
+    Nearest - k nearest points, optionally only points passing a filter
+'''
+import numpy as np
+
+from LandXML import Coordinates
+
+
+class SpatialIndex:
+
+    def __init__(self, Store, CellSize=None):
+        '''
+        Builds the grid from a CoordinateStore
+        :param Store: CoordinateStore
+        :param CellSize: cell width - defaults to the extent over the square root of the point count
+        '''
+        self.Names = Store.Names
+        self.Index = Store.Index
+        self.Eastings = np.asarray(Store.Eastings, dtype=np.float64)
+        self.Northings = np.asarray(Store.Northings, dtype=np.float64)
+
+        if len(self.Names) == 0:
+            self.MinE = self.MinN = self.MaxE = self.MaxN = 0.
+            Extent = 1.
+        else:
+            self.MinE = float(self.Eastings.min())
+            self.MinN = float(self.Northings.min())
+            self.MaxE = float(self.Eastings.max())
+            self.MaxN = float(self.Northings.max())
+            Extent = max(float(self.Eastings.max()) - self.MinE, float(self.Northings.max()) - self.MinN, 1.)
+        if CellSize is None:
+            CellSize = Extent / max(np.sqrt(len(self.Names)), 1.)
+        self.CellSize = CellSize
+        self.Extent = Extent
+        self.Columns = int(Extent // CellSize) + 1
+
+        #point rows sorted by cell, CellKeys/CellStart/CellEnd per occupied cell
+        Keys = self.CellKey(*self.Cells(self.Eastings, self.Northings))
+        self.Order = np.argsort(Keys, kind="stable")
+        self.CellKeys, self.CellStart, Counts = np.unique(Keys[self.Order], return_index=True,
+                                                           return_counts=True)
+        self.CellEnd = self.CellStart + Counts
+
+    def Cells(self, Eastings, Northings):
+        return (np.floor((np.asarray(Eastings) - self.MinE) / self.CellSize).astype(np.int64),
+                np.floor((np.asarray(Northings) - self.MinN) / self.CellSize).astype(np.int64))
+
+    def CellKey(self, Column, Row):
+        return Row * self.Columns + Column
+
+    def CandidateRows(self, Easting, Northing, Radius):
+        '''
+        Rows of the points in the cells overlapping the square around the location
+        '''
+        Col0, Row0 = self.Cells(Easting - Radius, Northing - Radius)
+        Col1, Row1 = self.Cells(Easting + Radius, Northing + Radius)
+        Col0, Row0 = max(int(Col0), 0), max(int(Row0), 0)
+        #grid is square - Columns cells each way
+        Col1, Row1 = min(int(Col1), self.Columns - 1), min(int(Row1), self.Columns - 1)
+        if Col1 < Col0 or Row1 < Row0:
+            return np.zeros(0, dtype=np.int64)
+
+        Cols, Rows = np.meshgrid(np.arange(Col0, Col1 + 1), np.arange(Row0, Row1 + 1))
+        Keys = self.CellKey(Cols.ravel(), Rows.ravel())
+        #occupied cells among the overlapped cells
+        Found = np.searchsorted(self.CellKeys, Keys)
+        InRange = Found < len(self.CellKeys)
+        Found = Found[InRange]
+        Found = Found[self.CellKeys[Found] == Keys[InRange]]
+        if len(Found) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        return np.concatenate([self.Order[Start:End] for Start, End in
+                               zip(self.CellStart[Found], self.CellEnd[Found])])
+
+    def Radius(self, Easting, Northing, Radius):
+        '''
+        Points within Radius of a location, nearest first
+        :param Easting: Easting of the location
+        :param Northing: Northing of the location
+        :param Radius: search distance
+        :return: list of point names, array of distances
+        '''
+        Rows = self.CandidateRows(Easting, Northing, Radius)
+        Distances = np.hypot(self.Eastings[Rows] - Easting, self.Northings[Rows] - Northing)
+        Within = Distances <= Radius
+        Rows, Distances = Rows[Within], Distances[Within]
+        Order = np.argsort(Distances, kind="stable")
+
+        return [self.Names[Row] for Row in Rows[Order]], Distances[Order]
+
+    def Nearest(self, Easting, Northing, k=1, Filter=None):
+        '''
+        k nearest points to a location - radius searches growing from one cell
+        :param Easting: Easting of the location
+        :param Northing: Northing of the location
+        :param k: number of points
+        :param Filter: function of a point name, only points it returns True for are counted
+        :return: list of point names, array of distances (fewer than k if not enough points)
+        '''
+        if len(self.Names) == 0:
+            return [], np.zeros(0)
+        #distances from the location to the nearest and farthest corners of the point extent
+        NearE = max(self.MinE - Easting, 0., Easting - self.MaxE)
+        NearN = max(self.MinN - Northing, 0., Northing - self.MaxN)
+        FarE = max(abs(Easting - self.MinE), abs(Easting - self.MaxE))
+        FarN = max(abs(Northing - self.MinN), abs(Northing - self.MaxN))
+        Farthest = np.hypot(FarE, FarN)
+
+        Radius = max(self.CellSize, np.hypot(NearE, NearN))
+        while True:
+            Names, Distances = self.Radius(Easting, Northing, Radius)
+            if Filter is not None:
+                Keep = np.array([Filter(Name) for Name in Names], dtype=bool)
+                Names = [Name for Name, Kept in zip(Names, Keep) if Kept]
+                Distances = Distances[Keep]
+            #every point within Radius has been found, so the first k are the nearest
+            if len(Names) >= k or Radius >= Farthest:
+                return Names[:k], Distances[:k]
+            Radius *= 2
+
+    def NearPoint(self, PntRefNum, Radius):
+        '''
+        Other points within Radius of CgPoint PntRefNum, nearest first
+        :return: list of point names, array of distances
+        '''
+        Names, Distances = self.Radius(*self.Coords(PntRefNum), Radius)
+        Keep = [i for i, Name in enumerate(Names) if Name != PntRefNum]
+
+        return [Names[i] for i in Keep], Distances[Keep]
+
+    def Coords(self, PntRefNum):
+        Row = self.Index[PntRefNum]
+        return float(self.Eastings[Row]), float(self.Northings[Row])
+
+
+def GetSpatialIndex(LandXML_Obj):
+    '''
+    Returns the SpatialIndex of LandXML_Obj, building it on first use
+    :param LandXML_Obj: LandXML data object
+    :return: SpatialIndex
+    '''
+    Index = getattr(LandXML_Obj, "SpatialIndex", None)
+    if Index is None:
+        Index = SpatialIndex(Coordinates.GetCoordinateStore(LandXML_Obj))
+        setattr(LandXML_Obj, "SpatialIndex", Index)
+
+    return Index
@@ -3,6 +3,7 @@ Methods to check for traverse close
 
 Called for each new connection selection - only from RM and BOundary Connection
 '''
+from LandXML import Profiling
 
 class CloseChecker:
     '''
@@ -14,6 +15,7 @@ class CloseChecker:
         self.Close = False #Boolean defining whether a close was possible
         self.CloseConnection = None
 
+    @Profiling.Stage("TraverseClose.RM_Close")
     def RM_Close(self, TraverseProps, CadastralPlan, traverse, Connections):
         '''
         Checks if a close can be found meeting the TraverseProps criteria
@@ -21,27 +23,32 @@ class CloseChecker:
         :param CadastralPlan: CadastralPlan data object
         :param traverse: current traverse data object
         :param Connections: list of connections to query
-        :return: None. Updates self.Close and self.Connections
+        :return: self. Updates self.Close and self.CloseConnection
         '''
 
+        #a close needs at least one new point
+        if len(traverse.refPnts) < 2:
+            return self
+
         #loop through connections
         for key in Connections.__dict__.keys():
             connection = Connections.__getattribute__(key)
             #Get connection start and end point reference numbers
             SetupID = connection.get("setupID").replace(TraverseProps.tag, "")
             TargetSetupID = connection.get("targetSetupID").replace(TraverseProps.tag, "")
-            #check if either end of the connection closes on first point of traverse
-            if (SetupID == traverse.refPnts[0] or TargetSetupID == traverse.refPnts[0]) and \
-                    len(traverse.refPnts) > 1:
+            #end of the connection away from the last traverse point
+            EndRefNum = TargetSetupID if SetupID == traverse.refPnts[-1] else SetupID
+            #check if the connection closes on first point of traverse
+            if EndRefNum == traverse.refPnts[0]:
                 #up date close params
-                self.CloseConnections = connection
+                self.CloseConnection = connection
                 self.Close = True
                 break
                 
             #check if connection closes onto an already calculated point - only if not first traverse
-            if (hasattr(CadastralPlan.Points, SetupID) or \
-                    hasattr(CadastralPlan.Points, TargetSetupID)) and \
-                TraverseProps.FirstTraverse:
-                self.CloseConnections = connection
+            if hasattr(CadastralPlan.Points, EndRefNum) and TraverseProps.FirstTraverse:
+                self.CloseConnection = connection
                 self.Close = True
-                break
\ No newline at end of file
+                break
+
+        return self
\ No newline at end of file
@@ -0,0 +1,22 @@
+'''
+Workflow when a traverse has no connection to continue on
+'''
+from LandXML import LandXML_Objects
+
+
+def TraverseNoConnection(traverse, TraverseProps, PntRefNum, LandXML_Obj):
+    '''
+    Called when no connection from PntRefNum passes the connection filters
+    The traverse finishes at PntRefNum, which is recorded in LandXML_Obj.TriedConnections
+        so it is not used to start another traverse
+    :param traverse: current traverse data object
+    :param TraverseProps: traverse properties
+    :param PntRefNum: point with no connection
+    :param LandXML_Obj: LandXML data object
+    '''
+    Tried = getattr(LandXML_Obj, "TriedConnections", None)
+    if Tried is None:
+        Tried = LandXML_Objects.TriedConnections()
+        setattr(LandXML_Obj, "TriedConnections", Tried)
+    setattr(Tried, PntRefNum, TraverseProps.TraverseType)
+    setattr(traverse, "NoConnection", PntRefNum)
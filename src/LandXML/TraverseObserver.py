@@ -0,0 +1,169 @@
+'''
+Callbacks from the traverse workflow to whatever is displaying it
+The load, index and traverse modules report points, lines and messages to an
+observer instead of drawing on the Qt scene themselves, so they can be imported
+and run without PyQt5. Qt and the drawing modules are only imported by SceneObserver
+'''
+import math
+import time
+
+#queued drawing items and time (s) between scene flushes
+SCENE_BATCH_SIZE = 500
+SCENE_BATCH_INTERVAL = 0.1
+
+
+class TraverseObserver:
+    '''
+    Observer with no display - used when traverses are run headless
+    Subclass and override the methods needed to display progress
+    '''
+
+    def PointAdded(self, point, Layer):
+        '''
+        Called when a point is added to the CadastralPlan
+        :param point: point data object
+        :param Layer: layer name (eg "REFERENCE MARKS")
+        '''
+        pass
+
+    def LineAdded(self, line, Layer):
+        '''
+        Called when a line is added to the CadastralPlan
+        '''
+        pass
+
+    def Draw(self, Function, *args):
+        '''
+        Drawing call for lines, arcs and labels - Function(view, *args)
+        Ignored when there is no display
+        '''
+        pass
+
+    def Refresh(self):
+        '''
+        Called after a group of points/lines has been added
+        '''
+        pass
+
+    def Progress(self, Calculated, Total):
+        '''
+        Called as SSMs/PMs are calculated
+        :param Calculated: number of SSMs/PMs calculated
+        :param Total: number of SSMs/PMs in the plan
+        '''
+        pass
+
+    def Message(self, msg, Title):
+        '''
+        Information for the user - printed when headless
+        '''
+        print(Title + ": " + msg)
+
+
+class SceneObserver(TraverseObserver):
+
+    def __init__(self, view, MaxItems=SCENE_BATCH_SIZE, Interval=SCENE_BATCH_INTERVAL):
+        '''
+        Draws on the GUI's graphics view and shows messages in message boxes
+        Drawing is batched - items are queued and added to the scene together when
+            MaxItems are queued, Interval seconds have passed since the last flush
+            or Refresh is called, with one scene update per flush
+        A single shot QTimer flushes items still queued after Interval, so nothing is left
+            undrawn when a traverse stalls
+        :param view: QGraphicsView of the GUI, None to only show messages
+        :param MaxItems: queued items that trigger a flush
+        :param Interval: longest time (s) items are held before a flush
+        '''
+        self.view = view
+        self.MaxItems = MaxItems
+        self.Interval = Interval
+        #(drawing function, args) in the order queued
+        self.Pending = []
+        self.LastFlush = time.perf_counter()
+        self.Timer = None
+        if view is not None:
+            from PyQt5.QtCore import QTimer
+            from DrawingObjects import LinesPoints
+            self.LinesPoints = LinesPoints
+            self.Timer = QTimer()
+            self.Timer.setSingleShot(True)
+            self.Timer.timeout.connect(self.Flush)
+
+    def Draw(self, Function, *args):
+        '''
+        Queues a drawing call - Function(view, *args) is called at the next flush
+        Used for points, lines, arcs and bearing/distance labels
+        :param Function: drawing function taking the view as its first argument
+        '''
+        if self.view is None:
+            return
+        self.Pending.append((Function, args))
+        #time check flushes while the GUI thread is busy and the timer cannot fire
+        if len(self.Pending) >= self.MaxItems or time.perf_counter() - self.LastFlush >= self.Interval:
+            self.Flush()
+        elif not self.Timer.isActive():
+            self.Timer.start(int(self.Interval * 1000))
+
+    def PointAdded(self, point, Layer):
+        if self.view is None:
+            return
+        self.Draw(self.LinesPoints.AddPointToScene, point, Layer)
+
+    def LineAdded(self, line, Layer):
+        '''
+        Queues the line, or arc for lines with a radius, and its bearing/distance label
+        '''
+        if self.view is None:
+            return
+        if IsArc(line):
+            self.Draw(self.LinesPoints.AddArcToScene, line, Layer)
+        else:
+            self.Draw(self.LinesPoints.AddLineToScene, line, Layer)
+        self.Draw(self.LinesPoints.AddLineLabelToScene, line, Layer)
+
+    def Flush(self):
+        '''
+        Adds the queued items to the scene and updates it once
+        '''
+        self.LastFlush = time.perf_counter()
+        if self.Timer is not None:
+            self.Timer.stop()
+        if self.view is None or len(self.Pending) == 0:
+            return
+        Pending = self.Pending
+        self.Pending = []
+        for Function, args in Pending:
+            Function(self.view, *args)
+        self.view.scene.update()
+
+    def Refresh(self):
+        self.Flush()
+
+    def Message(self, msg, Title):
+        import MessageBoxes
+        MessageBoxes.genericMessage(msg, Title)
+
+
+def IsArc(line):
+    '''
+    Whether a line object is an arc - arcs carry a finite radius (TraverseSideCalcs)
+    '''
+    Radius = getattr(line, "radius", None)
+    return Radius is not None and math.isfinite(float(Radius))
+
+def GetObserver(gui):
+    '''
+    Returns the observer for gui - gui.Observer if set, otherwise a SceneObserver
+    for gui.view or a TraverseObserver when there is no view
+    :param gui: gui data object (or HeadlessSession)
+    :return: TraverseObserver
+    '''
+    Observer = getattr(gui, "Observer", None)
+    if Observer is None:
+        if getattr(gui, "view", None) is not None:
+            Observer = SceneObserver(gui.view)
+        else:
+            Observer = TraverseObserver()
+        setattr(gui, "Observer", Observer)
+
+    return Observer
@@ -2,43 +2,174 @@
 Methods and workflow to calculate new points from a connection selected from the LandXMl
 Adds linework (calcs for arcs)
 Adds traverse side to current traverse and gui
+
+CalcTraverseSides computes all sides of a traverse in one vectorised call - PathSides
+calls it once for a planned traverse. TraverseSide is the single side wrapper used
+while a traverse is searched for one side at a time
 '''
-import genericFunctions as funcs
+import numpy as np
+
+from LandXML import ObservationTable, Profiling
+
+
+class TraverseLegs(object):
+    '''
+    Results of CalcTraverseSides - one entry per side
+    Eastings/Northings are the coordinates of the end point of each side
+    '''
+    pass
+
+@Profiling.Stage("TraverseSideCalcs.CalcTraverseSides")
+def CalcTraverseSides(Bearings, Distances, StartEasting, StartNorthing, Radii=None,
+                      ArcLengths=None, Rotations=None, TangentBearings=False):
+    '''
+    Calculates the coordinates of every point along a traverse in one call
+    Sides with a finite radius are arcs - their chord length is calculated from
+        the arc length and radius, Distances is ignored for them
+    :param Bearings: bearings of each side in decimal degrees (chord bearing for arcs),
+                     oriented in the direction of the traverse
+    :param Distances: horizontal distance of each side
+    :param StartEasting: Easting of the traverse start point
+    :param StartNorthing: Northing of the traverse start point
+    :param Radii: arc radius of each side, NaN for lines
+    :param ArcLengths: arc length of each side, NaN for lines
+    :param Rotations: 1 for clockwise arcs, -1 for anti-clockwise
+    :param TangentBearings: True if arc bearings are the tangent at the start of the arc
+    :return: TraverseLegs (Eastings, Northings, ChordLengths, ChordBearings)
+    '''
+
+    Bearings = np.asarray(Bearings, dtype=np.float64)
+    ChordLengths = np.array(Distances, dtype=np.float64)
+    ChordBearings = Bearings.copy()
+
+    if Radii is not None:
+        Radii = np.asarray(Radii, dtype=np.float64)
+        ArcLengths = np.asarray(ArcLengths, dtype=np.float64)
+        Arcs = np.isfinite(Radii)
+        #half the angle subtended by each arc
+        HalfAngle = ArcLengths[Arcs] / (2 * Radii[Arcs])
+        ChordLengths[Arcs] = 2 * Radii[Arcs] * np.sin(HalfAngle)
+        if TangentBearings:
+            if Rotations is None:
+                Rotations = np.ones(len(Bearings))
+            Rotations = np.asarray(Rotations, dtype=np.float64)
+            ChordBearings[Arcs] = (Bearings[Arcs] + Rotations[Arcs] * np.degrees(HalfAngle)) % 360
+
+    BearingRadians = np.radians(ChordBearings)
+    Legs = TraverseLegs()
+    Legs.Eastings = StartEasting + np.cumsum(ChordLengths * np.sin(BearingRadians))
+    Legs.Northings = StartNorthing + np.cumsum(ChordLengths * np.cos(BearingRadians))
+    Legs.ChordLengths = ChordLengths
+    Legs.ChordBearings = ChordBearings
+
+    return Legs
+
+@Profiling.Stage("TraverseSideCalcs.PathSides")
+def PathSides(LandXML_Obj, Rows, PntRefNums, StartEasting, StartNorthing):
+    '''
+    Calculates every side of a traverse along known observations in one CalcTraverseSides call
+    Bearings are oriented along the traverse, arc rotations are reversed with them
+    :param LandXML_Obj: LandXML data object - side values are read from its ObservationTable
+    :param Rows: observation row of each side, in traverse order
+    :param PntRefNums: points of the traverse, start point first - one more than Rows
+    :param StartEasting: Easting of the traverse start point
+    :param StartNorthing: Northing of the traverse start point
+    :return: TraverseLegs, with the Bearings, Radii, ArcLengths and Rotations of each side
+    '''
+    Table = ObservationTable.GetObservationTable(LandXML_Obj)
+    Rows = np.asarray(Rows, dtype=np.int64)
+    SideStart = np.array([Table.PointID(PntRefNum) for PntRefNum in PntRefNums[:-1]],
+                         dtype=np.int64)
+    #observations made towards the start of their side
+    Flip = Table.Setup[Rows] != SideStart
+    Bearings = Table.Azimuth[Rows]
+    Bearings[Flip] = (Bearings[Flip] + 180) % 360
+    Radii = np.where(Table.IsArc[Rows], Table.Radius[Rows], np.nan)
+    ArcLengths = np.where(Table.IsArc[Rows], Table.ArcLength[Rows], np.nan)
+    Rotations = np.where(Table.IsArc[Rows], Table.Rotation[Rows], 0).astype(np.int64)
+    Rotations[Flip] = -Rotations[Flip]
+
+    Legs = CalcTraverseSides(Bearings, Table.Distance[Rows], StartEasting, StartNorthing, Radii,
+                             ArcLengths, Rotations)
+    Legs.Bearings = Bearings
+    Legs.Radii = Radii
+    Legs.ArcLengths = ArcLengths
+    Legs.Rotations = Rotations
+
+    return Legs
+
+
 class TraverseSide:
 
-    def __init__(self, PntRefNum, traverse, Connection, gui):
+    def __init__(self, PntRefNum, traverse, Connection, gui, LandXML_Obj=None):
         '''
         Initialise class attributes
         :param PntRefNum: RefNum for start of traverse side
         :param traverse: traverse data object
         :param Connection: Connection to be added
         :param gui:
+        :param LandXML_Obj: LandXML data object - side values are read from its ObservationTable
         '''
         self.PntRefNum = PntRefNum
         self.traverse = traverse
         self.Connection = Connection
         self.gui = gui
+        self.LandXML_Obj = LandXML_Obj
+        self.radius = np.nan
+        self.arcLength = np.nan
+        self.rotation = 0
 
-    def CalcPointCoordsWorkflow(self):
+    @Profiling.Stage("TraverseSideCalcs.CalcPointCoordsWorkflow")
+    def CalcPointCoordsWorkflow(self, StartEasting, StartNorthing):
         '''
         Calculates the coordinates of the point at the end of the connection
+        :param StartEasting: Easting of PntRefNum
+        :param StartNorthing: Northing of PntRefNum
         :return:
         '''
-        self.ConnectionBearing()
-        self.ConnectionDistance()
-        self.CalcPointChords()
+        if self.LandXML_Obj is not None:
+            self.ConnectionValues()
+        else:
+            self.ConnectionBearing()
+            self.ConnectionDistance()
+        self.CalcPointCoords(StartEasting, StartNorthing)
 
+    def ConnectionValues(self):
+        '''
+        Reads bearing, distance and arc values of the connection from the ObservationTable
+        Bearing is oriented from PntRefNum, arc rotation is reversed with it
+        '''
+        Table = ObservationTable.GetObservationTable(self.LandXML_Obj)
+        Row = Table.Row(self.Connection)
+        self.bearing = float(Table.OrientedAzimuth(np.array([Row]), self.PntRefNum)[0])
+        self.distance = float(Table.Distance[Row])
+        if Table.IsArc[Row]:
+            self.radius = float(Table.Radius[Row])
+            self.arcLength = float(Table.ArcLength[Row])
+            self.rotation = int(Table.Rotation[Row])
+            if Table.Setup[Row] != Table.PointID(self.PntRefNum):
+                self.rotation = -self.rotation
+
+    def Reversed(self):
+        '''
+        Whether the connection is observed towards PntRefNum - PntRefNum is not its setup point
+        :return: Boolean
+        '''
+        return ObservationTable.SetupPointName(self.Connection.get("setupID")) != self.PntRefNum
 
     def ConnectionBearing(self):
         '''
         return connection bearing from landXML element
         Accounts for chord attributes of Arcs
+        Oriented from PntRefNum - reversed when the connection is observed towards it
         :return: bearing
         '''
-        try:
-            self.bearing = self.Connection.get("azimuth")
-        except AttributeError:
-            self.bearing = self.Connection.get("chordAzimuth")
+        if self.Connection.get("azimuth") is not None:
+            self.bearing = ObservationTable.DMS2Decimal(self.Connection.get("azimuth"))
+        else:
+            self.bearing = ObservationTable.DMS2Decimal(self.Connection.get("chordAzimuth"))
+        if self.Reversed():
+            self.bearing = (self.bearing + 180) % 360
 
     def ConnectionDistance(self):
         '''
@@ -46,13 +177,15 @@ class TraverseSide:
         Accounts for chord attributes of Arcs
         :return: distance
         '''
-        try:
-            self.distance = self.Connection.get("horizDistance")
-        except AttributeError:
-            arcLength = self.Connection.get("length")
-            self.radius = self.Connection.get("radius")
-            self.rotation = self.Connection.get("rot")
-            self.distance = self.CalcChordLength(arcLength)
+        if self.Connection.get("horizDistance") is not None:
+            self.distance = float(self.Connection.get("horizDistance"))
+        else:
+            self.arcLength = float(self.Connection.get("length"))
+            self.radius = float(self.Connection.get("radius"))
+            self.rotation = -1 if self.Connection.get("rot") == "ccw" else 1
+            if self.Reversed():
+                self.rotation = -self.rotation
+            self.distance = self.CalcChordLength(self.arcLength)
 
     def CalcChordLength(self, arcLength):
         '''
@@ -64,21 +197,13 @@ class TraverseSide:
         distance = 2 * self.radius * np.sin(arcLength / (2 * self.radius))
         return distance
 
-    def CalcPointCoords(self):
+    def CalcPointCoords(self, StartEasting, StartNorthing):
         '''
         Calculates the coordinates of the new point
         creates attributes for their E and N
         '''
-        #convert bearing to decimal
-        bearing = funcs.bearing2_dec(self.bearing)
-
-        #calc Easting, northing
-    def AddPoint2Traverse(self):
-
-    def AddPoint2GUI(self):
-
-    def AddLine2Traverse(self):
-    def AddLine2GUI(self):
-    def ArcCalcs(self):
-    def AddArc2GUI(self):
-    def AddLineBearingDistance2GUI(self):
\ No newline at end of file
+        Legs = CalcTraverseSides([self.bearing], [self.distance], StartEasting, StartNorthing,
+                                 [self.radius], [self.arcLength], [self.rotation])
+        self.Easting = float(Legs.Eastings[0])
+        self.Northing = float(Legs.Northings[0])
+        self.distance = float(Legs.ChordLengths[0])
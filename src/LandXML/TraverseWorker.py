@@ -0,0 +1,264 @@
+'''
+Runs the LandXML load and RM traverses on a worker thread so the GUI stays responsive
+- the worker computes into its own CadastralPlan
+- calculated points and lines are sent to the GUI thread in batches through signals,
+  throttled by count and time, and merged into gui.CadastralPlan there
+- progress is reported as SSMs/PMs are calculated, Cancel stops the traverses at the
+  next calculated point (points already sent are kept)
+
+GUI front-end only - imports PyQt5
+'''
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from LandXML import CalculatedIndex, DataObjects, LandXML_Objects, TraverseObserver
+from LandXML.RefMarks import RefMarkQueries
+
+#points/lines per batch and maximum time between batches (s)
+BATCH_SIZE = 200
+BATCH_INTERVAL = 0.25
+
+
+class TraverseCancelled(Exception):
+    pass
+
+
+class BatchObserver(TraverseObserver.TraverseObserver):
+
+    def __init__(self, Worker):
+        '''
+        Observer of the worker's traverses - collects the points and lines added to the
+        worker's CadastralPlan and passes them to Worker in batches, checks for
+        cancellation at each point and line
+        :param Worker: TraverseWorker
+        '''
+        self.Worker = Worker
+        self.Plan = None
+        self.PointRefs = []
+        self.LineKeys = []
+        #first point is sent straight away
+        self.LastFlush = 0.
+
+    def Track(self, CadastralPlan):
+        '''
+        Collects the pntRef of each point and the key of each line added to CadastralPlan
+        '''
+        self.Plan = CadastralPlan
+        Index = CalculatedIndex.GetCalculatedIndex(CadastralPlan)
+        Index.AddPointListener(self.PointCalculated)
+        Index.AddLineListener(self.LineCalculated)
+
+    def PointCalculated(self, PntRefNum):
+        self.PointRefs.append(PntRefNum)
+        self.Batch()
+
+    def LineCalculated(self, key):
+        self.LineKeys.append(key)
+        self.Batch()
+
+    def Batch(self):
+        '''
+        Stops the traverses if cancelled, flushes when the batch is full or BATCH_INTERVAL has passed
+        '''
+        if self.Worker.CancelRequested:
+            raise TraverseCancelled()
+        if len(self.PointRefs) + len(self.LineKeys) >= BATCH_SIZE or \
+                time.perf_counter() - self.LastFlush >= BATCH_INTERVAL:
+            self.Flush()
+
+    def Message(self, msg, Title):
+        self.Worker.Message.emit(msg, Title)
+
+    def Flush(self):
+        '''
+        Sends points and lines added since the last flush, and the progress, to the GUI thread
+        Line ends not yet in Points are kept for the next flush
+        '''
+        self.LastFlush = time.perf_counter()
+        if self.Plan is None:
+            return
+        Points = []
+        PointRefs = []
+        for PntRefNum in self.PointRefs:
+            point = getattr(self.Plan.Points, PntRefNum, None)
+            if point is None:
+                PointRefs.append(PntRefNum)
+            else:
+                Points.append((PntRefNum, point))
+        self.PointRefs = PointRefs
+        if len(Points) > 0:
+            self.Worker.PointsReady.emit(Points)
+
+        if len(self.LineKeys) > 0:
+            Lines = [(key, getattr(self.Plan.Lines, key)) for key in self.LineKeys
+                     if hasattr(self.Plan.Lines, key)]
+            self.LineKeys = []
+            if len(Lines) > 0:
+                self.Worker.LinesReady.emit(Lines)
+
+        if self.Worker.LandXML_Obj is not None:
+            Monuments = RefMarkQueries.GetMonumentTable(self.Worker.LandXML_Obj)
+            Total = len(Monuments.ControlMarks)
+            self.Worker.Progress.emit(Total - Monuments.Remaining(), Total)
+
+
+class TraverseWorker(QObject):
+    PointsReady = pyqtSignal(list)
+    LinesReady = pyqtSignal(list)
+    Progress = pyqtSignal(int, int)
+    Message = pyqtSignal(str, str)
+    Finished = pyqtSignal(object)
+    Cancelled = pyqtSignal()
+    Failed = pyqtSignal(str)
+
+    def __init__(self, LandXMLFile, TraverseProps, Factory=None):
+        '''
+        Loads LandXMLFile and calculates its RM traverses when run is called on the worker thread
+        :param LandXMLFile: path to LandXML file
+        :param TraverseProps: traverse properties
+        :param Factory: DataObjectFactory of the gui the points are sent to
+        '''
+        super().__init__()
+        self.LandXMLFile = LandXMLFile
+        self.TraverseProps = TraverseProps
+        self.Factory = Factory
+        self.LandXML_Obj = None
+        self.CancelRequested = False
+
+    def Cancel(self):
+        '''
+        Requests the traverses stop - safe to call from the GUI thread
+        '''
+        self.CancelRequested = True
+
+    @pyqtSlot()
+    def run(self):
+        from LandXML.Batch import HeadlessSession
+        from LandXML.RefMarks import RefMark_Traverse
+
+        Observer = BatchObserver(self)
+        try:
+            LandXML_Obj = LandXML_Objects.main(self.LandXMLFile, self.TraverseProps)
+            setattr(LandXML_Obj, "TriedConnections", LandXML_Objects.TriedConnections())
+            LandXML_Obj = LandXML_Objects.PrepareTraverse(LandXML_Obj, self.TraverseProps)
+            LandXML_Objects.SaveToCache(LandXML_Obj)
+            setattr(LandXML_Obj, "RefMarks", LandXML_Objects.HasRefMarks(LandXML_Obj))
+            self.LandXML_Obj = LandXML_Obj
+            if self.CancelRequested:
+                raise TraverseCancelled()
+
+            if LandXML_Obj.RefMarks:
+                Session = HeadlessSession(self.Factory)
+                Session.Observer = Observer
+                Observer.Track(Session.CadastralPlan)
+                RefMark_Traverse.main(LandXML_Obj, Session)
+            else:
+                msg = "No SSMs or PMs in the selected LandXML file: " + self.LandXMLFile
+                self.Message.emit(msg, "No Reference Marks in LandXML")
+            Observer.Flush()
+            self.Finished.emit(LandXML_Obj)
+        except TraverseCancelled:
+            Observer.Flush()
+            self.Cancelled.emit()
+        except Exception:
+            Observer.Flush()
+            self.Failed.emit(traceback.format_exc())
+
+
+class TraverseReceiver(QObject):
+
+    def __init__(self, gui):
+        '''
+        Lives on the GUI thread - merges the worker's batches into gui.CadastralPlan
+        and draws them through the gui's observer with one refresh per batch
+        :param gui: gui data object
+        '''
+        super().__init__()
+        self.gui = gui
+        self.Observer = TraverseObserver.GetObserver(gui)
+        self.LandXML_Obj = None
+
+    @pyqtSlot(list)
+    def AddPoints(self, Points):
+        Plan = self.gui.CadastralPlan
+        for PntRefNum, point in Points:
+            CalculatedIndex.AddPoint(Plan, PntRefNum, point)
+            self.Observer.PointAdded(point, "REFERENCE MARKS")
+        self.Observer.Refresh()
+
+    @pyqtSlot(list)
+    def AddLines(self, Lines):
+        Plan = self.gui.CadastralPlan
+        for key, line in Lines:
+            if hasattr(Plan.Lines, key):
+                continue
+            CalculatedIndex.AddLine(Plan, key, line)
+            self.Observer.LineAdded(line, "REFERENCE MARKS")
+        self.Observer.Refresh()
+
+    @pyqtSlot(int, int)
+    def Progress(self, Calculated, Total):
+        self.Observer.Progress(Calculated, Total)
+
+    @pyqtSlot(str, str)
+    def Message(self, msg, Title):
+        self.Observer.Message(msg, Title)
+
+    @pyqtSlot(object)
+    def Finished(self, LandXML_Obj):
+        self.LandXML_Obj = LandXML_Obj
+
+    @pyqtSlot()
+    def Cancelled(self):
+        self.Observer.Message("RM traverses cancelled - calculated points have been kept",
+                              "LandXML traverse cancelled")
+
+    @pyqtSlot(str)
+    def Failed(self, Error):
+        self.Observer.Message(Error, "LandXML traverse failed")
+
+    @pyqtSlot()
+    def ThreadFinished(self):
+        setattr(self.gui, "LandXMLWorker", None)
+
+
+def StartTraverse(gui, LandXMLFile, TraverseProps):
+    '''
+    Starts loading and traversing LandXMLFile on a worker thread
+    Thread, worker and receiver are kept on gui.LandXMLWorker until the thread finishes
+    :param gui: gui data object
+    :param LandXMLFile: path to LandXML file
+    :param TraverseProps: traverse properties
+    :return: TraverseWorker
+    '''
+    Thread = QThread()
+    Worker = TraverseWorker(LandXMLFile, TraverseProps, DataObjects.GetDataObjects(gui))
+    Receiver = TraverseReceiver(gui)
+    Worker.moveToThread(Thread)
+
+    Thread.started.connect(Worker.run)
+    Worker.PointsReady.connect(Receiver.AddPoints)
+    Worker.LinesReady.connect(Receiver.AddLines)
+    Worker.Progress.connect(Receiver.Progress)
+    Worker.Message.connect(Receiver.Message)
+    Worker.Finished.connect(Receiver.Finished)
+    Worker.Cancelled.connect(Receiver.Cancelled)
+    Worker.Failed.connect(Receiver.Failed)
+    for Signal in (Worker.Finished, Worker.Cancelled, Worker.Failed):
+        Signal.connect(Thread.quit)
+    Thread.finished.connect(Receiver.ThreadFinished)
+
+    setattr(gui, "LandXMLWorker", (Thread, Worker, Receiver))
+    Thread.start()
+
+    return Worker
+
+def CancelTraverse(gui):
+    '''
+    Cancels the running LandXML worker of gui, if any
+    '''
+    Running = getattr(gui, "LandXMLWorker", None)
+    if Running is not None:
+        Running[1].Cancel()
@@ -0,0 +1,128 @@
+'''
+Checks the points calculated into a CadastralPlan against the published CgPoint coordinates
+Points are joined to the CoordinateStore by pntRef and residuals calculated for all
+points at once:
+    dE, dN - calculated less published coordinates
+    Radial - length of (dE, dN), flagged where greater than the tolerance
+Points with no CgPoint coordinates are reported as unmatched, points whose written
+coordinates are not numbers as unreadable
+'''
+import numpy as np
+
+from LandXML import Coordinates, Profiling
+
+#default radial tolerance (m)
+TOLERANCE = 0.02
+#points listed in the summary, largest radial residual first
+WORST_POINTS = 20
+
+
+class CoordinateValidation:
+
+    @Profiling.Stage("Validation.CoordinateValidation")
+    def __init__(self, LandXML_Obj, CadastralPlan, Tolerance=TOLERANCE):
+        '''
+        Residuals of the calculated points of CadastralPlan against CgPoints
+            PointNames - calculated points, in the order of the arrays
+            Unreadable - points without numeric E/N attributes, not in the arrays
+            Matched - bool, point has CgPoint coordinates
+            dE, dN, Radial - residuals (NaN where not matched)
+            Exceeds - bool, Radial greater than Tolerance
+        :param LandXML_Obj: LandXML data object
+        :param CadastralPlan: CadastralPlan data object with the calculated points
+        :param Tolerance: radial tolerance (m)
+        '''
+        self.Tolerance = Tolerance
+        self.PointNames, self.Eastings, self.Northings, self.Unreadable = PointCoordinates(CadastralPlan)
+
+        Store = Coordinates.GetCoordinateStore(LandXML_Obj)
+        self.PublishedEastings, self.PublishedNorthings = Store.GetCoordsBulk(self.PointNames)
+        self.Matched = ~np.isnan(self.PublishedEastings)
+        self.dE = self.Eastings - self.PublishedEastings
+        self.dN = self.Northings - self.PublishedNorthings
+        self.Radial = np.hypot(self.dE, self.dN)
+        #NaN residuals of unmatched points compare False
+        self.Exceeds = self.Radial > Tolerance
+
+    def __len__(self):
+        return len(self.PointNames)
+
+    def Unmatched(self):
+        '''
+        Calculated points with no CgPoint coordinates
+        :return: list of pntRefs
+        '''
+        return [self.PointNames[Row] for Row in np.nonzero(~self.Matched)[0]]
+
+    def Outliers(self, Limit=None):
+        '''
+        Points with a radial residual greater than the tolerance, largest first
+        :param Limit: maximum number of points returned
+        :return: list of (pntRef, dE, dN, Radial)
+        '''
+        Rows = np.nonzero(self.Exceeds)[0]
+        Rows = Rows[np.argsort(-self.Radial[Rows], kind="stable")][:Limit]
+
+        return [(self.PointNames[Row], float(self.dE[Row]), float(self.dN[Row]), float(self.Radial[Row]))
+                for Row in Rows]
+
+    def Summary(self, Limit=WORST_POINTS):
+        '''
+        Counts and residual statistics of the matched points
+        :param Limit: number of outliers listed
+        :return: dictionary
+        '''
+        Summary = {"tolerance": self.Tolerance,
+                   "points": len(self),
+                   "matched": int(self.Matched.sum()),
+                   "unmatched": int((~self.Matched).sum()),
+                   "unreadable": len(self.Unreadable),
+                   "unreadable_points": self.Unreadable[:Limit],
+                   "exceeding": int(self.Exceeds.sum())}
+        if Summary["matched"] == 0:
+            return Summary
+
+        dE, dN, Radial = self.dE[self.Matched], self.dN[self.Matched], self.Radial[self.Matched]
+        Summary.update({"mean_dE": float(dE.mean()),
+                        "mean_dN": float(dN.mean()),
+                        "rms_dE": float(np.sqrt(np.mean(dE ** 2))),
+                        "rms_dN": float(np.sqrt(np.mean(dN ** 2))),
+                        "rms_radial": float(np.sqrt(np.mean(Radial ** 2))),
+                        "p95_radial": float(np.percentile(Radial, 95)),
+                        "max_radial": float(Radial.max()),
+                        "outliers": self.Outliers(Limit)})
+
+        return Summary
+
+
+def PointCoordinates(CadastralPlan):
+    '''
+    Coordinates of the calculated points as written to the batch output (Batch.ScalarAttributes)
+    :param CadastralPlan: CadastralPlan data object
+    :return: point names, Eastings, Northings (arrays in order of the names),
+             list of points without numeric E and N
+    '''
+    from LandXML.Batch import ScalarAttributes
+
+    PointNames = []
+    Eastings = []
+    Northings = []
+    Unreadable = []
+    for PntRefNum, Attributes in ScalarAttributes(CadastralPlan.Points).items():
+        Easting, Northing = Attributes.get("E"), Attributes.get("N")
+        if isinstance(Easting, (int, float)) and isinstance(Northing, (int, float)) and \
+                not isinstance(Easting, bool) and not isinstance(Northing, bool):
+            PointNames.append(PntRefNum)
+            Eastings.append(Easting)
+            Northings.append(Northing)
+        else:
+            Unreadable.append(PntRefNum)
+
+    return PointNames, np.array(Eastings, dtype=np.float64), np.array(Northings, dtype=np.float64), Unreadable
+
+def ValidatePlan(LandXML_Obj, CadastralPlan, Tolerance=TOLERANCE):
+    '''
+    Validates the calculated points of CadastralPlan against the CgPoints of LandXML_Obj
+    :return: summary dictionary - see CoordinateValidation.Summary
+    '''
+    return CoordinateValidation(LandXML_Obj, CadastralPlan, Tolerance).Summary()
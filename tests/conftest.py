@@ -0,0 +1,69 @@
+'''
+Test set up - the LandXML package is imported from src
+Small plans are written from their parts by WritePlan and loaded without the GUI by LoadPlan
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from LandXML import Batch, LandXML_Objects
+from LandXML.Benchmarks.SyntheticLandXML import Decimal2DMS, NAMESPACE
+
+
+def PlanXML(Points, Monuments=(), Observations=(), Parcels=""):
+    '''
+    LandXML text of a plan
+    :param Points: dictionary of point name -> (Easting, Northing)
+    :param Monuments: list of (pntRef, type) in monument order
+    :param Observations: list of (setup, target, bearing in decimal degrees, distance)
+    :param Parcels: Parcel elements
+    :return: string
+    '''
+    CgPoints = "".join('<CgPoint name="%s" oID="%s">%.4f %.4f</CgPoint>' % (Name, Name, North, East)
+                       for Name, (East, North) in Points.items())
+    MonumentText = "".join('<Monument name="%s" pntRef="%s" type="%s" state="found" oID="M%s"/>' %
+                           (PntRefNum, PntRefNum, Type, PntRefNum) for PntRefNum, Type in Monuments)
+    ObservationText = "".join('<ReducedObservation name="%d" setupID="IS-%s" targetSetupID="IS-%s" '
+                              'azimuth="%s" horizDistance="%.4f" purpose="normal"/>' %
+                              (Num, Setup, Target, Decimal2DMS(Bearing), Distance)
+                              for Num, (Setup, Target, Bearing, Distance) in enumerate(Observations))
+    Group = "<ObservationGroup>%s</ObservationGroup>" % ObservationText if Observations else ""
+
+    return ('<LandXML xmlns="%s"><CgPoints>%s</CgPoints><Monuments>%s</Monuments>'
+            '<Parcels>%s</Parcels><Survey><SurveyHeader name="DP1"/>%s</Survey></LandXML>' %
+            (NAMESPACE, CgPoints, MonumentText, Parcels, Group))
+
+@pytest.fixture
+def WritePlan(tmp_path):
+    '''
+    Writes PlanXML(*args) to a file in tmp_path
+    :return: function returning the file path
+    '''
+    def Write(*args, **kwargs):
+        File = str(tmp_path / "plan.xml")
+        with open(File, "w") as f:
+            f.write(PlanXML(*args, **kwargs))
+        return File
+
+    return Write
+
+@pytest.fixture
+def LoadPlan():
+    '''
+    Loads a LandXML file with the headless TraverseProps
+    :return: function(File, Prepare=True, CacheDir=None) returning the LandXML data object
+    '''
+    def Load(File, Prepare=True, CacheDir=None):
+        TraverseProps = Batch.TraverseProperties()
+        if CacheDir is not None:
+            setattr(TraverseProps, "CacheDir", CacheDir)
+        LandXML_Obj = LandXML_Objects.main(File, TraverseProps)
+        if Prepare:
+            return LandXML_Objects.PrepareTraverse(LandXML_Obj, TraverseProps)
+        setattr(LandXML_Obj, "TraverseProps", TraverseProps)
+        return LandXML_Obj
+
+    return Load
@@ -0,0 +1,58 @@
+'''
+BdyHopLabels.MarkCalculated on a chain of RMs R1 - R2 - R3 - R4
+R2 and R4 each have an observation to a proposed lot vertex (V1, V2)
+'''
+import pytest
+
+from LandXML import BDY_Connections
+
+POINTS = {"R1": (0., 0.), "R2": (10., 0.), "R3": (20., 0.), "R4": (30., 0.),
+          "V1": (10., 10.), "V2": (30., 10.), "V3": (20., 20.)}
+#monument order puts R4 before R2
+MONUMENTS = [("R4", "SSM"), ("R3", "SSM"), ("R2", "SSM"), ("R1", "PM")]
+OBSERVATIONS = [("R1", "R2", 90., 10.), ("R2", "R3", 90., 10.), ("R3", "R4", 90., 10.),
+                ("R2", "V1", 0., 10.), ("R4", "V2", 0., 10.)]
+PARCELS = ('<Parcel name="1" class="Lot" state="proposed" area="100"><CoordGeom>'
+           '<Line><Start pntRef="V1"/><End pntRef="V2"/></Line>'
+           '<Line><Start pntRef="V2"/><End pntRef="V3"/></Line>'
+           '<Line><Start pntRef="V3"/><End pntRef="V1"/></Line></CoordGeom></Parcel>')
+
+
+@pytest.fixture
+def Labels(WritePlan, LoadPlan):
+    Plan = LoadPlan(WritePlan(POINTS, MONUMENTS, OBSERVATIONS, PARCELS))
+    return BDY_Connections.GetBdyHopLabels(Plan)
+
+
+def test_pending_in_monument_order(Labels):
+    assert list(Labels.PendingBdyRMs) == ["R4", "R2"]
+    assert Labels.HopDistance("R2") == 1
+    assert Labels.HopDistance("R1") == 2
+    assert Labels.NextBdyStart() == "R4"
+
+def test_next_start_is_nearest_calculated_point(Labels):
+    assert Labels.MarkCalculated("R1")
+    assert Labels.CalculatedHops == {"R1": 0, "R2": 1, "R3": 2, "V1": 2}
+    #R4 is 3 hops away - still in the last bucket
+    assert Labels.Bucket("R4") == Labels.MaxDepth + 1
+    assert Labels.NextBdyStart() == "R2"
+
+def test_calculated_rms_leave_pending(Labels):
+    Labels.MarkCalculated("R1")
+    assert Labels.MarkCalculated("R2")
+    assert "R2" not in Labels.PendingBdyRMs
+    assert Labels.CalculatedHops["R4"] == 2
+    assert Labels.NextBdyStart() == "R4"
+
+    assert not Labels.MarkCalculated("R4")
+    assert Labels.NextBdyStart() is None
+
+def test_labels_are_only_lowered(Labels):
+    Labels.MarkCalculated("R3")
+    Labels.MarkCalculated("R1")
+    assert Labels.CalculatedHops["R2"] == 1
+    assert Labels.CalculatedHops["R4"] == 1
+    #calculating a point again changes nothing
+    Hops = dict(Labels.CalculatedHops)
+    Labels.MarkCalculated("R1")
+    assert Labels.CalculatedHops == Hops
@@ -0,0 +1,54 @@
+'''
+NetworkAdjustment on a closed square of four RMs with one distance 40mm long
+A single loop's misclose is shared out in proportion to 1/weight - by distance when
+weighted, equally otherwise - so every residual is known
+'''
+import numpy as np
+import pytest
+
+from LandXML.RefMarks import NetworkAdjustment
+
+POINTS = {"1": (0., 0.), "2": (100., 0.), "3": (100., 100.), "4": (0., 100.)}
+MONUMENTS = [("1", "PM"), ("2", "SSM"), ("3", "SSM"), ("4", "SSM")]
+#1 -> 2 -> 3 -> 4 -> 1, side 2 -> 3 observed 40mm long
+OBSERVATIONS = [("1", "2", 90., 100.), ("2", "3", 0., 100.04), ("3", "4", 270., 100.),
+                ("4", "1", 180., 100.)]
+MISCLOSE_N = 0.04
+
+
+@pytest.fixture
+def Plan(WritePlan, LoadPlan):
+    return LoadPlan(WritePlan(POINTS, MONUMENTS, OBSERVATIONS))
+
+
+def test_weighted_residuals_share_misclose_by_distance(Plan):
+    Result = NetworkAdjustment.AdjustNetwork(Plan, {"1": (0., 0.)})
+    Distances = np.array([Observation[3] for Observation in OBSERVATIONS])
+
+    np.testing.assert_allclose(Result.ResidualN, -MISCLOSE_N * Distances / Distances.sum(), atol=1e-9)
+    np.testing.assert_allclose(Result.ResidualE, 0., atol=1e-9)
+    #adjusted loop closes
+    assert abs(Result.ResidualN.sum() + MISCLOSE_N) < 1e-9
+    np.testing.assert_allclose(Result.DistanceMisclose[1], -MISCLOSE_N * Distances[1] / Distances.sum(),
+                               atol=1e-9)
+    assert Result.Sigma0 == pytest.approx(np.sqrt(MISCLOSE_N ** 2 / Distances.sum() / 2))
+
+def test_adjusted_coordinates(Plan):
+    Result = NetworkAdjustment.AdjustNetwork(Plan, {"1": (0., 0.)})
+    Total = sum(Observation[3] for Observation in OBSERVATIONS)
+
+    assert Result.Coords("1") == (0., 0.)
+    assert list(Result.Fixed) == [Name == "1" for Name in Result.PointNames]
+    East, North = Result.Coords("2")
+    assert East == pytest.approx(100., abs=1e-9)
+    assert North == pytest.approx(-MISCLOSE_N * 100. / Total, abs=1e-9)
+    East, North = Result.Coords("3")
+    assert East == pytest.approx(100., abs=1e-9)
+    assert North == pytest.approx(100.04 - MISCLOSE_N * 200.04 / Total, abs=1e-9)
+    assert Result.Unreachable == []
+
+def test_equal_weights_share_misclose_equally(Plan):
+    Result = NetworkAdjustment.AdjustNetwork(Plan, {"1": (0., 0.)}, Weighted=False)
+
+    np.testing.assert_allclose(Result.ResidualN, -MISCLOSE_N / 4, atol=1e-9)
+    np.testing.assert_allclose(Result.ResidualRadial, MISCLOSE_N / 4, atol=1e-9)
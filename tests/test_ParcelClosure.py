@@ -0,0 +1,53 @@
+'''
+ParcelClosure areas of a 10m square with a semicircle of radius 5 on its north side
+Traversed anticlockwise and clockwise with the arc outside the square, and with the
+arc bulging into the square - areas 100 +/- 12.5 pi
+'''
+import numpy as np
+import pytest
+
+from LandXML.Cadastre import ParcelClosure
+
+#corners A (SW), B (SE), C (NE), D (NW) and M the middle of the north side
+POINTS = {"A": (0., 0.), "B": (10., 0.), "C": (10., 10.), "D": (0., 10.), "M": (5., 10.)}
+SEMICIRCLE = 12.5 * np.pi
+
+
+def Line(StartRef, EndRef):
+    return '<Line><Start pntRef="%s"/><End pntRef="%s"/></Line>' % (StartRef, EndRef)
+
+def Curve(StartRef, EndRef, Rotation, Center=None):
+    CenterText = '<Center pntRef="%s"/>' % Center if Center is not None else ""
+    return '<Curve rot="%s" radius="5"><Start pntRef="%s"/>%s<End pntRef="%s"/></Curve>' % \
+           (Rotation, StartRef, CenterText, EndRef)
+
+def Parcel(Name, Area, Segments):
+    return '<Parcel name="%s" class="Lot" state="proposed" area="%s"><CoordGeom>%s</CoordGeom></Parcel>' % \
+           (Name, Area, "".join(Segments))
+
+PARCELS = "".join((
+    #anticlockwise, arc outside the square
+    Parcel("ccw", "139.27", [Line("A", "B"), Line("B", "C"), Curve("C", "D", "ccw", "M"), Line("D", "A")]),
+    #clockwise, arc outside the square
+    Parcel("cw", "139.27", [Line("A", "D"), Curve("D", "C", "cw", "M"), Line("C", "B"), Line("B", "A")]),
+    #anticlockwise, arc into the square - no centre, the minor arc on the chord
+    Parcel("inward", "60.73", [Line("A", "B"), Line("B", "C"), Curve("C", "D", "cw"), Line("D", "A")])))
+
+
+@pytest.fixture
+def Closure(WritePlan, LoadPlan):
+    return ParcelClosure.ParcelClosure(LoadPlan(WritePlan(POINTS, Parcels=PARCELS), Prepare=False))
+
+
+def test_arc_areas(Closure):
+    Areas = dict(zip(Closure.Names, Closure.Area))
+
+    assert Areas["ccw"] == pytest.approx(100 + SEMICIRCLE)
+    assert Areas["cw"] == pytest.approx(100 + SEMICIRCLE)
+    assert Areas["inward"] == pytest.approx(100 - SEMICIRCLE)
+
+def test_perimeters_and_closure(Closure):
+    np.testing.assert_allclose(Closure.Perimeter, 30 + 5 * np.pi)
+    np.testing.assert_allclose(Closure.Misclose, 0., atol=1e-9)
+    assert Closure.Complete.all()
+    assert len(Closure.AreaMismatches()) == 0
@@ -0,0 +1,57 @@
+'''
+A plan loaded from the PlanCache matches the same plan parsed from the LandXML file
+'''
+import numpy as np
+import pytest
+
+from LandXML import Connections, LandXML_Objects, ObservationTable
+from LandXML.Benchmarks import SyntheticLandXML
+
+
+@pytest.fixture
+def Plans(tmp_path, LoadPlan):
+    '''
+    (parsed, cached) plans of a synthetic LandXML file
+    '''
+    File = str(tmp_path / "synthetic.xml")
+    SyntheticLandXML.GenerateLandXML(File, Lots=40, RefMarks=10)
+    CacheDir = str(tmp_path / "cache")
+    Parsed = LoadPlan(File, CacheDir=CacheDir)
+    LandXML_Objects.SaveToCache(Parsed)
+    Cached = LoadPlan(File, CacheDir=CacheDir)
+
+    return Parsed, Cached
+
+
+def test_plan_is_read_from_cache(Plans):
+    Parsed, Cached = Plans
+    assert not Parsed.FromCache
+    assert Cached.FromCache
+    #elements are not parsed until used
+    assert "ElementLoader" in Cached.__dict__
+
+def test_observation_table(Plans):
+    Parsed, Cached = Plans
+    assert Cached.ObservationTable.tag == Parsed.ObservationTable.tag
+    assert Cached.ObservationTable.PointNames == Parsed.ObservationTable.PointNames
+    for Name in ObservationTable.ARRAYS:
+        np.testing.assert_array_equal(getattr(Cached.ObservationTable, Name),
+                                      getattr(Parsed.ObservationTable, Name))
+
+def test_points_monuments_and_vertices(Plans):
+    Parsed, Cached = Plans
+    assert Cached.DP == Parsed.DP
+    assert Cached.MonumentTable.Rows() == Parsed.MonumentTable.Rows()
+    assert Cached.BdyVertices == Parsed.BdyVertices
+    assert Cached.CoordinateStore.Names == Parsed.CoordinateStore.Names
+    np.testing.assert_array_equal(Cached.CoordinateStore.Eastings, Parsed.CoordinateStore.Eastings)
+    np.testing.assert_array_equal(Cached.CoordinateStore.Northings, Parsed.CoordinateStore.Northings)
+
+def test_connections(Plans):
+    Parsed, Cached = Plans
+    ParsedIndex = Connections.GetConnectionIndex(Parsed)
+    CachedIndex = Connections.GetConnectionIndex(Cached)
+    for PntRefNum in Parsed.ObservationTable.PointNames:
+        assert [ob.get("name") for ob in CachedIndex.Observations(PntRefNum)] == \
+               [ob.get("name") for ob in ParsedIndex.Observations(PntRefNum)]
+    assert Cached.BdyHopLabels.NextBdyStart() == Parsed.BdyHopLabels.NextBdyStart()